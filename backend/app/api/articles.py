@@ -3,10 +3,11 @@ from typing import Any, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.core.deps import get_current_active_superuser, get_current_active_user
+from app.core.deps import Principal, get_current_active_superuser, get_current_active_user
+from app.core.events import event_bus
+from app.core.view_counts import view_counts
 from app.models.article import Article
 from app.models.tag import Tag
-from app.models.user import User
 from app.schemas.article import (
     ArticleCreate,
     ArticleOut,
@@ -54,7 +55,7 @@ async def read_articles(
 @router.post("", response_model=ArticleOut)
 async def create_article(
     article_in: ArticleCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     创建新文章
@@ -89,6 +90,7 @@ async def create_article(
         article.published_at = datetime.datetime.now()
     
     await article.save()
+    event_bus.publish("article.created", article_id=article.id)
     
     # 添加标签
     if article_in.tags:
@@ -115,9 +117,8 @@ async def read_article(
             detail="文章不存在",
         )
     
-    # 增加阅读量
-    article.view_count += 1
-    await article.save()
+    # 增加阅读量（缓冲后定期合并写入，不回写整行：文章可能读自只读副本）
+    article.view_count += await view_counts.increment(article.id)
     
     return article
 
@@ -136,9 +137,8 @@ async def read_article_by_slug(
             detail="文章不存在",
         )
     
-    # 增加阅读量
-    article.view_count += 1
-    await article.save()
+    # 增加阅读量（缓冲后定期合并写入，不回写整行：文章可能读自只读副本）
+    article.view_count += await view_counts.increment(article.id)
     
     return article
 
@@ -147,7 +147,7 @@ async def read_article_by_slug(
 async def update_article(
     article_id: int,
     article_in: ArticleUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     更新文章
@@ -231,7 +231,7 @@ async def update_article(
 async def publish_article(
     article_id: int,
     publish_in: ArticlePublish,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     发布文章
@@ -268,7 +268,7 @@ async def publish_article(
 @router.delete("/{article_id}")
 async def delete_article(
     article_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     删除文章
@@ -289,5 +289,6 @@ async def delete_article(
     
     # 删除文章
     await article.delete()
+    event_bus.publish("article.deleted", article_id=article_id)
     
     return {"message": "文章已删除"} 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Any
 import logging
 
@@ -7,10 +7,20 @@ from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import JSONResponse
 
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password
+from app.core.deps import (
+    Principal,
+    get_current_active_superuser,
+    get_current_active_user,
+    reusable_oauth2,
+)
+from app.core.events import event_bus
+from app.core.rate_limit import login_rate_limiter
+from app.core.revocation import revocation_store
+from app.core.security import create_access_token, decode_jwt_token
 from app.models.user import User
 from app.schemas.token import Token
 from app.schemas.user import UserCreate, UserOut
+from app.utils.client_ip import get_client_ip
 from app.utils.slug import generate_username_slug
 
 router = APIRouter()
@@ -53,9 +63,12 @@ async def login_access_token(
     OAuth2 兼容的令牌登录，获取访问令牌
     """
     logger.info(f"尝试登录用户: {form_data.username}")
-    client_host = request.client.host if request.client else "unknown"
+    client_host = get_client_ip(request)
     logger.info(f"请求来源IP: {client_host}")
     
+    # 先做限流检查，超限请求不会查询数据库，也不会进行bcrypt计算
+    await login_rate_limiter.check(client_host, form_data.username)
+    
     user = await User.filter(username=form_data.username).first()
     if not user:
         logger.warning(f"登录失败: 用户名不存在 - {form_data.username}")
@@ -64,7 +77,7 @@ async def login_access_token(
             detail="用户名或密码不正确",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    if not user.verify_password(form_data.password):
+    if not await user.verify_password(form_data.password):
         logger.warning(f"登录失败: 密码错误 - {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -89,6 +102,46 @@ async def login_access_token(
     }
 
 
+@router.post("/logout")
+async def logout(
+    token: str = Depends(reusable_oauth2),
+    current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    退出登录，吊销当前令牌
+    """
+    payload = decode_jwt_token(token) or {}
+    jti = payload.get("jti")
+    if jti and payload.get("exp"):
+        expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+        await revocation_store.revoke(jti, expires_at, user_id=current_user.id)
+        logger.info(f"用户退出登录，令牌已吊销: {current_user.username}")
+    
+    return {"message": "已退出登录"}
+
+
+@router.get("/login/rate-limit")
+async def read_login_rate_limit_stats(
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    获取登录限流统计（当前worker）
+    """
+    return login_rate_limiter.get_stats()
+
+
+@router.delete("/login/rate-limit")
+async def reset_login_rate_limit(
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    清空登录限流状态（SQLite后端为当前主机上的所有worker，内存后端为当前worker）
+    """
+    await login_rate_limiter.reset()
+    logger.info(f"登录限流状态已被 {current_user.username} 清空")
+    return {"message": "登录限流状态已清空"}
+
+
 @router.post("/register", response_model=UserOut)
 async def register_user(
     request: Request,
@@ -98,7 +151,7 @@ async def register_user(
     注册新用户
     """
     logger.info(f"尝试注册新用户: {user_in.username}, 邮箱: {user_in.email}")
-    client_host = request.client.host if request.client else "unknown"
+    client_host = get_client_ip(request)
     logger.info(f"请求来源IP: {client_host}")
     
     # 检查用户名是否已存在
@@ -135,6 +188,7 @@ async def register_user(
     await user_obj.set_password(user_in.password)
     # 保存用户
     await user_obj.save()
+    event_bus.publish("user.created", user_id=user_obj.id)
     
     logger.info(f"用户注册成功: {user_obj.username}")
     
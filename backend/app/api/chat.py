@@ -1,10 +1,16 @@
 from typing import Any, List, Dict, Optional
-import asyncio
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse, JSONResponse
-from openai import AsyncOpenAI, OpenAI
-from app.core.deps import get_optional_user
-from app.models.user import User
+from starlette.background import BackgroundTask
+from app.core.chat_cache import chat_cache
+from app.core.chat_context import fit_context
+from app.core.chat_retrieval import article_index, augment_with_articles
+from app.core.chat_scheduler import chat_scheduler
+from app.core.config import settings
+from app.core.deps import Principal, get_current_active_superuser, get_optional_user
+from app.core.llm import create_chat_completion, get_chat_client
+from app.utils.client_ip import get_client_ip
+from app.utils.sse import coalesce_deltas, sse_comment, sse_event
 import logging
 
 # 设置日志
@@ -13,20 +19,62 @@ logger.setLevel(logging.DEBUG)
 
 router = APIRouter()
 
-# DeepSeek API配置
-DEEPSEEK_API_KEY = "sk-7a622434f8b24406a92fed8c419d966d"  # 实际部署时应使用环境变量
-DEEPSEEK_BASE_URL = "https://api.deepseek.com"
-DEEPSEEK_MODEL = "deepseek-chat"
+# 流式响应头
+STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # 禁用Nginx缓冲
+    "Access-Control-Allow-Origin": "*",  # 允许跨域请求
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization",
+    "Content-Type": "text/event-stream",  # 明确设置SSE内容类型
+}
 
-# 创建客户端
-async_client = AsyncOpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL)
+
+def client_key(request: Request, current_user: Optional[Principal]) -> str:
+    """
+    排队使用的客户端标识：登录用户按用户ID，访客按IP（经过可信代理时取转发头中的客户端IP）
+    """
+    if current_user is not None:
+        return f"user:{current_user.id}"
+    return f"ip:{get_client_ip(request)}"
+
+
+async def complete_chat(messages: List[Dict[str, Any]], key: str) -> Dict[str, Any]:
+    """
+    非流式对话：优先返回缓存的回答，未命中时调用上游并缓存完整的回答
+    """
+    # 回答依赖检索到的文章片段，缓存按检索索引版本区分
+    context_version = article_index.version
+    if settings.CHAT_CACHE_ENABLED:
+        cached = await chat_cache.get(messages, context_version)
+        if cached is not None:
+            return {"message": cached, "role": "assistant"}
+    
+    # 先检查是否会被拒绝，避免注定返回429的请求仍调用上游生成摘要
+    chat_scheduler.check(key)
+    # 注入相关文章片段，按token预算压缩较早的对话后再调用上游（生成摘要同样计入该客户端的名额）
+    response = await create_chat_completion(
+        await fit_context(await augment_with_articles(messages), client_key=key),
+        client_key=key,
+    )
+    content = response.choices[0].message.content
+    
+    # 只缓存正常结束的回答，被截断的回答不缓存
+    if settings.CHAT_CACHE_ENABLED and response.choices[0].finish_reason == "stop":
+        await chat_cache.set(messages, content, context_version)
+    
+    return {
+        "message": content,
+        "role": response.choices[0].message.role,
+    }
 
 
 # 处理根路径的POST请求，重定向到/message端点
 @router.post("")
 async def chat_root(
     request: Request,
-    current_user: Optional[User] = Depends(get_optional_user),
+    current_user: Optional[Principal] = Depends(get_optional_user),
 ) -> Any:
     """
     处理根路径的请求，将其重定向到/message端点
@@ -39,18 +87,10 @@ async def chat_root(
         if not messages:
             raise HTTPException(status_code=400, detail="消息列表不能为空")
         
-        # 直接调用message端点的处理逻辑，不是函数本身
-        client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL)
-        
-        response = client.chat.completions.create(
-            model=DEEPSEEK_MODEL,
-            messages=messages,
-        )
-        
-        return {
-            "message": response.choices[0].message.content,
-            "role": response.choices[0].message.role,
-        }
+        # 与message端点相同的处理逻辑
+        return await complete_chat(messages, client_key(request, current_user))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"处理聊天请求时出错: {str(e)}")
         raise HTTPException(status_code=500, detail=f"处理请求失败: {str(e)}")
@@ -72,11 +112,22 @@ async def options_chat():
     )
 
 
+async def replay_cached(text: str):
+    """
+    以SSE帧回放缓存的回答，帧格式与实时流式响应一致
+    """
+    size = settings.CHAT_STREAM_COALESCE_MAX_CHARS
+    for i in range(0, len(text), size):
+        yield sse_event(text[i:i + size])
+    yield sse_event("stop", event="finish")
+    yield sse_event("[DONE]")
+
+
 # 流式聊天端点
 @router.post("/stream")
 async def chat_stream(
     request: Request,
-    current_user: Optional[User] = Depends(get_optional_user),  # 使用可选用户认证
+    current_user: Optional[Principal] = Depends(get_optional_user),  # 使用可选用户认证
 ) -> StreamingResponse:
     """
     与DeepSeek大模型进行流式对话
@@ -88,95 +139,158 @@ async def chat_stream(
     if not messages:
         raise HTTPException(status_code=400, detail="消息列表不能为空")
     
+    # 合并窗口（毫秒），0表示每个上游增量到达后立即转发
+    coalesce_ms = body.get("coalesce_ms", settings.CHAT_STREAM_COALESCE_MS)
+    try:
+        coalesce_interval = max(0.0, float(coalesce_ms)) / 1000
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="coalesce_ms 必须是数字")
+    
     logger.info(f"开始流式聊天请求，消息数: {len(messages)}")
     
+    # 命中缓存时直接以SSE回放缓存的回答（缓存按检索索引版本区分）
+    context_version = article_index.version
+    if settings.CHAT_CACHE_ENABLED:
+        cached = await chat_cache.get(messages, context_version)
+        if cached is not None:
+            logger.info("命中聊天缓存，回放缓存的回答")
+            return StreamingResponse(
+                replay_cached(cached),
+                media_type="text/event-stream",
+                headers={**STREAM_HEADERS, "X-Chat-Cache": "hit"},
+            )
+    
+    # 先检查是否会被拒绝，避免注定返回429的请求仍调用上游生成摘要
+    key = client_key(request, current_user)
+    chat_scheduler.check(key)
+    
+    # 注入相关文章片段，按token预算压缩较早的对话
+    # （可能需要调用上游生成摘要，摘要计入该客户端的名额；须在申请流式名额之前完成，
+    # 否则同一客户端占着名额再等待摘要的名额可能互相等待）
+    upstream_messages = await fit_context(await augment_with_articles(messages), client_key=key)
+    
+    # 在返回响应头之前申请上游名额，队列已满时直接返回429
+    ticket = chat_scheduler.admit(key)
+    
     # 创建异步迭代器，将响应流式传输到客户端
+    # 上游增量按到达顺序转发（可按时间/大小合并成较少的帧），打字机效果由前端控制
     async def event_generator():
+        finish_reason = None
+        parts = []
+        
+        async def upstream_deltas(stream):
+            nonlocal finish_reason
+            async for chunk in stream:
+                if chunk.choices and len(chunk.choices) > 0:
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    if chunk.choices[0].finish_reason:
+                        finish_reason = chunk.choices[0].finish_reason
+        
         try:
+            # 排队等待上游名额，等待期间定期发送注释帧保持连接
+            while not await chat_scheduler.wait(ticket, timeout=settings.CHAT_QUEUE_KEEPALIVE):
+                yield sse_comment("queued")
+            
             logger.info("创建DeepSeek流式请求")
-            stream = await async_client.chat.completions.create(
-                model=DEEPSEEK_MODEL,
-                messages=messages,
+            # 在整个流式响应期间占用名额
+            stream = await get_chat_client().chat.completions.create(
+                model=settings.DEEPSEEK_MODEL,
+                messages=upstream_messages,
                 stream=True,
             )
             
             logger.info("开始接收DeepSeek流式响应")
             
-            # 用于积累字符的缓冲区
-            buffer = ""
+            async for text in coalesce_deltas(
+                upstream_deltas(stream),
+                interval=coalesce_interval,
+                max_chars=settings.CHAT_STREAM_COALESCE_MAX_CHARS,
+            ):
+                parts.append(text)
+                yield sse_event(text)
             
-            async for chunk in stream:
-                if chunk.choices and len(chunk.choices) > 0:
-                    content = chunk.choices[0].delta.content
-                    
-                    if content:
-                        buffer += content
-                        
-                        # 逐个字符输出，确保前端可以实现打字机效果
-                        for char in buffer:
-                            yield f"data: {char}\n\n"
-                            # 每个字符之间添加小延迟，便于前端处理
-                            await asyncio.sleep(0.01)
-                        
-                        # 清空缓冲区
-                        buffer = ""
-                    
-                    # 如果是最后一个消息，发送完成事件
-                    if chunk.choices[0].finish_reason:
-                        logger.info(f"收到完成标志: {chunk.choices[0].finish_reason}")
-                        yield f"event: finish\ndata: {chunk.choices[0].finish_reason}\n\n"
+            chat_scheduler.release(ticket)
+            
+            # 发送完成事件
+            if finish_reason:
+                logger.info(f"收到完成标志: {finish_reason}")
+                yield sse_event(finish_reason, event="finish")
             
-            # 确保剩余的缓冲区内容也被发送
-            if buffer:
-                for char in buffer:
-                    yield f"data: {char}\n\n"
-                    await asyncio.sleep(0.01)
+            # 完整结束的回答写入缓存
+            if settings.CHAT_CACHE_ENABLED and finish_reason == "stop":
+                await chat_cache.set(messages, "".join(parts), context_version)
             
             # 确保最后有一个空行，结束SSE
             logger.info("流式响应完成")
-            yield "data: [DONE]\n\n"
+            yield sse_event("[DONE]")
+        except HTTPException as e:
+            # 排队超时
+            logger.warning(f"流式聊天请求排队超时: {e.detail}")
+            yield sse_event(e.detail, event="error")
         except Exception as e:
             # 发送错误事件
             logger.error(f"流式响应错误: {str(e)}")
-            error_message = str(e)
-            yield f"event: error\ndata: {error_message}\n\n"
+            yield sse_event(str(e), event="error")
+        finally:
+            # 客户端断开时同样要退出队列或归还名额
+            chat_scheduler.release(ticket)
     
     # 返回流式响应
+    # 生成器未开始执行（如客户端在响应头发送前断开）时由后台任务归还名额
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",  # 禁用Nginx缓冲
-            "Access-Control-Allow-Origin": "*",  # 允许跨域请求
-            "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
-            "Content-Type": "text/event-stream",  # 明确设置SSE内容类型
-        },
+        headers={**STREAM_HEADERS, "X-Chat-Cache": "miss"},
+        background=BackgroundTask(chat_scheduler.release, ticket),
     )
 
 
 # 普通聊天端点（非流式）
 @router.post("/message")
 async def chat_message(
+    request: Request,
     messages: List[Dict[str, str]],
-    current_user: Optional[User] = Depends(get_optional_user),  # 使用可选用户认证
+    current_user: Optional[Principal] = Depends(get_optional_user),  # 使用可选用户认证
 ) -> Any:
     """
     与DeepSeek大模型进行普通对话
     """
     try:
-        client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL)
-        
-        response = client.chat.completions.create(
-            model=DEEPSEEK_MODEL,
-            messages=messages,
-        )
-        
-        return {
-            "message": response.choices[0].message.content,
-            "role": response.choices[0].message.role,
-        }
+        return await complete_chat(messages, client_key(request, current_user))
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"调用DeepSeek API失败: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"调用DeepSeek API失败: {str(e)}")
+
+
+@router.get("/cache")
+async def read_chat_cache_stats(
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    获取聊天缓存命中统计（当前worker）
+    """
+    return chat_cache.get_stats()
+
+
+@router.get("/scheduler")
+async def read_chat_scheduler_stats(
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    获取聊天排队指标（当前worker）
+    """
+    return chat_scheduler.get_stats()
+
+
+@router.delete("/cache")
+async def purge_chat_cache(
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    清空聊天缓存（所有worker）
+    """
+    deleted = await chat_cache.purge()
+    logger.info(f"聊天缓存已清空，删除 {deleted} 条")
+    return {"message": "聊天缓存已清空", "deleted": deleted}
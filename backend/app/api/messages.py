@@ -3,9 +3,9 @@ from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import JSONResponse
 
-from app.core.deps import get_current_active_superuser, get_current_active_user
+from app.core.deps import Principal, get_current_active_superuser, get_current_active_user
+from app.core.events import event_bus
 from app.models.message import Message
-from app.models.user import User
 from app.schemas.message import (
     MessageCreate,
     MessageOut,
@@ -34,7 +34,7 @@ async def read_messages(
     skip: int = 0,
     limit: int = 20,
     is_read: Optional[bool] = None,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     获取消息列表（需要管理员权限）
@@ -68,6 +68,7 @@ async def create_message(
         message=message_in.message,
     )
     await message.save()
+    event_bus.publish("message.created", message_id=message.id)
     
     return message
 
@@ -75,7 +76,7 @@ async def create_message(
 @router.get("/{message_id}", response_model=MessageOut)
 async def read_message(
     message_id: int,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     通过ID获取消息
@@ -94,7 +95,7 @@ async def read_message(
 async def update_message(
     message_id: int,
     message_in: MessageUpdate,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     更新消息状态
@@ -117,7 +118,7 @@ async def update_message(
 @router.delete("/{message_id}")
 async def delete_message(
     message_id: int,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     删除消息
@@ -131,5 +132,6 @@ async def delete_message(
     
     # 删除消息
     await message.delete()
+    event_bus.publish("message.deleted", message_id=message_id)
     
     return {"message": "消息已删除"} 
\ No newline at end of file
@@ -2,10 +2,10 @@ from typing import Any, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.core.deps import get_current_active_superuser, get_current_active_user
+from app.core.deps import Principal, get_current_active_superuser, get_current_active_user
+from app.core.events import event_bus
 from app.models.project import Project
 from app.models.tag import Tag
-from app.models.user import User
 from app.schemas.project import (
     ProjectCreate,
     ProjectOut,
@@ -48,7 +48,7 @@ async def read_projects(
 @router.post("", response_model=ProjectOut)
 async def create_project(
     project_in: ProjectCreate,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     创建新项目
@@ -74,6 +74,7 @@ async def create_project(
     )
     
     await project.save()
+    event_bus.publish("project.created", project_id=project.id)
     
     # 添加标签
     if project_in.tags:
@@ -124,7 +125,7 @@ async def read_project_by_slug(
 async def update_project(
     project_id: int,
     project_in: ProjectUpdate,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     更新项目
@@ -199,7 +200,7 @@ async def update_project_stats(
     project_id: int,
     stars: Optional[int] = None,
     forks: Optional[int] = None,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     更新项目GitHub统计信息
@@ -229,7 +230,7 @@ async def update_project_stats(
 @router.delete("/{project_id}")
 async def delete_project(
     project_id: int,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     删除项目
@@ -243,5 +244,6 @@ async def delete_project(
     
     # 删除项目
     await project.delete()
+    event_bus.publish("project.deleted", project_id=project_id)
     
     return {"message": "项目已删除"} 
\ No newline at end of file
@@ -2,9 +2,8 @@ from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
 
-from app.core.deps import get_current_active_superuser, get_current_active_user
+from app.core.deps import Principal, get_current_active_superuser, get_current_active_user
 from app.models.skill import Skill, SkillCategory
-from app.models.user import User
 from app.schemas.skill import (
     SkillCreate,
     SkillOut,
@@ -40,7 +39,7 @@ async def read_skill_categories_with_skills() -> Any:
 @router.post("/categories", response_model=SkillCategoryOut)
 async def create_skill_category(
     category_in: SkillCategoryCreate,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     创建新的技能分类
@@ -76,7 +75,7 @@ async def read_skill_category(
 async def update_skill_category(
     category_id: int,
     category_in: SkillCategoryUpdate,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     更新技能分类
@@ -103,7 +102,7 @@ async def update_skill_category(
 @router.delete("/categories/{category_id}")
 async def delete_skill_category(
     category_id: int,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     删除技能分类
@@ -146,7 +145,7 @@ async def read_skills(
 @router.post("", response_model=SkillOut)
 async def create_skill(
     skill_in: SkillCreate,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     创建新技能
@@ -190,7 +189,7 @@ async def read_skill(
 async def update_skill(
     skill_id: int,
     skill_in: SkillUpdate,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     更新技能
@@ -224,7 +223,7 @@ async def update_skill(
 @router.delete("/{skill_id}")
 async def delete_skill(
     skill_id: int,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     删除技能
@@ -1,124 +1,41 @@
-from typing import Any, Dict, List
-from datetime import timedelta, date, datetime, time
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import JSONResponse
-from app.core.deps import get_current_active_superuser
+from tortoise.functions import Count, Sum
+from app.core.api_metrics import (
+    GRANULARITIES,
+    MAX_BUCKETS,
+    latency_histogram,
+    percentile_from_histogram,
+    time_series,
+    truncate,
+)
+from app.core.deps import Principal, get_current_active_superuser
+from app.core.leader import leader_election
+from app.core.scheduler import scheduler
+from app.core.task_queue import task_queue
+from app.core.update_stats import stats_cache
+from app.db.database import get_pool_stats
+from app.db.query_stats import n_plus_one_report, slow_query_log
+from app.db.routing import replica_state
+from app.db.write_queue import write_queue
 from app.models.stat import Stat
-from app.models.api_stat import ApiStat, ApiStatDaily
-from app.models.user import User
+from app.models.api_stat import ApiStat
 from app.schemas.stat import StatCreate, StatOut, StatUpdate
 
 
 router = APIRouter()
 
 
-async def update_all_stats() -> Dict[str, Any]:
-    """
-    更新所有统计数据
-    
-    此函数用于更新各种统计数据，如文章数、用户数等。
-    同时更新API统计的独立用户数。
-    
-    Returns:
-        Dict[str, Any]: 更新结果
-    """
-    try:
-        # 更新文章数
-        from app.models.article import Article
-        article_count = await Article.all().count()
-        article_stat = await Stat.filter(key="article_count").first()
-        if article_stat:
-            article_stat.value = article_count
-            await article_stat.save()
-        else:
-            await Stat.create(
-                key="article_count",
-                value=article_count,
-                display_text="文章数量"
-            )
-        
-        # 更新用户数
-        user_count = await User.all().count()
-        user_stat = await Stat.filter(key="user_count").first()
-        if user_stat:
-            user_stat.value = user_count
-            await user_stat.save()
-        else:
-            await Stat.create(
-                key="user_count",
-                value=user_count,
-                display_text="用户数量"
-            )
-        
-        # 更新项目数
-        from app.models.project import Project
-        project_count = await Project.all().count()
-        project_stat = await Stat.filter(key="project_count").first()
-        if project_stat:
-            project_stat.value = project_count
-            await project_stat.save()
-        else:
-            await Stat.create(
-                key="project_count",
-                value=project_count,
-                display_text="项目数量"
-            )
-        
-        # 更新消息数
-        from app.models.message import Message
-        message_count = await Message.all().count()
-        message_stat = await Stat.filter(key="message_count").first()
-        if message_stat:
-            message_stat.value = message_count
-            await message_stat.save()
-        else:
-            await Stat.create(
-                key="message_count",
-                value=message_count,
-                display_text="消息数量"
-            )
-        
-        # 更新API统计的独立用户数
-        today = date.today()
-        daily_stat = await ApiStatDaily.filter(date=today).first()
-        if daily_stat:
-            # 获取今天的独立用户数
-            today_start = datetime.combine(today, time.min)
-            today_end = datetime.combine(today, time.max)
-            unique_users = len(set(
-                stat.user_id for stat in await ApiStat.filter(
-                    timestamp__gte=today_start,
-                    timestamp__lte=today_end
-                ).filter(user_id__isnull=False)
-            ))
-            daily_stat.unique_users = unique_users
-            await daily_stat.save()
-        
-        return {
-            "success": True,
-            "message": "统计数据已更新",
-            "stats": {
-                "article_count": article_count,
-                "user_count": user_count,
-                "project_count": project_count,
-                "message_count": message_count
-            }
-        }
-    except Exception as e:
-        print(f"更新统计数据出错: {e}")
-        return {
-            "success": False,
-            "message": f"更新统计数据出错: {e}"
-        }
-
-
 @router.get("", response_model=List[StatOut])
 async def read_stats() -> Any:
     """
     获取所有统计数据
     """
-    stats = await Stat.all()
-    return stats
+    snapshot = await stats_cache.get()
+    return snapshot["rows"]
 
 
 @router.get("/dashboard", response_model=Dict[str, int])
@@ -126,11 +43,8 @@ async def read_dashboard_stats() -> Any:
     """
     获取仪表盘统计数据
     """
-    stats = await Stat.all()
-    result = {}
-    for stat in stats:
-        result[stat.key] = stat.value
-    return result
+    snapshot = await stats_cache.get()
+    return snapshot["dashboard"]
 
 
 @router.get("/api")
@@ -220,125 +134,246 @@ async def read_api_stats() -> Any:
         })
 
 
+def _local_naive(value: datetime) -> datetime:
+    """带时区的时间转换为本地时间（ApiStat.timestamp 以本地时间记录）"""
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _resolve_range(
+    start: Optional[datetime],
+    end: Optional[datetime],
+    granularity: str,
+) -> Tuple[datetime, datetime]:
+    """
+    解析查询时间范围，未指定时按粒度取默认范围（最近7天/24小时/60分钟）
+    """
+    end = _local_naive(end) if end else datetime.now()
+    if start is None:
+        if granularity == "day":
+            start = truncate(end, "day") - timedelta(days=6)
+        elif granularity == "hour":
+            start = truncate(end, "hour") - timedelta(hours=23)
+        else:
+            start = truncate(end, "minute") - timedelta(minutes=59)
+    start = _local_naive(start)
+    
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="开始时间必须早于结束时间",
+        )
+    step = GRANULARITIES[granularity][1]
+    if (end - truncate(start, granularity)) / step > MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"时间范围过大，最多返回 {MAX_BUCKETS} 个时间桶",
+        )
+    return start, end
+
+
 @router.get("/api/trends")
-async def read_api_trends() -> Any:
+async def read_api_trends(
+    start: Optional[datetime] = Query(None, description="开始时间（包含），默认按粒度取最近一段时间"),
+    end: Optional[datetime] = Query(None, description="结束时间（不包含），默认当前时间"),
+    granularity: Literal["minute", "hour", "day"] = Query("day", description="时间粒度"),
+) -> Any:
     """
     获取API调用趋势数据
+    
+    按时间桶返回调用次数、错误次数和p95响应时间（毫秒），没有调用的时间桶补零。
     """
-    try:
-        # 获取最近7天的API调用数据
-        today = date.today()
-        start_date = today - timedelta(days=6)
-        
-        # 按日期分组计算每天的调用次数
-        trend_data = {}
-        
-        for i in range(7):
-            day = (today - timedelta(days=i)).isoformat()
-            trend_data[day] = 0
-        
-        # 查询每天的API调用次数
-        api_stats = await ApiStat.all()
-        
-        # 不再使用模拟数据，直接使用真实数据
-        for stat in api_stats:
-            day = stat.timestamp.date().isoformat()
-            if day in trend_data:
-                trend_data[day] += 1
-        
-        # 构建响应
-        trends = []
-        for day, count in trend_data.items():
-            trends.append({
-                "date": day,
-                "count": count  # 使用真实的调用次数
-            })
-        
-        # 按日期排序
-        trends.sort(key=lambda x: x["date"])
-        
-        return JSONResponse(content=trends)
-    except Exception as e:
-        print(f"获取API趋势数据出错: {e}")
-        # 返回空数据，不使用模拟数据
-        empty_data = []
-        for i in range(7):
-            day = (today - timedelta(days=i)).isoformat()
-            empty_data.append({
-                "date": day,
-                "count": 0
-            })
-        # 按日期排序
-        empty_data.sort(key=lambda x: x["date"])
-        return JSONResponse(content=empty_data)
+    start, end = _resolve_range(start, end, granularity)
+    
+    # 在数据库中按截断后的时间戳分组，只返回每个时间桶的聚合结果
+    series = await time_series(ApiStat.all(), start, end, granularity)
+    
+    return JSONResponse(content=[
+        {
+            "date": item["bucket"],
+            "count": item["calls"],
+            "errors": item["errors"],
+            "p95": item["p95"],
+        }
+        for item in series
+    ])
 
 
-@router.get("/api/{endpoint}")
-async def read_api_detail(endpoint: str) -> Any:
+@router.get("/api/{endpoint:path}")
+async def read_api_detail(
+    endpoint: str,
+    start: Optional[datetime] = Query(None, description="开始时间（包含），默认按粒度取最近一段时间"),
+    end: Optional[datetime] = Query(None, description="结束时间（不包含），默认当前时间"),
+    granularity: Literal["minute", "hour", "day"] = Query("day", description="时间序列的粒度"),
+) -> Any:
     """
     获取特定API的调用详情
+    
+    endpoint 为中间件记录的规范化路径，可带或不带 /api 前缀，
+    如 articles/{id} 或 /api/articles/{id}。
+    只统计指定时间范围内的调用，利用 (endpoint, timestamp) 索引做范围扫描。
     """
-    try:
-        # 构建路径
-        path = f"/api/{endpoint}"
-        
-        # 查找API统计数据
-        api_stats = await ApiStat.filter(endpoint=path)
-        
-        # 如果没有找到，返回空数据
-        if not api_stats:
-            return JSONResponse(content={
-                "path": path,
-                "methods": [],
-                "total_calls": 0,
-                "avg_response_time": 0,
-                "error_rate": 0,
-                "status_codes": {}
-            })
-        
-        # 计算统计信息
-        total_calls = len(api_stats)
-        methods = list(set(stat.method for stat in api_stats))
-        avg_response_time = round(sum(stat.response_time for stat in api_stats) / total_calls * 1000, 1) if total_calls > 0 else 0
-        
-        # 计算错误率
-        error_count = sum(1 for stat in api_stats if stat.is_error)
-        error_rate = round(error_count / total_calls * 100, 1) if total_calls > 0 else 0
-        
-        # 统计状态码
-        status_codes = {}
-        for stat in api_stats:
-            code = str(stat.status_code)
-            status_codes[code] = status_codes.get(code, 0) + 1
-        
-        # 构建响应
-        result = {
-            "path": path,
-            "methods": methods,
-            "total_calls": total_calls,
-            "avg_response_time": avg_response_time,
-            "error_rate": error_rate,
-            "status_codes": status_codes
-        }
-        
-        return JSONResponse(content=result)
-    except Exception as e:
-        print(f"获取API详情出错: {e}")
-        # 返回空结果
-        return JSONResponse(content={
-            "path": f"/api/{endpoint}",
-            "methods": [],
-            "total_calls": 0,
-            "avg_response_time": 0,
-            "error_rate": 0,
-            "status_codes": {}
-        })
+    path = "/" + endpoint.strip("/")
+    if not path.startswith("/api/") and path != "/api":
+        path = f"/api{path}"
+    start, end = _resolve_range(start, end, granularity)
+    
+    calls = ApiStat.filter(endpoint=path, timestamp__gte=start, timestamp__lt=end)
+    by_status, histogram, series = await asyncio.gather(
+        calls.annotate(
+            calls=Count("id"),
+            total_time=Sum("response_time"),
+            total_queries=Sum("query_count"),
+            total_db_time=Sum("db_time"),
+        )
+        .group_by("method", "status_code")
+        .values("method", "status_code", "calls", "total_time", "total_queries", "total_db_time"),
+        latency_histogram(calls),
+        time_series(ApiStat.filter(endpoint=path), start, end, granularity),
+    )
+    
+    total_calls = sum(row["calls"] for row in by_status)
+    total_time = sum(row["total_time"] or 0 for row in by_status)
+    total_queries = sum(row["total_queries"] or 0 for row in by_status)
+    total_db_time = sum(row["total_db_time"] or 0 for row in by_status)
+    error_count = sum(row["calls"] for row in by_status if row["status_code"] >= 400)
+    status_codes: Dict[str, int] = {}
+    for row in by_status:
+        code = str(row["status_code"])
+        status_codes[code] = status_codes.get(code, 0) + row["calls"]
+    latency = {row["bin"]: row["calls"] for row in histogram}
+    
+    return JSONResponse(content={
+        "path": path,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "methods": sorted({row["method"] for row in by_status}),
+        "total_calls": total_calls,
+        "avg_response_time": round(total_time / total_calls * 1000, 1) if total_calls else 0,
+        "avg_queries": round(total_queries / total_calls, 1) if total_calls else 0,
+        "avg_db_time": round(total_db_time / total_calls * 1000, 1) if total_calls else 0,
+        "error_rate": round(error_count / total_calls * 100, 1) if total_calls else 0,
+        "status_codes": status_codes,
+        "percentiles": {
+            f"p{pct}": percentile_from_histogram(latency, pct) for pct in (50, 90, 95, 99)
+        },
+        "series": series,
+    })
+
+
+@router.get("/db/pool")
+async def read_db_pool_stats(
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    获取当前worker的数据库连接池统计（使用中、空闲、等待中的连接请求等，仅管理员）
+    """
+    return get_pool_stats()
+
+
+@router.get("/db/writes")
+async def read_db_write_queue_stats(
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    获取当前worker后台写入队列的统计（排队数、批次数、平均每批写入数等，仅管理员）
+    """
+    return write_queue.get_stats()
+
+
+@router.get("/db/n-plus-one")
+async def read_n_plus_one_report(
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    获取当前worker记录的疑似N+1查询（同一请求中重复执行的语句形状，仅管理员）
+    """
+    return {
+        "threshold": n_plus_one_report.threshold,
+        "entries": n_plus_one_report.get_report(),
+    }
+
+
+@router.get("/db/slow-queries")
+async def read_slow_queries(
+    order_by: Literal["total", "max", "calls"] = Query("total", description="排序依据：总耗时、单次最大耗时或调用次数"),
+    limit: int = Query(20, ge=1, le=500, description="返回的语句数"),
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    获取当前worker按语句形状汇总的SQL耗时（调用次数、总耗时、p95、最大耗时，仅管理员）
+
+    单次耗时超过阈值的语句同时写入慢查询日志文件。
+    """
+    return {
+        "threshold_ms": round(slow_query_log.threshold * 1000, 1),
+        "log_path": slow_query_log.file_path,
+        "evicted": slow_query_log.evicted,
+        "entries": slow_query_log.get_top(order_by, limit),
+    }
+
+
+@router.get("/db/replica")
+async def read_db_replica_stats(
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    获取只读副本的路由状态（是否可用、读副本次数、回退主库次数，仅管理员）
+    """
+    stats = replica_state.get_stats()
+    if replica_state.enabled:
+        stats["pool"] = get_pool_stats("replica")
+    return stats
+
+
+@router.get("/jobs")
+async def read_scheduled_jobs(
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    获取当前worker的定时任务状态和最近的执行记录（仅管理员）
+
+    leader_only 的任务只在leader上运行，其执行记录只在leader上可见。
+    """
+    return {
+        "leader": leader_election.get_status(),
+        "jobs": scheduler.get_stats(),
+    }
+
+
+@router.post("/jobs/{name}/run")
+async def run_scheduled_job(
+    name: str,
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    在当前worker立即执行一次定时任务并返回执行结果（仅管理员）
+    """
+    if name not in scheduler.jobs:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="定时任务不存在")
+    record = await scheduler.run_now(name)
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="定时任务正在执行")
+    return record
+
+
+@router.get("/tasks")
+async def read_task_queue(
+    failures: int = Query(10, ge=0, le=100),
+    current_user: Principal = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    获取后台任务队列状态（仅管理员）：各状态的任务数、到期待执行的任务数、
+    当前worker的执行情况和最近失败的任务
+    """
+    return await task_queue.get_stats(failures)
 
 
 @router.post("", response_model=StatOut)
 async def create_stat(
     stat_in: StatCreate,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     创建新统计数据
@@ -358,6 +393,7 @@ async def create_stat(
         display_text=stat_in.display_text,
     )
     await stat.save()
+    stats_cache.invalidate()
     
     return stat
 
@@ -383,7 +419,7 @@ async def read_stat(
 async def update_stat(
     stat_id: int,
     stat_in: StatUpdate,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     更新统计数据
@@ -413,6 +449,7 @@ async def update_stat(
         stat.display_text = stat_in.display_text
     
     await stat.save()
+    stats_cache.invalidate()
     
     return stat
 
@@ -420,7 +457,7 @@ async def update_stat(
 @router.delete("/{stat_id}")
 async def delete_stat(
     stat_id: int,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     删除统计数据
@@ -434,5 +471,6 @@ async def delete_stat(
     
     # 删除统计数据
     await stat.delete()
+    stats_cache.invalidate()
     
     return {"message": "统计数据已删除"} 
\ No newline at end of file
@@ -2,20 +2,32 @@ from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
 
-from app.core.deps import get_current_active_superuser
+from app.core.config import settings
+from app.core.deps import Principal, get_current_active_superuser
+from app.core.task_queue import task_queue
 from app.models.subscriber import Subscriber
-from app.models.user import User
 from app.schemas.subscriber import SubscriberCreate, SubscriberOut, SubscriberUpdate
 
 router = APIRouter()
 
 
+async def _send_welcome_email(email: str) -> None:
+    """提交欢迎邮件的后台任务，未配置邮件服务时跳过"""
+    if not settings.EMAILS_ENABLED:
+        return
+    await task_queue.enqueue("email.send", {
+        "to": email,
+        "subject": f"感谢订阅 {settings.PROJECT_NAME}",
+        "body": f"你已成功订阅 {settings.PROJECT_NAME}，有新文章发布时我们会通过邮件通知你。",
+    })
+
+
 @router.get("", response_model=List[SubscriberOut])
 async def read_subscribers(
     skip: int = 0,
     limit: int = 100,
     status: str = None,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     获取所有订阅者列表
@@ -49,6 +61,7 @@ async def create_subscriber(
         if existing_subscriber.status == "unsubscribed":
             existing_subscriber.status = "active"
             await existing_subscriber.save()
+            await _send_welcome_email(existing_subscriber.email)
             return existing_subscriber
         
         raise HTTPException(
@@ -62,6 +75,7 @@ async def create_subscriber(
         status="active",
     )
     await subscriber.save()
+    await _send_welcome_email(subscriber.email)
     
     return subscriber
 
@@ -69,7 +83,7 @@ async def create_subscriber(
 @router.get("/{subscriber_id}", response_model=SubscriberOut)
 async def read_subscriber(
     subscriber_id: int,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     通过ID获取订阅者
@@ -88,7 +102,7 @@ async def read_subscriber(
 async def update_subscriber(
     subscriber_id: int,
     subscriber_in: SubscriberUpdate,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     更新订阅者状态
@@ -111,7 +125,7 @@ async def update_subscriber(
 @router.delete("/{subscriber_id}")
 async def delete_subscriber(
     subscriber_id: int,
-    current_user: User = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     删除订阅者
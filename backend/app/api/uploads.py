@@ -6,8 +6,8 @@ from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from fastapi.responses import FileResponse
 
 from app.core.config import settings
-from app.core.deps import get_current_active_user
-from app.models.user import User
+from app.core.deps import Principal, get_current_active_user
+from app.core.task_queue import task_queue
 
 router = APIRouter()
 
@@ -15,7 +15,7 @@ router = APIRouter()
 @router.post("/avatar", response_model=dict)
 async def upload_avatar(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     上传用户头像
@@ -56,8 +56,12 @@ async def upload_avatar(
     avatar_url = f"/api/uploads/avatars/{file_name}"
     
     # 更新用户头像URL
-    current_user.avatar_url = avatar_url
-    await current_user.save()
+    user = await current_user.get_user()
+    user.avatar_url = avatar_url
+    await user.save()
+    
+    # 裁剪和缩放在后台任务中进行，不阻塞上传请求
+    await task_queue.enqueue("avatar.process", {"file_name": file_name})
     
     return {
         "avatar_url": avatar_url,
@@ -86,7 +90,7 @@ async def get_avatar(file_name: str) -> Any:
 @router.post("/images", response_model=dict)
 async def upload_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     上传图片文件
@@ -153,7 +157,7 @@ async def get_image(file_name: str) -> Any:
 @router.delete("/images/{file_name}")
 async def delete_image(
     file_name: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     删除上传的图片
@@ -0,0 +1,156 @@
+"""
+API调用统计查询模块
+
+在数据库中完成时间分桶和聚合，不把 ApiStat 明细加载到Python：
+- 时间桶：把时间戳截断到分钟/小时/天后 GROUP BY
+- 延迟分位数：按固定的延迟区间分组计数（直方图），再从直方图估算分位数
+时间戳转成 "YYYY-MM-DD HH:MM:SS" 文本后截取前缀，SQLite 和 MySQL 结果一致。
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Sequence
+
+from tortoise import connections
+from tortoise.expressions import Q, RawSQL
+from tortoise.functions import Count
+from tortoise.queryset import QuerySet
+
+# 时间粒度：截取的文本长度、步长、截取结果的格式和返回给前端的标签格式
+GRANULARITIES = {
+    "minute": (16, timedelta(minutes=1), "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M"),
+    "hour": (13, timedelta(hours=1), "%Y-%m-%d %H", "%Y-%m-%d %H:00"),
+    "day": (10, timedelta(days=1), "%Y-%m-%d", "%Y-%m-%d"),
+}
+
+# 延迟直方图的区间上界（毫秒），最后一个区间没有上界
+LATENCY_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# 单次查询最多返回的时间桶数
+MAX_BUCKETS = 2000
+
+
+def _quote(column: str) -> str:
+    dialect = connections.get("default").capabilities.dialect
+    return f"`{column}`" if dialect == "mysql" else f'"{column}"'
+
+
+def bucket_sql(granularity: str) -> RawSQL:
+    """时间戳截断到指定粒度的SQL表达式"""
+    length = GRANULARITIES[granularity][0]
+    return RawSQL(f"SUBSTR(CAST({_quote('timestamp')} AS CHAR), 1, {length})")
+
+
+def latency_bin_sql() -> RawSQL:
+    """响应时间所在直方图区间编号的SQL表达式"""
+    column = _quote("response_time")
+    cases = " ".join(
+        f"WHEN {column} < {bound / 1000} THEN {i}" for i, bound in enumerate(LATENCY_BOUNDS_MS)
+    )
+    return RawSQL(f"CASE {cases} ELSE {len(LATENCY_BOUNDS_MS)} END")
+
+
+def percentile_from_histogram(histogram: Dict[int, int], pct: float) -> float:
+    """
+    从延迟直方图估算分位数（毫秒），返回所在区间的上界
+
+    最后一个区间没有上界，返回最后一个边界值。
+    """
+    total = sum(histogram.values())
+    if not total:
+        return 0
+    rank = total * pct / 100
+    seen = 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= rank:
+            return LATENCY_BOUNDS_MS[min(index, len(LATENCY_BOUNDS_MS) - 1)]
+    return LATENCY_BOUNDS_MS[-1]
+
+
+def truncate(value: datetime, granularity: str) -> datetime:
+    """把时间截断到指定粒度"""
+    if granularity == "minute":
+        return value.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_starts(start: datetime, end: datetime, granularity: str) -> List[datetime]:
+    """
+    生成 [start, end) 范围内所有时间桶的起始时间
+    """
+    step = GRANULARITIES[granularity][1]
+    starts = []
+    current = truncate(start, granularity)
+    while current < end:
+        starts.append(current)
+        current += step
+    return starts
+
+
+async def latency_histogram(queryset: QuerySet, group_by: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """
+    按延迟区间（以及额外的分组列）统计调用数和错误数
+
+    Args:
+        queryset: 已过滤的 ApiStat 查询集
+        group_by: 额外的分组列，可以是 queryset 上已有的注解
+
+    Returns:
+        每个 (分组列..., bin) 组合一行，包含 calls 和 errors
+    """
+    return await (
+        queryset.annotate(
+            bin=latency_bin_sql(),
+            calls=Count("id"),
+            errors=Count("id", _filter=Q(status_code__gte=400)),
+        )
+        .group_by(*group_by, "bin")
+        .values(*group_by, "bin", "calls", "errors")
+    )
+
+
+async def time_series(
+    queryset: QuerySet,
+    start: datetime,
+    end: datetime,
+    granularity: str,
+) -> List[Dict[str, Any]]:
+    """
+    按时间桶统计调用数、错误数和p95延迟，空的时间桶补零
+
+    Args:
+        queryset: ApiStat 查询集（可以已按端点等过滤）
+        start: 开始时间（包含）
+        end: 结束时间（不包含）
+        granularity: minute / hour / day
+    """
+    _, _, key_format, label_format = GRANULARITIES[granularity]
+    starts = bucket_starts(start, end, granularity)
+    rows = await latency_histogram(
+        queryset.filter(timestamp__gte=start, timestamp__lt=end).annotate(bucket=bucket_sql(granularity)),
+        group_by=("bucket",),
+    )
+
+    # 以 bucket_sql 的结果格式为键
+    buckets: Dict[str, Dict[str, Any]] = {
+        value.strftime(key_format): {"start": value, "calls": 0, "errors": 0, "histogram": {}}
+        for value in starts
+    }
+    for row in rows:
+        bucket = buckets.get(row["bucket"])
+        if bucket is None:
+            continue
+        bucket["calls"] += row["calls"]
+        bucket["errors"] += row["errors"]
+        bucket["histogram"][row["bin"]] = row["calls"]
+
+    return [
+        {
+            "bucket": bucket["start"].strftime(label_format),
+            "calls": bucket["calls"],
+            "errors": bucket["errors"],
+            "p95": percentile_from_histogram(bucket["histogram"], 95),
+        }
+        for bucket in buckets.values()
+    ]
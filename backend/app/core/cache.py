@@ -0,0 +1,153 @@
+"""
+进程内缓存模块
+
+提供带过期时间（TTL）和容量上限（LRU淘汰）的简单内存缓存，
+以及单个值的 stale-while-revalidate 缓存。
+缓存仅在当前worker进程内有效，适合短期缓存热点数据。
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    带TTL的LRU缓存
+
+    Args:
+        maxsize: 最大缓存条目数，超出时淘汰最久未使用的条目
+        ttl: 默认过期时间（秒）
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取缓存值，不存在或已过期时返回default"""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存值"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """删除缓存值"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取命中统计"""
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class SWRCache:
+    """
+    单个值的 stale-while-revalidate 缓存
+
+    - 未过期时直接返回缓存值
+    - 过期但未超过 max_stale 时返回旧值，同时在后台刷新
+    - 没有缓存值或旧值过老时同步加载
+    同一时刻最多只有一个加载任务，并发请求共享其结果。
+
+    Args:
+        loader: 加载最新值的异步函数
+        ttl: 缓存值被视为新鲜的时间（秒）
+        max_stale: 过期后仍可返回旧值的时间（秒）
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Any]], ttl: float, max_stale: float) -> None:
+        self.loader = loader
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._value: Any = None
+        self._loaded = False
+        self._expires_at = 0.0
+        self._stale_until = 0.0
+        self._generation = 0
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def _load(self) -> Any:
+        # 加载期间被标记失效时重新加载，避免把失效前读到的值当作新鲜值
+        while True:
+            generation = self._generation
+            value = await self.loader()
+            now = time.monotonic()
+            self._value = value
+            self._loaded = True
+            self._stale_until = now + self.ttl + self.max_stale
+            if generation == self._generation:
+                self._expires_at = now + self.ttl
+                return value
+
+    def _refresh(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._load())
+            self._task.add_done_callback(self._log_failure)
+        return self._task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"刷新缓存失败: {task.exception()}")
+
+    async def get(self) -> Any:
+        """获取缓存值"""
+        now = time.monotonic()
+        if not self._loaded or now >= self._stale_until:
+            self.misses += 1
+            return await asyncio.shield(self._refresh())
+        if now >= self._expires_at:
+            self.stale_hits += 1
+            self._refresh()
+        else:
+            self.hits += 1
+        return self._value
+
+    def invalidate(self) -> None:
+        """
+        标记缓存值已失效并立即在后台刷新（刷新完成前仍返回旧值）
+        """
+        self._generation += 1
+        self._expires_at = 0.0
+        if self._loaded:
+            try:
+                self._refresh()
+            except RuntimeError:
+                # 没有运行中的事件循环，下次读取时再刷新
+                pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取命中统计"""
+        return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses}
@@ -0,0 +1,202 @@
+"""
+聊天响应缓存模块
+
+访客经常重复问相同的问题，命中缓存时直接返回之前的回答，不再调用上游。
+缓存键是规范化后的消息列表的哈希（忽略大小写、多余空白和结尾标点），
+加上回答所依据的上下文版本（文章检索索引的构建时间），索引重建后旧的回答不再命中。
+缓存分两级：
+- 内存：每个worker独立的 LRU+TTL 缓存
+- 磁盘：本地SQLite文件，多个worker共享，进程重启后仍然有效
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT = " \t\n.,!?;:。，！？；：~～…"
+
+
+def normalize_content(content: Any) -> str:
+    """规范化单条消息内容"""
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False, sort_keys=True)
+    return _WHITESPACE_RE.sub(" ", content).strip().rstrip(_TRAILING_PUNCT).lower()
+
+
+def cache_key(messages: List[Dict[str, Any]], context: str = "") -> str:
+    """
+    计算消息列表的缓存键
+
+    Args:
+        messages: 消息列表
+        context: 上下文版本，不同版本的键互不相同
+    """
+    normalized = [
+        [str(message.get("role", "")), normalize_content(message.get("content", ""))]
+        for message in messages
+    ]
+    raw = json.dumps(normalized, ensure_ascii=False, separators=(",", ":"))
+    if context:
+        raw = f"{context}\x00{raw}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ChatResponseCache:
+    """
+    两级聊天响应缓存
+
+    清空缓存时会递增磁盘中的版本号，其他worker最多在 GENERATION_CHECK_INTERVAL 秒后
+    发现版本变化并清空自己的内存缓存。
+    """
+
+    GENERATION_CHECK_INTERVAL = 2.0
+
+    def __init__(self, path: str, maxsize: int, ttl: float) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._generation = None
+        self._generation_checked_at = 0.0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO chat_cache_meta (name, value) VALUES ('generation', 0)")
+            self._conn = conn
+        return self._conn
+
+    def _disk_generation(self) -> int:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM chat_cache_meta WHERE name = 'generation'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT response FROM chat_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _disk_set(self, key: str, response: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, now + self.ttl),
+            )
+            conn.execute("DELETE FROM chat_cache WHERE expires_at <= ?", (now,))
+
+    def _disk_purge(self) -> int:
+        with self._lock:
+            conn = self._connect()
+            deleted = conn.execute("DELETE FROM chat_cache").rowcount
+            conn.execute("UPDATE chat_cache_meta SET value = value + 1 WHERE name = 'generation'")
+        return deleted
+
+    async def _sync_generation(self) -> None:
+        now = time.monotonic()
+        if now - self._generation_checked_at < self.GENERATION_CHECK_INTERVAL:
+            return
+        self._generation_checked_at = now
+        generation = await asyncio.to_thread(self._disk_generation)
+        if self._generation is not None and generation != self._generation:
+            self._memory.clear()
+        self._generation = generation
+
+    async def get(self, messages: List[Dict[str, Any]], context: str = "") -> Optional[str]:
+        """
+        查找缓存的回答，未命中返回None
+
+        Args:
+            messages: 消息列表
+            context: 上下文版本，与写入缓存时的版本不同则不命中
+        """
+        key = cache_key(messages, context)
+        try:
+            await self._sync_generation()
+            response = self._memory.get(key)
+            if response is not None:
+                self.memory_hits += 1
+                return response
+            response = await asyncio.to_thread(self._disk_get, key)
+        except Exception as e:
+            logger.error(f"读取聊天缓存失败: {e}")
+            response = None
+        if response is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._memory.set(key, response)
+        return response
+
+    async def set(self, messages: List[Dict[str, Any]], response: str, context: str = "") -> None:
+        """
+        缓存回答
+        """
+        if not response:
+            return
+        key = cache_key(messages, context)
+        self._memory.set(key, response)
+        try:
+            await asyncio.to_thread(self._disk_set, key, response)
+        except Exception as e:
+            logger.error(f"写入聊天缓存失败: {e}")
+
+    async def purge(self) -> int:
+        """
+        清空所有缓存，返回删除的磁盘条目数
+        """
+        self._memory.clear()
+        deleted = await asyncio.to_thread(self._disk_purge)
+        self._generation = None
+        self._generation_checked_at = 0.0
+        return deleted
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取当前worker的命中统计"""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "enabled": settings.CHAT_CACHE_ENABLED,
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total * 100, 1) if total else 0,
+        }
+
+
+chat_cache = ChatResponseCache(
+    settings.CHAT_CACHE_PATH,
+    maxsize=settings.CHAT_CACHE_MEMORY_SIZE,
+    ttl=settings.CHAT_CACHE_TTL,
+)
@@ -0,0 +1,160 @@
+"""
+聊天上下文预算模块
+
+在调用上游之前控制消息列表的token数：
+- 保留系统提示词和最近的若干轮对话
+- 更早的对话按固定块大小折叠成一条摘要，摘要按内容哈希缓存，
+  对话变长时只需增量总结新折叠的部分
+token数用本地近似算法估算（中日韩字符约1个token，其他字符约4个一个token），不依赖分词器。
+"""
+import logging
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import TTLCache
+from app.core.chat_cache import cache_key
+from app.core.chat_scheduler import INTERNAL_KEY
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯＀-￯]")
+
+# 每条消息的格式开销（角色、分隔符等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = (
+    "请用简洁的中文总结下面这段对话中的关键信息（用户的问题、偏好、已给出的结论），"
+    "不超过200字，只输出摘要本身。"
+)
+
+_summary_cache = TTLCache(maxsize=settings.CHAT_CONTEXT_SUMMARY_CACHE_SIZE, ttl=24 * 3600)
+
+
+def estimate_tokens(text: Any) -> int:
+    """
+    估算文本的token数
+    """
+    if not isinstance(text, str):
+        text = str(text)
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """估算单条消息的token数"""
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _format_turns(messages: List[Dict[str, Any]]) -> str:
+    role_names = {"user": "用户", "assistant": "助手", "system": "系统"}
+    return "\n".join(
+        f"{role_names.get(m.get('role'), m.get('role'))}: {m.get('content', '')}" for m in messages
+    )
+
+
+def _extractive_summary(messages: List[Dict[str, Any]], base: Optional[str]) -> str:
+    """
+    上游不可用时的本地摘要：保留每条消息的开头部分
+    """
+    lines = [base] if base else []
+    lines.extend(
+        f"{m.get('role')}: {str(m.get('content', ''))[:80]}" for m in messages
+    )
+    summary = "\n".join(lines)
+    # 按token预算从头部截断，保留较新的内容
+    while estimate_tokens(summary) > settings.CHAT_CONTEXT_SUMMARY_MAX_TOKENS and "\n" in summary:
+        summary = summary.split("\n", 1)[1]
+    return summary
+
+
+async def _summarize(messages: List[Dict[str, Any]], base: Optional[str], client_key: str) -> str:
+    from app.core.llm import create_chat_completion
+
+    content = _format_turns(messages)
+    if base:
+        content = f"之前的摘要：\n{base}\n\n新的对话：\n{content}"
+    try:
+        response = await create_chat_completion(
+            [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": content},
+            ],
+            max_tokens=settings.CHAT_CONTEXT_SUMMARY_MAX_TOKENS,
+            client_key=client_key,
+        )
+        summary = (response.choices[0].message.content or "").strip()
+        if summary:
+            return summary
+    except Exception as e:
+        logger.warning(f"生成对话摘要失败，使用本地摘要: {e}")
+    return _extractive_summary(messages, base)
+
+
+async def summarize_turns(messages: List[Dict[str, Any]], client_key: str = INTERNAL_KEY) -> str:
+    """
+    获取一段对话的摘要（带缓存）
+
+    messages 的长度是块大小的整数倍，先查找最长的已缓存前缀摘要，
+    只对剩余部分做增量总结。生成摘要的上游调用按 client_key 排队。
+    """
+    key = cache_key(messages)
+    summary = _summary_cache.get(key)
+    if summary is not None:
+        return summary
+
+    block = settings.CHAT_CONTEXT_COMPACT_BLOCK
+    base, start = None, 0
+    for end in range(len(messages) - block, 0, -block):
+        base = _summary_cache.get(cache_key(messages[:end]))
+        if base is not None:
+            start = end
+            break
+
+    summary = await _summarize(messages[start:], base, client_key)
+    _summary_cache.set(key, summary)
+    return summary
+
+
+async def fit_context(messages: List[Dict[str, Any]], client_key: str = INTERNAL_KEY) -> List[Dict[str, Any]]:
+    """
+    按token预算裁剪消息列表
+
+    未超出预算时原样返回；否则把较早的对话折叠为摘要，
+    仍超出预算时再从最早的近期消息开始丢弃（至少保留最后一条）。
+
+    Args:
+        messages: 消息列表
+        client_key: 发起对话的客户端标识，生成摘要的上游调用计入该客户端的排队名额
+    """
+    budget = settings.CHAT_CONTEXT_MAX_TOKENS
+    if sum(estimate_message_tokens(m) for m in messages) <= budget:
+        return messages
+
+    # 开头的系统提示词始终保留
+    split = 0
+    while split < len(messages) and messages[split].get("role") == "system":
+        split += 1
+    system, history = messages[:split], messages[split:]
+
+    # 折叠点按块大小对齐，使摘要在多轮对话间可复用
+    block = settings.CHAT_CONTEXT_COMPACT_BLOCK
+    collapse = max(0, len(history) - settings.CHAT_CONTEXT_KEEP_RECENT) // block * block
+    old, recent = history[:collapse], history[collapse:]
+
+    compacted = list(system)
+    if old:
+        summary = await summarize_turns(old, client_key)
+        compacted.append({"role": "system", "content": f"以下是之前对话的摘要：\n{summary}"})
+
+    used = sum(estimate_message_tokens(m) for m in compacted)
+    while len(recent) > 1 and used + sum(estimate_message_tokens(m) for m in recent) > budget:
+        recent = recent[1:]
+
+    result = compacted + recent
+    logger.info(
+        f"聊天上下文已压缩: {len(messages)} 条消息 -> {len(result)} 条, "
+        f"折叠 {len(old)} 条为摘要"
+    )
+    return result
@@ -0,0 +1,456 @@
+"""
+聊天检索增强模块
+
+把已发布文章切分成段落块，用哈希TF-IDF向量化（纯NumPy，CPU运行，无网络），
+向量矩阵保存为内存映射文件，所有worker共享同一份索引。
+聊天时用用户最后一个问题检索最相关的若干块，作为系统消息注入提示词。
+
+文章内容变化时（通过模型信号检测）会在后台重建索引，
+其他worker检测到索引文件版本变化后重新映射。
+
+多个worker共享索引目录：构建时持有目录中的文件锁，同一时刻只有一个进程在写；
+每次构建的数据文件使用新的文件名，由元数据文件引用，最后原子地替换元数据文件，
+因此读取方看到的元数据和数据文件总是同一次构建的结果。
+"""
+import asyncio
+import importlib.util
+import json
+import logging
+import math
+import os
+import re
+import time
+import uuid
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from tortoise.signals import post_delete, post_save
+
+from app.core.config import settings
+from app.models.article import Article
+
+try:
+    import fcntl
+except ImportError:  # 非POSIX平台没有文件锁，只能依赖单进程部署
+    fcntl = None
+
+# numpy为可选依赖，导入耗时较长，在第一次构建或加载索引时才导入（见 _import_numpy）
+np = None
+_NUMPY_INSTALLED = importlib.util.find_spec("numpy") is not None
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+_CJK_RUN_RE = re.compile(r"[一-鿿㐀-䶿]+")
+
+META_FILE = "meta.json"
+LOCK_FILE = "build.lock"
+MATRIX_PREFIX = "matrix."
+IDF_PREFIX = "idf."
+DATA_SUFFIX = ".f32"
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：英文/数字按单词，中文按单字和相邻双字
+    """
+    text = text.lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RUN_RE.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _hashed_tf(text: str, dim: int) -> Dict[int, float]:
+    counts = Counter(zlib.crc32(token.encode("utf-8")) % dim for token in tokenize(text))
+    return {index: 1 + math.log(count) for index, count in counts.items()}
+
+
+def chunk_text(text: str, size: int) -> List[str]:
+    """
+    按段落切块，块长度不超过 size 个字符（过长的段落直接截断成多块）
+    """
+    chunks, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        while len(paragraph) > size:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:size])
+            paragraph = paragraph[size:]
+        if current and len(current) + len(paragraph) + 1 > size:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _fingerprint(article: Dict[str, Any]) -> int:
+    raw = f"{article['status']}\x00{article['title']}\x00{article['slug']}\x00{article['content']}"
+    return zlib.crc32(raw.encode("utf-8"))
+
+
+def _import_numpy() -> None:
+    global np
+    if np is None:
+        import numpy
+
+        np = numpy
+
+
+class ArticleIndex:
+    """
+    文章块的哈希TF-IDF索引
+    """
+
+    # 检查索引文件是否被其他worker更新的间隔（秒）
+    RELOAD_CHECK_INTERVAL = 5.0
+
+    def __init__(self, directory: str, dim: int) -> None:
+        self.directory = directory
+        self.dim = dim
+        # (矩阵, IDF, 块列表)，作为一个整体替换，检索线程读取时不会看到不同版本混在一起
+        self._data: Optional[Tuple[Any, Any, List[Dict[str, Any]]]] = None
+        self._chunks: List[Dict[str, Any]] = []
+        self._fingerprints: Dict[int, int] = {}
+        self._version: Optional[float] = None
+        self._built_at: Optional[float] = None
+        self._checked_at = 0.0
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._load_task: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> bool:
+        return _NUMPY_INSTALLED and settings.CHAT_RETRIEVAL_ENABLED
+
+    @property
+    def version(self) -> str:
+        """
+        当前加载的索引版本（构建时间），未加载索引时为空字符串
+
+        检索结果随索引变化，聊天回答缓存用它区分基于不同索引生成的回答。
+        """
+        return f"{self._built_at:.6f}" if self._built_at is not None else ""
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _build_lock(self) -> Iterator[None]:
+        """
+        跨进程的构建锁（阻塞等待）
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(LOCK_FILE), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _rebuild_files(self, articles: List[Dict[str, Any]], reuse_existing: bool) -> bool:
+        """
+        持有构建锁，构建并加载索引（在线程中执行）
+
+        Args:
+            articles: 已发布的文章
+            reuse_existing: 为True时先尝试加载已有索引（等锁期间可能已被其他worker构建好）
+
+        Returns:
+            是否执行了构建
+        """
+        with self._build_lock():
+            if reuse_existing:
+                try:
+                    self._load_files()
+                    return False
+                except Exception:
+                    pass
+            self._build_files(articles)
+            self._load_files()
+            return True
+
+    def _build_files(self, articles: List[Dict[str, Any]]) -> None:
+        """
+        计算向量矩阵并写入索引目录，调用方须持有构建锁
+        """
+        _import_numpy()
+        chunks, rows = [], []
+        for article in articles:
+            for text in chunk_text(article["content"], settings.CHAT_RETRIEVAL_CHUNK_CHARS):
+                chunks.append({
+                    "article_id": article["id"],
+                    "title": article["title"],
+                    "slug": article["slug"],
+                    "text": text,
+                })
+                rows.append(_hashed_tf(f"{article['title']}\n{text}", self.dim))
+
+        df = np.zeros(self.dim, dtype=np.float32)
+        for row in rows:
+            df[list(row.keys())] += 1
+        idf = (np.log((len(rows) + 1) / (df + 1)) + 1).astype(np.float32)
+
+        os.makedirs(self.directory, exist_ok=True)
+        build_id = f"{os.getpid()}-{uuid.uuid4().hex}"
+        matrix_file = f"{MATRIX_PREFIX}{build_id}{DATA_SUFFIX}"
+        idf_file = f"{IDF_PREFIX}{build_id}{DATA_SUFFIX}"
+        matrix = np.memmap(
+            self._path(matrix_file), dtype=np.float32, mode="w+", shape=(max(1, len(rows)), self.dim)
+        )
+        matrix[:] = 0
+        for i, row in enumerate(rows):
+            indices = np.fromiter(row.keys(), dtype=np.int64, count=len(row))
+            values = np.fromiter(row.values(), dtype=np.float32, count=len(row)) * idf[indices]
+            norm = np.linalg.norm(values)
+            if norm:
+                matrix[i, indices] = values / norm
+        matrix.flush()
+        del matrix
+
+        idf.tofile(self._path(idf_file))
+        previous = self._read_meta()
+        tmp_meta = self._path(f"{META_FILE}.{build_id}.tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": self.dim,
+                "rows": len(rows),
+                "built_at": time.time(),
+                "matrix_file": matrix_file,
+                "idf_file": idf_file,
+                "chunks": chunks,
+                "fingerprints": {str(a["id"]): _fingerprint(a) for a in articles},
+            }, f, ensure_ascii=False)
+        # 数据文件写完后再原子地替换元数据，元数据切换的瞬间新版本整体生效
+        os.replace(tmp_meta, self._path(META_FILE))
+
+        # 保留上一个版本的数据文件：其他worker可能刚读到旧的元数据，还没打开数据文件
+        keep = {matrix_file, idf_file}
+        if previous:
+            keep.update(previous.get(name) for name in ("matrix_file", "idf_file"))
+        for name in os.listdir(self.directory):
+            stale_data = name.startswith((MATRIX_PREFIX, IDF_PREFIX)) and name not in keep
+            # 被中断的构建留下的临时元数据文件
+            stale_meta = name.startswith(f"{META_FILE}.") and name.endswith(".tmp")
+            if stale_data or stale_meta:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(META_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load_files(self) -> None:
+        _import_numpy()
+        meta_path = self._path(META_FILE)
+        version = os.path.getmtime(meta_path)
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dim"] != self.dim:
+            raise ValueError(f"索引维度 {meta['dim']} 与配置 {self.dim} 不一致")
+        rows = max(1, meta["rows"])
+        # 数据文件名来自元数据，与元数据属于同一次构建
+        matrix = np.memmap(
+            self._path(meta["matrix_file"]), dtype=np.float32, mode="r", shape=(rows, self.dim)
+        )
+        idf = np.fromfile(self._path(meta["idf_file"]), dtype=np.float32)
+        if idf.shape[0] != self.dim:
+            raise ValueError(f"IDF文件长度 {idf.shape[0]} 与维度 {self.dim} 不一致")
+        self._data = (matrix, idf, meta["chunks"])
+        self._chunks = meta["chunks"]
+        self._fingerprints = {int(k): v for k, v in meta["fingerprints"].items()}
+        self._version = version
+        self._built_at = meta["built_at"]
+
+    async def rebuild(self, reuse_existing: bool = False) -> None:
+        """
+        从数据库重新构建索引
+
+        Args:
+            reuse_existing: 拿到构建锁后如果已有可用的索引则直接加载，不再构建
+        """
+        if not self.available:
+            return
+        articles = await Article.filter(status="published").order_by("id").values(
+            "id", "title", "slug", "content", "status"
+        )
+        start = time.perf_counter()
+        built = await asyncio.to_thread(self._rebuild_files, articles, reuse_existing)
+        if built:
+            logger.info(
+                f"文章检索索引已重建: {len(articles)} 篇文章, {len(self._chunks)} 个块, "
+                f"耗时 {time.perf_counter() - start:.2f}秒"
+            )
+        else:
+            logger.info(f"已加载其他worker构建的文章检索索引: {len(self._chunks)} 个块")
+
+    async def ensure_loaded(self) -> None:
+        """
+        启动时加载已有索引，不存在或无法加载时重建
+        """
+        if not self.available:
+            return
+        try:
+            await asyncio.to_thread(self._load_files)
+            logger.info(f"已加载文章检索索引: {len(self._chunks)} 个块")
+        except Exception:
+            # 多个worker同时启动时只有第一个拿到锁的worker构建，其余的加载它的结果
+            await self.rebuild(reuse_existing=True)
+
+    def load_in_background(self) -> None:
+        """
+        在后台执行 ensure_loaded，不阻塞启动；加载完成前检索返回空结果
+        """
+        if not self.available or self._load_task is not None:
+            return
+
+        async def load() -> None:
+            try:
+                await self.ensure_loaded()
+            except Exception as e:
+                logger.error(f"加载文章检索索引失败: {e}")
+
+        self._load_task = asyncio.create_task(load())
+
+    def _maybe_reload(self) -> None:
+        """
+        检查索引文件是否被其他worker更新（在线程中执行）
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.RELOAD_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            if os.path.getmtime(self._path(META_FILE)) != self._version:
+                self._load_files()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"重新加载文章检索索引失败: {e}")
+
+    def search(self, query: str, k: int) -> List[Dict[str, Any]]:
+        """
+        检索与查询最相关的k个块
+
+        会读取索引文件（检查更新、从内存映射中取列），应在线程中调用
+        """
+        if not self.available:
+            return []
+        self._maybe_reload()
+        data = self._data
+        if data is None or not data[2]:
+            return []
+        matrix, idf, chunks = data
+        row = _hashed_tf(query, self.dim)
+        if not row:
+            return []
+        indices = np.fromiter(row.keys(), dtype=np.int64, count=len(row))
+        values = np.fromiter(row.values(), dtype=np.float32, count=len(row)) * idf[indices]
+        norm = np.linalg.norm(values)
+        if not norm:
+            return []
+        # 查询向量是稀疏的，只需要取矩阵中对应的列
+        scores = matrix[:, indices] @ (values / norm)
+        top = np.argsort(-scores)[:k]
+        return [
+            {**chunks[i], "score": float(scores[i])}
+            for i in top
+            if scores[i] >= settings.CHAT_RETRIEVAL_MIN_SCORE
+        ]
+
+    def article_changed(self, article: Article) -> bool:
+        """判断文章的可检索内容是否与索引中的不同"""
+        published = article.status == "published"
+        old = self._fingerprints.get(article.id)
+        if not published:
+            return old is not None
+        return old != _fingerprint({
+            "status": article.status,
+            "title": article.title,
+            "slug": article.slug,
+            "content": article.content,
+        })
+
+    def schedule_rebuild(self) -> None:
+        """
+        延迟重建索引，短时间内的多次修改只重建一次
+        """
+        if not self.available:
+            return
+        if self._rebuild_task is not None and not self._rebuild_task.done():
+            return
+
+        async def delayed() -> None:
+            await asyncio.sleep(settings.CHAT_RETRIEVAL_REBUILD_DELAY)
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"重建文章检索索引失败: {e}")
+
+        self._rebuild_task = asyncio.create_task(delayed())
+
+
+article_index = ArticleIndex(settings.CHAT_RETRIEVAL_INDEX_DIR, settings.CHAT_RETRIEVAL_DIM)
+
+
+@post_save(Article)
+async def _on_article_save(sender, instance: Article, created, using_db, update_fields) -> None:
+    # 阅读量等字段的更新不影响检索内容，只在标题/正文/状态变化时重建
+    if article_index.article_changed(instance):
+        article_index.schedule_rebuild()
+
+
+@post_delete(Article)
+async def _on_article_delete(sender, instance: Article, using_db) -> None:
+    if instance.id in article_index._fingerprints:
+        article_index.schedule_rebuild()
+
+
+async def augment_with_articles(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    用最后一条用户消息检索文章，把相关内容作为系统消息插入到该消息之前
+    """
+    if not article_index.available:
+        return messages
+    last_user = next(
+        (i for i in range(len(messages) - 1, -1, -1) if messages[i].get("role") == "user"),
+        None,
+    )
+    if last_user is None:
+        return messages
+    query = messages[last_user].get("content")
+    if not isinstance(query, str) or not query.strip():
+        return messages
+
+    # 检查索引更新和从内存映射文件取列都涉及磁盘IO，放到线程中执行，不阻塞事件循环
+    results = await asyncio.to_thread(article_index.search, query, settings.CHAT_RETRIEVAL_TOP_K)
+    if not results:
+        return messages
+
+    context = "\n\n".join(
+        f"[{n}]《{r['title']}》(/articles/{r['slug']})\n{r['text']}"
+        for n, r in enumerate(results, 1)
+    )
+    reference = {
+        "role": "system",
+        "content": (
+            "以下是博客中与用户问题相关的文章片段，回答时可以参考并注明文章标题；"
+            f"如果片段与问题无关请忽略。\n\n{context}"
+        ),
+    }
+    return messages[:last_user] + [reference] + messages[last_user:]
@@ -0,0 +1,223 @@
+"""
+聊天调度模块
+
+控制每个worker同时进行的上游聊天请求数：
+- 名额用满后请求进入队列，按客户端（用户ID或IP）轮流放行，
+  单个客户端的大量请求不会饿死其他访客
+- 队列过深或单个客户端排队过多时直接拒绝（429 + Retry-After）
+- 排队超时的请求同样以429结束
+"""
+import asyncio
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+# 服务端内部调用（如生成对话摘要）使用的客户端标识，不受单客户端上限约束
+INTERNAL_KEY = "internal"
+
+
+class ChatTicket:
+    """
+    一次上游调用的排队凭证
+    """
+
+    __slots__ = ("key", "future", "enqueued_at", "granted_at", "released")
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.granted_at: Optional[float] = None
+        self.released = False
+
+    @property
+    def granted(self) -> bool:
+        return self.granted_at is not None
+
+
+class ChatScheduler:
+    """
+    带公平排队的并发控制器
+    """
+
+    # 最近等待时间样本数（用于统计分位数）
+    WAIT_SAMPLES = 1000
+
+    def __init__(self, limit: int, max_queue: int, max_per_client: int, queue_timeout: float) -> None:
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_per_client = max_per_client
+        self.queue_timeout = queue_timeout
+        self._queues: "OrderedDict[str, Deque[ChatTicket]]" = OrderedDict()
+        self._queued = 0
+        self._active = 0
+        self._per_client: Counter = Counter()
+        self._waits: Deque[float] = deque(maxlen=self.WAIT_SAMPLES)
+        # 单次调用占用名额时长的指数移动平均，用于估算 Retry-After
+        self._avg_service = 5.0
+        self.admitted = 0
+        self.shed = 0
+        self.timeouts = 0
+
+    def _reject(self, reason: str) -> HTTPException:
+        self.shed += 1
+        retry_after = math.ceil((self._queued + 1) / self.limit * self._avg_service)
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"{reason}，请稍后再试",
+            headers={"Retry-After": str(min(max(retry_after, 1), 60))},
+        )
+
+    def _grant(self, ticket: ChatTicket) -> None:
+        ticket.granted_at = time.monotonic()
+        self._active += 1
+        self._waits.append(ticket.granted_at - ticket.enqueued_at)
+        ticket.future.set_result(True)
+
+    def _dispatch(self) -> None:
+        # 按客户端轮询：取队首客户端的第一个请求，该客户端还有请求时移到队尾
+        while self._active < self.limit and self._queues:
+            key, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            self._grant(ticket)
+
+    def check(self, key: str) -> None:
+        """
+        检查是否会被拒绝（不占用名额），流式接口在返回响应头之前调用
+
+        Raises:
+            HTTPException: 队列已满或该客户端排队过多时返回429
+        """
+        if key != INTERNAL_KEY and self._per_client[key] >= self.max_per_client:
+            raise self._reject("您的聊天请求过多")
+        if self._active >= self.limit and self._queued >= self.max_queue:
+            raise self._reject("聊天服务繁忙")
+
+    def admit(self, key: str) -> ChatTicket:
+        """
+        申请一个上游名额，有空闲名额时立即获得，否则进入队列
+
+        Raises:
+            HTTPException: 队列已满或该客户端排队过多时返回429
+        """
+        self.check(key)
+        ticket = ChatTicket(key)
+        self._per_client[key] += 1
+        self.admitted += 1
+        if self._active < self.limit and not self._queued:
+            self._grant(ticket)
+        else:
+            self._queues.setdefault(key, deque()).append(ticket)
+            self._queued += 1
+        return ticket
+
+    async def wait(self, ticket: ChatTicket, timeout: Optional[float] = None) -> bool:
+        """
+        等待获得名额
+
+        Args:
+            ticket: admit 返回的凭证
+            timeout: 本次最多等待的秒数，用于在等待期间发送保活帧
+
+        Returns:
+            获得名额返回True，本次等待超时返回False
+
+        Raises:
+            HTTPException: 总排队时间超过 queue_timeout 时返回429
+        """
+        if ticket.granted:
+            return True
+        remaining = ticket.enqueued_at + self.queue_timeout - time.monotonic()
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(ticket.future),
+                remaining if timeout is None else min(timeout, remaining),
+            )
+            return True
+        except asyncio.TimeoutError:
+            if ticket.granted:
+                return True
+            if time.monotonic() - ticket.enqueued_at < self.queue_timeout:
+                return False
+        self.timeouts += 1
+        self.release(ticket)
+        raise self._reject("聊天排队超时")
+
+    def release(self, ticket: ChatTicket) -> None:
+        """
+        归还名额或退出队列（可重复调用）
+        """
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.granted:
+            self._active -= 1
+            service = time.monotonic() - ticket.granted_at
+            self._avg_service = 0.9 * self._avg_service + 0.1 * service
+        else:
+            queue = self._queues.get(ticket.key)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                self._queued -= 1
+                if not queue:
+                    del self._queues[ticket.key]
+        if not ticket.future.done():
+            ticket.future.cancel()
+        self._per_client[ticket.key] -= 1
+        if self._per_client[ticket.key] <= 0:
+            del self._per_client[ticket.key]
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, key: str = INTERNAL_KEY):
+        """
+        申请名额并在退出时归还（不发送保活帧的简单用法）
+        """
+        ticket = self.admit(key)
+        try:
+            await self.wait(ticket)
+            yield
+        finally:
+            self.release(ticket)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取当前worker的队列指标"""
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 1)
+
+        return {
+            "limit": self.limit,
+            "active": self._active,
+            "queued": self._queued,
+            "queued_clients": len(self._queues),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timeouts": self.timeouts,
+            "wait_ms_p50": percentile(0.5),
+            "wait_ms_p95": percentile(0.95),
+            "avg_service_seconds": round(self._avg_service, 2),
+        }
+
+
+chat_scheduler = ChatScheduler(
+    limit=settings.CHAT_MAX_CONCURRENCY,
+    max_queue=settings.CHAT_QUEUE_MAX_DEPTH,
+    max_per_client=settings.CHAT_QUEUE_MAX_PER_CLIENT,
+    queue_timeout=settings.CHAT_QUEUE_TIMEOUT,
+)
@@ -1,3 +1,8 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
@@ -5,8 +10,11 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from jose.exceptions import JWTError
 from pydantic import ValidationError
+from tortoise.signals import post_delete, post_save
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.revocation import revocation_store
 from app.models.user import User
 from app.schemas.token import TokenPayload
 
@@ -15,10 +23,163 @@ reusable_oauth2 = OAuth2PasswordBearer(
     auto_error=False  # 设置为False使令牌可选
 )
 
+logger = logging.getLogger(__name__)
+
+
+class Principal:
+    """
+    当前请求的用户身份
+
+    只包含鉴权需要的字段（id、用户名、角色），缓存在内存中，
+    需要完整用户数据的接口通过 get_user() 按需加载。
+    """
+    __slots__ = ("id", "username", "role", "_user")
+
+    def __init__(self, id: int, username: str, role: str) -> None:
+        self.id = id
+        self.username = username
+        self.role = role
+        self._user: Optional[User] = None
+
+    async def get_user(self) -> User:
+        """
+        加载完整的用户对象（同一请求内只查询一次）
+        """
+        if self._user is None:
+            user = await User.filter(id=self.id).first()
+            if not user:
+                raise HTTPException(status_code=404, detail="用户不存在")
+            self._user = user
+        return self._user
+
+    def __str__(self):
+        return self.username
+
+
+# 用户ID -> (id, username, role)，只缓存不可变的元组，每次请求生成新的Principal
+_principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL
+)
+
+
+class PrincipalGeneration:
+    """
+    身份缓存的跨worker版本号
+
+    保存在同一主机所有worker共享的SQLite文件中。用户被修改或删除时递增版本号，
+    其他worker读取身份缓存前最多每 CHECK_INTERVAL 秒检查一次，发现版本变化就清空
+    自己的身份缓存，被降级或删除的用户不会在其他worker中继续以旧角色通过鉴权。
+    读取版本号失败时同样清空缓存，宁可多查一次数据库。
+    """
+
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._generation: Optional[int] = None
+        self._checked_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS principal_cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO principal_cache_meta (name, value) VALUES ('generation', 0)")
+            self._conn = conn
+        return self._conn
+
+    def _disk_generation(self) -> int:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM principal_cache_meta WHERE name = 'generation'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def _disk_bump(self) -> int:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE principal_cache_meta SET value = value + 1 WHERE name = 'generation'")
+            row = conn.execute(
+                "SELECT value FROM principal_cache_meta WHERE name = 'generation'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    async def sync(self) -> None:
+        """
+        检查版本号，其他worker修改过用户时清空身份缓存
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            generation = await asyncio.to_thread(self._disk_generation)
+        except Exception as e:
+            logger.error(f"读取身份缓存版本号失败: {e}")
+            _principal_cache.clear()
+            self._generation = None
+            return
+        if self._generation is not None and generation != self._generation:
+            _principal_cache.clear()
+        self._generation = generation
+
+    async def bump(self) -> None:
+        """
+        递增版本号，通知其他worker清空身份缓存
+        """
+        try:
+            self._generation = await asyncio.to_thread(self._disk_bump)
+        except Exception as e:
+            logger.error(f"更新身份缓存版本号失败: {e}")
+
+
+principal_generation = PrincipalGeneration(settings.PRINCIPAL_CACHE_GENERATION_PATH)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """
+    使指定用户在当前worker中的身份缓存失效
+    """
+    _principal_cache.delete(int(user_id))
+
+
+@post_save(User)
+async def _invalidate_on_save(sender, instance: User, created, using_db, update_fields) -> None:
+    invalidate_principal(instance.id)
+    if not created:
+        await principal_generation.bump()
+
+
+@post_delete(User)
+async def _invalidate_on_delete(sender, instance: User, using_db) -> None:
+    invalidate_principal(instance.id)
+    await principal_generation.bump()
+
+
+async def get_principal(user_id: int) -> Optional[Principal]:
+    """
+    通过用户ID获取身份信息，优先读取缓存
+    """
+    await principal_generation.sync()
+    cached = _principal_cache.get(user_id)
+    if cached is None:
+        row = await User.filter(id=user_id).values_list("id", "username", "role")
+        if not row:
+            return None
+        cached = tuple(row[0])
+        _principal_cache.set(user_id, cached)
+    return Principal(*cached)
+
 
 async def get_current_user(
     token: str = Depends(reusable_oauth2)
-) -> User:
+) -> Principal:
     """
     获取当前用户
     """
@@ -27,21 +188,28 @@ async def get_current_user(
             token, settings.SECRET_KEY, algorithms=["HS256"]
         )
         token_data = TokenPayload(**payload)
-    except (JWTError, ValidationError):
+        user_id = int(token_data.sub)
+    except (JWTError, ValidationError, TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="无法验证凭据",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = await User.filter(id=token_data.sub).first()
-    if not user:
+    if revocation_store.is_revoked(token_data.jti):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="令牌已失效",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    principal = await get_principal(user_id)
+    if not principal:
         raise HTTPException(status_code=404, detail="用户不存在")
-    return user
+    return principal
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     """
     获取当前活跃用户
     """
@@ -49,8 +217,8 @@ async def get_current_active_user(
 
 
 async def get_current_active_superuser(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     """
     获取当前活跃超级用户
     """
@@ -64,20 +232,21 @@ async def get_current_active_superuser(
 
 async def get_optional_user(
     token: Optional[str] = Depends(reusable_oauth2)
-) -> Optional[User]:
+) -> Optional[Principal]:
     """
     获取当前用户（可选的）
-    如果提供了有效令牌，返回用户对象；否则返回None
+    如果提供了有效令牌，返回用户身份；否则返回None
     """
     if not token:
         return None
-    
+
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=["HS256"]
         )
         token_data = TokenPayload(**payload)
-        user = await User.filter(id=token_data.sub).first()
-        return user
-    except (JWTError, ValidationError):
-        return None 
\ No newline at end of file
+        if revocation_store.is_revoked(token_data.jti):
+            return None
+        return await get_principal(int(token_data.sub))
+    except (JWTError, ValidationError, TypeError, ValueError):
+        return None
@@ -0,0 +1,62 @@
+"""
+进程内事件总线
+
+业务代码在数据变更后发布事件（如 "article.created"），订阅者在后台任务中处理，
+不阻塞请求。处理函数抛出的异常只记录日志，不影响发布方和其他订阅者。
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class EventBus:
+    """
+    简单的发布/订阅事件总线
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def subscribe(self, event: str, handler: Handler) -> None:
+        """注册事件处理函数"""
+        self._handlers[event].append(handler)
+
+    def on(self, *events: str) -> Callable[[Handler], Handler]:
+        """
+        以装饰器形式注册事件处理函数，可同时订阅多个事件
+        """
+        def decorator(handler: Handler) -> Handler:
+            for event in events:
+                self.subscribe(event, handler)
+            return handler
+        return decorator
+
+    async def _dispatch(self, event: str, handler: Handler, payload: Dict[str, Any]) -> None:
+        try:
+            await handler(event, **payload)
+        except Exception as e:
+            logger.error(f"处理事件 {event} 失败 ({handler.__qualname__}): {e}")
+
+    def publish(self, event: str, **payload: Any) -> None:
+        """
+        发布事件，每个订阅者在独立的后台任务中执行
+        """
+        for handler in self._handlers.get(event, ()):
+            task = asyncio.create_task(self._dispatch(event, handler, payload))
+            # 保留任务引用，避免执行完之前被垃圾回收
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def drain(self) -> None:
+        """等待所有进行中的处理函数完成（关闭应用前调用）"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+event_bus = EventBus()
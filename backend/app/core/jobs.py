@@ -0,0 +1,132 @@
+"""
+内置定时任务
+
+- stats_refresh：全量重算网站统计数据（leader）
+- revocation_prune：删除数据库中已过期的吊销令牌记录（leader）
+- upload_gc：删除上传目录中没有被任何文章、项目或用户引用的文件（leader）
+- view_count_flush：把缓冲的文章阅读量写入数据库（每个worker）
+- task_queue_prune：删除后台任务队列中已完成的旧任务（leader）
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import List, Set, Tuple
+
+from app.core.config import settings
+from app.core.revocation import revocation_store
+from app.core.scheduler import Scheduler
+from app.core.task_queue import task_queue
+from app.core.update_stats import update_all_stats
+from app.core.view_counts import view_counts
+from app.models.article import Article
+from app.models.project import Project
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# 上传文件的子目录，与 app.api.uploads 中的URL对应：/api/uploads/<子目录>/<文件名>
+UPLOAD_SUBDIRS = ("avatars", "images")
+_UPLOAD_REFERENCE = re.compile(r"/uploads/(avatars|images)/([\w.\-]+)")
+
+
+async def refresh_stats() -> None:
+    """全量重算统计数据"""
+    result = await update_all_stats()
+    if not result["success"]:
+        raise RuntimeError(result["message"])
+
+
+async def prune_tasks() -> None:
+    """删除已完成的旧后台任务"""
+    await task_queue.prune(settings.TASK_QUEUE_RETENTION_HOURS)
+
+
+async def _referenced_uploads() -> Set[Tuple[str, str]]:
+    texts: List[str] = []
+    for cover_image, content in await Article.all().values_list("cover_image", "content"):
+        texts.extend((cover_image or "", content or ""))
+    for image_url, description in await Project.all().values_list("image_url", "description"):
+        texts.extend((image_url or "", description or ""))
+    texts.extend(url or "" for url in await User.all().values_list("avatar_url", flat=True))
+    return {match for text in texts for match in _UPLOAD_REFERENCE.findall(text)}
+
+
+def _orphan_files(referenced: Set[Tuple[str, str]], min_age: float) -> List[str]:
+    cutoff = time.time() - min_age
+    orphans = []
+    for subdir in UPLOAD_SUBDIRS:
+        directory = os.path.join(settings.UPLOAD_DIR, subdir)
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if (
+                    entry.is_file()
+                    and (subdir, entry.name) not in referenced
+                    and entry.stat().st_mtime < cutoff
+                ):
+                    orphans.append(entry.path)
+    return orphans
+
+
+async def collect_upload_garbage() -> None:
+    """
+    删除没有被引用的上传文件
+
+    只删除上传超过 UPLOAD_GC_MIN_AGE_HOURS 小时的文件，刚上传、还未保存到文章中的图片不受影响。
+    """
+    referenced = await _referenced_uploads()
+    orphans = await asyncio.to_thread(_orphan_files, referenced, settings.UPLOAD_GC_MIN_AGE_HOURS * 3600)
+    for path in orphans:
+        try:
+            await asyncio.to_thread(os.remove, path)
+            logger.info(f"已删除未引用的上传文件: {path}")
+        except FileNotFoundError:
+            pass
+    if orphans:
+        logger.info(f"上传文件清理完成，删除 {len(orphans)} 个文件")
+
+
+def register_jobs(scheduler: Scheduler) -> None:
+    """注册内置定时任务（已注册时跳过）"""
+    if "stats_refresh" in scheduler.jobs:
+        return
+    scheduler.add_job(
+        "stats_refresh",
+        refresh_stats,
+        interval=settings.STATS_RECONCILE_INTERVAL,
+        timeout=120,
+        leader_only=True,
+        run_at_start=True,
+    )
+    scheduler.add_job(
+        "revocation_prune",
+        revocation_store.prune_database,
+        interval=settings.TOKEN_REVOCATION_PRUNE_INTERVAL,
+        timeout=60,
+        leader_only=True,
+    )
+    scheduler.add_job(
+        "upload_gc",
+        collect_upload_garbage,
+        cron=settings.UPLOAD_GC_CRON,
+        timeout=600,
+        leader_only=True,
+    )
+    scheduler.add_job(
+        "task_queue_prune",
+        prune_tasks,
+        interval=3600,
+        timeout=120,
+        leader_only=True,
+    )
+    if view_counts.enabled:
+        scheduler.add_job(
+            "view_count_flush",
+            view_counts.flush,
+            interval=settings.VIEW_COUNT_FLUSH_INTERVAL,
+            jitter=settings.VIEW_COUNT_FLUSH_INTERVAL / 2,
+            timeout=30,
+        )
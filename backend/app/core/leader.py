@@ -0,0 +1,203 @@
+"""
+worker选主模块
+
+多个uvicorn worker（可以在不同主机上）共用数据库中的一条租约记录选出一个leader，
+只有leader执行一次性的初始化和后台维护任务，其余worker启动后直接处理请求：
+- 获取租约：租约不存在、已过期或本来就属于自己时，把租约更新为自己并延长有效期
+- leader每隔 LEADER_RENEW_INTERVAL 秒续约，其余worker以同样的间隔尝试接管
+- leader进程退出时租约最迟 LEADER_LEASE_TTL 秒后过期，由其他worker接管；正常关闭时立即释放
+- leader续约失败（数据库不可用等）且本地记录的租约已到期时主动退位，停止leader任务
+
+租约表见 app/db/migrations/0004_leader_lease.py。有效期使用各主机的系统时间比较，
+各主机的时钟偏差应远小于 LEADER_LEASE_TTL。
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from tortoise import connections
+from tortoise.exceptions import IntegrityError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# leader任务：当选时执行，退位时取消
+LeaderTask = Callable[[], Awaitable[Any]]
+
+
+class LeaderElection:
+    """
+    基于数据库租约的选主
+
+    Args:
+        name: 租约名称
+        enabled: 为False时当前进程总是leader（单进程部署）
+        ttl: 租约有效期（秒）
+        renew_interval: 续约/尝试接管的间隔（秒）
+    """
+
+    def __init__(self, name: str, enabled: bool, ttl: float, renew_interval: float) -> None:
+        self.name = name
+        self.enabled = enabled
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self.elected_at: Optional[float] = None
+        self.terms = 0
+        self._lease_deadline = 0.0
+        self._inits: List[Tuple[str, LeaderTask]] = []
+        self._tasks: List[Tuple[str, LeaderTask]] = []
+        self._running: List[asyncio.Task] = []
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def add_init(self, name: str, task: LeaderTask) -> None:
+        """
+        注册一次性初始化：当选时按注册顺序执行完，再启动后台任务
+
+        每次当选（包括接管）都会重新执行，需要可以重复执行。同名的注册会被替换。
+        """
+        self._inits = [item for item in self._inits if item[0] != name] + [(name, task)]
+
+    def add_task(self, name: str, task: LeaderTask) -> None:
+        """注册长期运行的后台任务：当选时在后台启动，退位时取消。同名的注册会被替换"""
+        self._tasks = [item for item in self._tasks if item[0] != name] + [(name, task)]
+
+    async def _run_task(self, name: str, task: LeaderTask) -> None:
+        try:
+            await task()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"leader任务 {name} 执行失败: {e}")
+
+    async def _elected(self) -> None:
+        self.is_leader = True
+        self.elected_at = time.time()
+        self.terms += 1
+        logger.info(f"当前worker ({self.owner}) 成为leader，启动 {len(self._tasks)} 个leader任务")
+        for name, task in self._inits:
+            await self._run_task(name, task)
+        # 使用空的上下文，leader任务不继承当选时所在任务的上下文变量
+        self._running = [
+            asyncio.create_task(
+                self._run_task(name, task), name=f"leader:{name}", context=contextvars.Context()
+            )
+            for name, task in self._tasks
+        ]
+
+    async def _demoted(self) -> None:
+        self.is_leader = False
+        self.elected_at = None
+        running, self._running = self._running, []
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    async def _try_acquire(self) -> bool:
+        connection = connections.get("default")
+        param = "%s" if connection.capabilities.dialect == "mysql" else "?"
+        now_ms = int(time.time() * 1000)
+        expires_ms = now_ms + int(self.ttl * 1000)
+        updated, _ = await connection.execute_query(
+            f"UPDATE leader_lease SET owner = {param}, expires_at = {param} "
+            f"WHERE name = {param} AND (owner = {param} OR expires_at < {param})",
+            [self.owner, expires_ms, self.name, self.owner, now_ms],
+        )
+        if not updated:
+            try:
+                await connection.execute_query(
+                    f"INSERT INTO leader_lease (name, owner, expires_at) VALUES ({param}, {param}, {param})",
+                    [self.name, self.owner, expires_ms],
+                )
+            except IntegrityError:
+                return False
+        return True
+
+    async def _release(self) -> None:
+        connection = connections.get("default")
+        param = "%s" if connection.capabilities.dialect == "mysql" else "?"
+        await connection.execute_query(
+            f"DELETE FROM leader_lease WHERE name = {param} AND owner = {param}",
+            [self.name, self.owner],
+        )
+
+    async def _campaign(self) -> None:
+        started = time.monotonic()
+        try:
+            acquired = await self._try_acquire()
+        except Exception as e:
+            logger.error(f"续约/获取leader租约失败: {e}")
+            # 无法确认租约时，在本地记录的租约到期前保持现状
+            acquired = self.is_leader and time.monotonic() < self._lease_deadline
+        if acquired:
+            self._lease_deadline = started + self.ttl
+            if not self.is_leader:
+                await self._elected()
+        elif self.is_leader:
+            logger.warning(f"当前worker ({self.owner}) 失去leader租约，停止leader任务")
+            await self._demoted()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            await self._campaign()
+
+    async def start(self) -> None:
+        """
+        立即参与一次选举并启动续约/接管任务
+
+        当选时等待一次性初始化执行完再返回，后台任务不阻塞调用方。
+        """
+        if self.is_leader or self._loop_task is not None:
+            return
+        if not self.enabled:
+            await self._elected()
+            return
+        await self._campaign()
+        self._loop_task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def stop(self) -> None:
+        """停止leader任务并释放租约，其他worker在下一次尝试时接管"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        if self.is_leader:
+            await self._demoted()
+            if self.enabled:
+                try:
+                    await self._release()
+                except Exception as e:
+                    logger.error(f"释放leader租约失败: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取当前worker的选主状态"""
+        return {
+            "enabled": self.enabled,
+            "worker": self.owner,
+            "is_leader": self.is_leader,
+            "elected_at": (
+                datetime.fromtimestamp(self.elected_at).isoformat(timespec="seconds") if self.elected_at else None
+            ),
+            "terms": self.terms,
+            "tasks": [name for name, _ in self._inits + self._tasks],
+            "running": [task.get_name() for task in self._running if not task.done()],
+        }
+
+
+leader_election = LeaderElection(
+    name="app",
+    enabled=settings.LEADER_ELECTION_ENABLED,
+    ttl=settings.LEADER_LEASE_TTL,
+    renew_interval=settings.LEADER_RENEW_INTERVAL,
+)
@@ -0,0 +1,93 @@
+"""
+大模型客户端模块
+
+所有聊天接口共用一个异步客户端：底层httpx连接池复用TLS连接，
+并通过聊天调度器限制每个worker同时进行的上游请求数。
+
+openai 和 httpx 的导入耗时占应用导入时间的很大一部分，不在模块顶层导入：
+启动后在线程池中预先导入（见 preload_in_background），首次创建客户端时直接使用。
+"""
+import asyncio
+import importlib
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from app.core.chat_scheduler import INTERNAL_KEY, chat_scheduler
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+_client: Optional["AsyncOpenAI"] = None
+
+
+def _import_client_modules() -> None:
+    importlib.import_module("httpx")
+    importlib.import_module("openai")
+
+
+def preload_in_background() -> None:
+    """
+    在线程池中预先导入 openai 和 httpx，第一个聊天请求不需要在事件循环中执行耗时的导入
+    """
+    asyncio.get_running_loop().run_in_executor(None, _import_client_modules)
+
+
+def get_chat_client() -> "AsyncOpenAI":
+    """
+    获取共享的异步大模型客户端（首次调用时创建）
+    """
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.CHAT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CHAT_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.CHAT_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.CHAT_TIMEOUT,
+                connect=settings.CHAT_CONNECT_TIMEOUT,
+                pool=settings.CHAT_POOL_TIMEOUT,
+            ),
+        )
+        _client = AsyncOpenAI(
+            api_key=settings.DEEPSEEK_API_KEY,
+            base_url=settings.DEEPSEEK_BASE_URL,
+            max_retries=settings.CHAT_MAX_RETRIES,
+            http_client=http_client,
+        )
+    return _client
+
+
+async def create_chat_completion(
+    messages: List[Dict[str, Any]],
+    client_key: str = INTERNAL_KEY,
+    **kwargs,
+) -> Any:
+    """
+    调用上游非流式对话接口
+
+    Args:
+        messages: 消息列表
+        client_key: 排队使用的客户端标识（用户或IP），默认为服务端内部调用
+    """
+    async with chat_scheduler.slot(client_key):
+        return await get_chat_client().chat.completions.create(
+            model=settings.DEEPSEEK_MODEL,
+            messages=messages,
+            **kwargs,
+        )
+
+
+async def close_chat_client() -> None:
+    """关闭共享客户端及其连接池"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,247 @@
+"""
+令牌桶限流模块
+
+提供按客户端IP和用户名对登录请求限流的令牌桶实现。
+桶状态保存在可替换的后端中：
+- memory: 进程内字典，仅对当前worker生效
+- sqlite: 本地SQLite文件，同一主机上的多个uvicorn worker共享；启动时由leader清空
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# 令牌桶：(键, 容量即允许的突发次数, 每秒补充的令牌数)
+Bucket = Tuple[str, int, float]
+
+
+def _refill(tokens: float, updated_at: float, now: float, capacity: int, refill_rate: float) -> float:
+    """按经过的时间补充令牌，返回当前的令牌数"""
+    return min(capacity, tokens + (now - updated_at) * refill_rate)
+
+
+def _take_all(
+    buckets: Sequence[Bucket], states: Sequence[Optional[Tuple[float, float]]], now: float
+) -> Tuple[Optional[int], float, List[float]]:
+    """
+    检查所有桶，全部有令牌时才各取一个
+
+    Args:
+        buckets: 令牌桶
+        states: 各桶上次更新后的 (剩余令牌数, 更新时间)，不存在时为None
+
+    Returns:
+        (第一个没有令牌的桶的下标，全部允许时为None, 需要等待的秒数, 取走令牌后各桶的令牌数)
+    """
+    remaining = []
+    for index, ((_, capacity, refill_rate), state) in enumerate(zip(buckets, states)):
+        tokens = _refill(*(state or (capacity, now)), now, capacity, refill_rate)
+        if tokens < 1:
+            return index, (1 - tokens) / refill_rate, []
+        remaining.append(tokens - 1)
+    return None, 0.0, remaining
+
+
+class MemoryRateLimitBackend:
+    """
+    进程内令牌桶后端
+
+    键（如用户名）由客户端决定，定期清除已经补满的桶，桶数超过上限时淘汰最久未使用的桶。
+    """
+
+    # 每处理多少次请求清理一次已补满的桶
+    PRUNE_EVERY = 1000
+
+    def __init__(self, max_buckets: int = 100_000) -> None:
+        self.max_buckets = max_buckets
+        # 键 -> (剩余令牌数, 更新时间, 容量, 每秒补充的令牌数)，按最近使用的顺序排列
+        self._buckets: "OrderedDict[str, Tuple[float, float, int, float]]" = OrderedDict()
+        self._calls = 0
+
+    def _prune(self, now: float) -> None:
+        full = [
+            key
+            for key, (tokens, updated_at, capacity, refill_rate) in self._buckets.items()
+            if _refill(tokens, updated_at, now, capacity, refill_rate) >= capacity
+        ]
+        for key in full:
+            del self._buckets[key]
+
+    async def take_all(self, buckets: Sequence[Bucket]) -> Tuple[Optional[int], float]:
+        now = time.monotonic()
+        states = [self._buckets[key][:2] if key in self._buckets else None for key, _, _ in buckets]
+        rejected, retry_after, remaining = _take_all(buckets, states, now)
+        if rejected is None:
+            for (key, capacity, refill_rate), tokens in zip(buckets, remaining):
+                self._buckets[key] = (tokens, now, capacity, refill_rate)
+                self._buckets.move_to_end(key)
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            self._prune(now)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return rejected, retry_after
+
+    async def reset(self) -> None:
+        self._buckets.clear()
+
+
+class SQLiteRateLimitBackend:
+    """
+    基于本地SQLite文件的令牌桶后端
+
+    使用 BEGIN IMMEDIATE 事务保证多个worker进程对同一组桶的读改写是原子的。
+    SQLite调用在线程池中执行，不阻塞事件循环。
+    """
+
+    # 每处理多少次请求清理一次长时间未使用的桶
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._calls = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _take_all(self, buckets: Sequence[Bucket]) -> Tuple[Optional[int], float]:
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                states = [
+                    conn.execute(
+                        "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                    ).fetchone()
+                    for key, _, _ in buckets
+                ]
+                rejected, retry_after, remaining = _take_all(buckets, states, now)
+                if rejected is None:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at) "
+                        "VALUES (?, ?, ?)",
+                        [(key, tokens, now) for (key, _, _), tokens in zip(buckets, remaining)],
+                    )
+                self._calls += 1
+                if self._calls % self.PRUNE_EVERY == 0:
+                    conn.execute(
+                        "DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - 86400,)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return rejected, retry_after
+
+    async def take_all(self, buckets: Sequence[Bucket]) -> Tuple[Optional[int], float]:
+        return await asyncio.to_thread(self._take_all, buckets)
+
+    def _reset(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM rate_limit_buckets")
+
+    async def reset(self) -> None:
+        await asyncio.to_thread(self._reset)
+
+
+class LoginRateLimiter:
+    """
+    登录限流器
+
+    同时按客户端IP和用户名维护令牌桶，两个桶都有令牌时才放行并各取一个，
+    被拒绝的请求不消耗任何一个桶的令牌。按维度统计被拒绝的次数。
+    限流后端故障时改用当前worker的内存桶，不会放开限流。
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self.fallback = MemoryRateLimitBackend()
+        self.rejected: Counter = Counter()
+
+    async def check(self, client_ip: str, username: str) -> None:
+        """
+        检查登录请求是否超限
+
+        Raises:
+            HTTPException: 超限时返回429，并在Retry-After头中给出等待秒数
+        """
+        scopes = ["ip", "username"]
+        buckets: List[Bucket] = [
+            (
+                f"ip:{client_ip}",
+                settings.LOGIN_RATE_LIMIT_IP_BURST,
+                settings.LOGIN_RATE_LIMIT_IP_PER_MINUTE / 60,
+            ),
+            (
+                f"user:{username.strip().lower()[:100]}",
+                settings.LOGIN_RATE_LIMIT_USER_BURST,
+                settings.LOGIN_RATE_LIMIT_USER_PER_MINUTE / 60,
+            ),
+        ]
+        try:
+            rejected, retry_after = await self.backend.take_all(buckets)
+        except Exception as e:
+            logger.error(f"登录限流检查失败，改用当前worker的内存限流: {e}")
+            rejected, retry_after = await self.fallback.take_all(buckets)
+        if rejected is not None:
+            self.rejected[scopes[rejected]] += 1
+            logger.warning(f"登录请求被限流: {buckets[rejected][0]}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="登录尝试过于频繁，请稍后再试",
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+            )
+
+    async def reset(self) -> None:
+        """
+        清空所有桶（由管理员接口调用）
+
+        SQLite后端清空的是当前主机上的状态文件，内存后端和回退桶只清空当前worker。
+        """
+        await self.fallback.reset()
+        try:
+            await self.backend.reset()
+        except Exception as e:
+            logger.error(f"清空登录限流状态失败: {e}")
+            raise
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取当前worker的拒绝次数统计"""
+        return {
+            "rejected_by_ip": self.rejected["ip"],
+            "rejected_by_username": self.rejected["username"],
+            "rejected_total": sum(self.rejected.values()),
+        }
+
+
+def create_backend():
+    """根据配置创建限流后端"""
+    if settings.LOGIN_RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimitBackend(settings.LOGIN_RATE_LIMIT_SQLITE_PATH)
+    return MemoryRateLimitBackend()
+
+
+login_rate_limiter = LoginRateLimiter(create_backend())
@@ -0,0 +1,192 @@
+"""
+令牌吊销模块
+
+已吊销令牌的 jti 持久化在 revoked_tokens 表中，启动时加载到内存。
+请求路径上只做内存查询：先查布隆过滤器，命中后再查精确集合，不访问数据库。
+后台任务定期从数据库增量同步其他worker新增的吊销记录，并清理已过期的记录：
+- 增量同步按自增ID水位读取新记录，并重读最近 TOKEN_REVOCATION_SYNC_OVERLAP 秒内创建的记录，
+  ID较小但提交较晚的记录（并发事务）不会因为水位已越过它而被漏掉
+- 每隔 TOKEN_REVOCATION_PRUNE_INTERVAL 秒再全量同步一次未过期的记录，作为兜底
+
+没有 jti 的令牌（引入吊销功能之前签发的令牌）无法吊销，只能等待其过期。
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import Q
+
+from app.core.config import settings
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    布隆过滤器
+
+    Args:
+        capacity: 预期元素数量
+        error_rate: 期望的误判率
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationStore:
+    """
+    令牌吊销存储
+
+    内存中保存 jti -> 过期时间戳 的精确映射，以及用于快速排除的布隆过滤器。
+    布隆过滤器不支持删除，清理过期记录或元素数超过容量时整体重建。
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._revoked: Dict[str, float] = {}
+        self._bloom = BloomFilter(capacity)
+        self._last_id = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _add_local(self, jti: str, expires_at: float) -> None:
+        if jti in self._revoked:
+            return
+        self._revoked[jti] = expires_at
+        if len(self._revoked) > self._bloom.capacity:
+            self._rebuild()
+        else:
+            self._bloom.add(jti)
+
+    def _rebuild(self) -> None:
+        capacity = max(self._capacity, len(self._revoked) * 2)
+        bloom = BloomFilter(capacity)
+        for jti in self._revoked:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """
+        判断令牌是否已吊销（纯内存查询）
+        """
+        if not jti or jti not in self._bloom:
+            return False
+        return jti in self._revoked
+
+    async def revoke(self, jti: str, expires_at: datetime, user_id: Optional[int] = None) -> None:
+        """
+        吊销令牌：写入数据库并立即在当前worker生效
+        """
+        try:
+            await RevokedToken.create(jti=jti, user_id=user_id, expires_at=expires_at)
+        except IntegrityError:
+            # 已经吊销过
+            pass
+        self._add_local(jti, expires_at.timestamp())
+
+    async def sync(self, full: bool = False) -> None:
+        """
+        从数据库加载新的吊销记录
+
+        Args:
+            full: 为True时读取所有未过期的记录，否则只读取水位之后和最近创建的记录
+        """
+        now = datetime.now(timezone.utc)
+        if full:
+            query = RevokedToken.filter(expires_at__gt=now)
+        else:
+            since = now - timedelta(seconds=settings.TOKEN_REVOCATION_SYNC_OVERLAP)
+            query = RevokedToken.filter(Q(id__gt=self._last_id) | Q(created_at__gte=since))
+        rows = await query.order_by("id").values_list("id", "jti", "expires_at")
+        now_ts = now.timestamp()
+        for row_id, jti, expires_at in rows:
+            self._last_id = max(self._last_id, row_id)
+            expires_ts = expires_at.timestamp()
+            if expires_ts > now_ts:
+                self._add_local(jti, expires_ts)
+
+    def prune(self) -> None:
+        """
+        清理内存中已过期的吊销记录
+        """
+        now = time.time()
+        expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+        for jti in expired:
+            del self._revoked[jti]
+        if expired:
+            self._rebuild()
+            logger.info(f"已清理内存中过期的吊销令牌 {len(expired)} 条")
+
+    async def prune_database(self) -> None:
+        """
+        删除数据库中已过期的吊销记录（由leader定期执行，见 app.core.jobs）
+        """
+        deleted = await RevokedToken.filter(expires_at__lte=datetime.now(timezone.utc)).delete()
+        if deleted:
+            logger.info(f"已删除数据库中过期的吊销令牌 {deleted} 条")
+
+    async def load(self) -> None:
+        """
+        启动时加载所有未过期的吊销记录
+        """
+        self._revoked.clear()
+        self._last_id = 0
+        self._rebuild()
+        await self.sync(full=True)
+        logger.info(f"已加载吊销令牌 {len(self._revoked)} 条")
+
+    async def _run(self) -> None:
+        last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(settings.TOKEN_REVOCATION_SYNC_INTERVAL)
+            try:
+                if time.monotonic() - last_prune >= settings.TOKEN_REVOCATION_PRUNE_INTERVAL:
+                    self.prune()
+                    await self.sync(full=True)
+                    last_prune = time.monotonic()
+                else:
+                    await self.sync()
+            except Exception as e:
+                logger.error(f"同步吊销令牌失败: {e}")
+
+    async def start(self) -> None:
+        """加载吊销记录并启动后台同步任务"""
+        await self.load()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台同步任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+revocation_store = RevocationStore(settings.TOKEN_REVOCATION_BLOOM_CAPACITY)
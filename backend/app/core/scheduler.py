@@ -0,0 +1,285 @@
+"""
+定时任务调度模块
+
+在应用的事件循环中运行的轻量调度器：
+- 调度方式：固定间隔（秒）或 cron 表达式（分 时 日 月 周，本地时间）
+- 每次调度可加随机抖动，避免多个worker在同一时刻执行
+- 单次执行超时后取消；上一次执行尚未结束时跳过本次调度，不会重叠执行
+- leader_only 的任务只在leader上运行（见 app.core.leader），其余任务每个worker都运行
+- 每个任务保留最近的执行记录（触发方式、开始时间、耗时、结果）
+
+内置任务见 app.core.jobs。
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# cron 各字段的取值范围：分、时、日、月、周（0和7都表示周日）
+_CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_cron_field(text: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in text.split(","):
+        part, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step < 1:
+            raise ValueError(f"cron 步长必须大于0: {text}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(value) for value in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step_text else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"cron 字段超出范围 {low}-{high}: {text}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    cron 表达式：分 时 日 月 周，支持 *、a-b、a,b 和 /n 步长
+
+    日和周都不是 * 时，两者满足其一即可（与标准 cron 相同）。
+    """
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 表达式需要5个字段: {expression}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(text, low, high) for text, (low, high) in zip(fields, _CRON_FIELDS)
+        )
+        # cron 中0为周日，转换成 datetime.weekday() 的编号（0为周一）
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = moment.weekday() in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """moment 之后（不含）的下一个触发时间"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"cron 表达式没有可触发的时间: {self.expression}")
+
+
+class Job:
+    """
+    定时任务
+
+    Args:
+        name: 任务名
+        func: 任务函数（无参数的异步函数）
+        interval: 执行间隔（秒），与 cron 二选一
+        cron: cron 表达式
+        jitter: 每次调度额外等待的随机时间上限（秒）
+        timeout: 单次执行的超时（秒），为None时不限制
+        leader_only: 是否只在leader上运行
+        run_at_start: 启动后是否立即执行一次
+        history_size: 保留的执行记录数
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        interval: Optional[float] = None,
+        cron: Optional[str] = None,
+        jitter: float = 0,
+        timeout: Optional[float] = None,
+        leader_only: bool = False,
+        run_at_start: bool = False,
+        history_size: int = 20,
+    ) -> None:
+        if (interval is None) == (cron is None):
+            raise ValueError(f"任务 {name} 需要指定 interval 或 cron 之一")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.cron = CronSchedule(cron) if cron else None
+        self.jitter = jitter
+        self.timeout = timeout
+        self.leader_only = leader_only
+        self.run_at_start = run_at_start
+        self.history: deque = deque(maxlen=history_size)
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.next_run: Optional[datetime] = None
+        self._current: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._current is not None and not self._current.done()
+
+    def next_fire(self, after: datetime) -> datetime:
+        """after 之后的下一个调度时间（不含抖动）"""
+        if self.cron is not None:
+            return self.cron.next_after(after)
+        return after + timedelta(seconds=self.interval)
+
+    async def _execute(self, trigger: str) -> Dict[str, Any]:
+        started = datetime.now()
+        start = time.perf_counter()
+        record: Dict[str, Any] = {"trigger": trigger, "started_at": started.isoformat(timespec="seconds")}
+        try:
+            await asyncio.wait_for(self.func(), self.timeout)
+            record["status"] = "ok"
+        except asyncio.TimeoutError:
+            record["status"] = "timeout"
+            logger.error(f"定时任务 {self.name} 执行超时（{self.timeout}秒）")
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+            logger.error(f"定时任务 {self.name} 执行失败: {e}")
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        self.runs += 1
+        if record["status"] != "ok":
+            self.failures += 1
+        self.history.append(record)
+        return record
+
+    def trigger(self, trigger: str = "schedule") -> Optional[asyncio.Task]:
+        """
+        在后台执行一次；上一次执行尚未结束时跳过并返回None
+        """
+        if self.running:
+            self.skipped += 1
+            self.history.append({
+                "trigger": trigger,
+                "started_at": datetime.now().isoformat(timespec="seconds"),
+                "status": "skipped",
+                "duration_ms": 0,
+            })
+            logger.warning(f"定时任务 {self.name} 上一次执行尚未结束，跳过本次执行")
+            return None
+        self._current = asyncio.create_task(self._execute(trigger), name=f"job:{self.name}")
+        return self._current
+
+    async def cancel(self) -> None:
+        """取消正在进行的执行"""
+        if self.running:
+            self._current.cancel()
+            await asyncio.gather(self._current, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "schedule": self.cron.expression if self.cron else f"every {self.interval:g}s",
+            "leader_only": self.leader_only,
+            "timeout": self.timeout,
+            "running": self.running,
+            "next_run": self.next_run.isoformat(timespec="seconds") if self.next_run else None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "history": list(reversed(self.history)),
+        }
+
+
+class Scheduler:
+    """
+    定时任务调度器
+
+    start() 启动每个worker都运行的任务，leader_only 的任务由 run_leader_jobs() 运行，
+    后者注册为leader任务（见 app.core.leader），当选时启动、退位时取消。
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[Any]], **options: Any) -> Job:
+        """注册定时任务，参数见 Job"""
+        if name in self.jobs:
+            raise ValueError(f"定时任务 {name} 已存在")
+        job = Job(name, func, **options)
+        self.jobs[name] = job
+        return job
+
+    async def _job_loop(self, job: Job) -> None:
+        try:
+            if job.run_at_start:
+                job.trigger()
+            # 按计划时间推进（不受单次执行耗时影响），执行时间过长时由 trigger 跳过重叠的调度
+            planned = datetime.now()
+            while True:
+                planned = job.next_fire(planned)
+                job.next_run = planned
+                delay = (planned - datetime.now()).total_seconds() + random.uniform(0, job.jitter)
+                await asyncio.sleep(max(0.0, delay))
+                job.trigger()
+                now = datetime.now()
+                if planned < now - timedelta(seconds=max(job.interval or 60, 60)):
+                    # 事件循环长时间阻塞或系统休眠后不补执行错过的调度
+                    planned = now
+        finally:
+            job.next_run = None
+            await job.cancel()
+
+    async def _run_jobs(self, jobs: List[Job]) -> None:
+        await asyncio.gather(*(self._job_loop(job) for job in jobs))
+
+    def start(self) -> None:
+        """启动每个worker都运行的任务"""
+        if not self.enabled or self._tasks:
+            return
+        local = [job for job in self.jobs.values() if not job.leader_only]
+        if local:
+            self._tasks.append(asyncio.create_task(self._run_jobs(local), name="scheduler"))
+
+    async def run_leader_jobs(self) -> None:
+        """运行 leader_only 的任务，直到被取消"""
+        if not self.enabled:
+            return
+        await self._run_jobs([job for job in self.jobs.values() if job.leader_only])
+
+    async def stop(self) -> None:
+        """停止每个worker都运行的任务"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_now(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        立即在当前worker执行一次并等待结果；任务正在执行时返回None
+        """
+        task = self.jobs[name].trigger("manual")
+        return await task if task is not None else None
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """获取所有任务的调度状态和最近的执行记录"""
+        return [job.get_stats() for job in self.jobs.values()]
+
+
+scheduler = Scheduler(enabled=settings.SCHEDULER_ENABLED)
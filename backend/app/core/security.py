@@ -1,3 +1,6 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional, Union
 
@@ -8,6 +11,13 @@ from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt 计算耗时 100~300ms，放到独立的有界线程池中执行，避免阻塞事件循环
+# 线程数即并发上限，超出的登录请求在线程池队列中排队
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    thread_name_prefix="password-hash",
+)
+
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: Optional[timedelta] = None
@@ -21,7 +31,8 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # jti 用于吊销单个令牌
+    to_encode = {"exp": expire, "sub": str(subject), "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
@@ -56,4 +67,22 @@ def get_password_hash(password: str) -> str:
     """
     获取密码哈希
     """
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    在密码线程池中验证密码，不阻塞事件循环
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _password_executor, verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    在密码线程池中计算密码哈希，不阻塞事件循环
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
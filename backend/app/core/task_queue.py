@@ -0,0 +1,354 @@
+"""
+后台任务队列模块
+
+请求中需要较长时间、可以稍后完成的工作（发送邮件、处理图片、全量重算统计等）写入数据库中的任务表，
+由每个worker上的执行协程领取并执行，任务在进程重启或崩溃后不会丢失：
+- 领取：MySQL 8.0+（MariaDB 10.6+）使用 SELECT ... FOR UPDATE SKIP LOCKED 选出一个到期的任务，
+  多个worker互不阻塞；SQLite 和不支持 SKIP LOCKED 的旧版本 MySQL（如 5.7）先读出候选任务，
+  再用带原状态条件的 UPDATE 领取（比较并交换），更新0行说明被其他worker抢先
+- 可见性超时：领取时记录 locked_until，worker崩溃或卡住时任务到期后可被其他worker重新领取；
+  执行超时小于可见性超时，正常运行的worker总会在租约到期前结束本次执行
+- 重试：执行失败后按指数退避（带随机抖动）重新排队，达到最多执行次数后标记为失败并保留错误信息
+- 结束执行时按本次领取的标识更新，已被重新领取的任务不会被旧的执行覆盖状态
+- 正常关闭时停止领取新任务，等待执行中的任务结束，超时未结束的取消并放回队列
+
+任务处理函数用 task_queue.task(name) 注册（内置任务见 app.core.tasks），
+用 await task_queue.enqueue(name, payload) 提交。任务可能被执行多次，处理函数需要可以重复执行。
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import re
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.expressions import Q
+from tortoise.functions import Count
+
+from app.core.config import settings
+from app.db.database import transaction
+from app.models.task import QueuedTask
+
+logger = logging.getLogger(__name__)
+
+TaskHandler = Callable[..., Awaitable[Any]]
+
+
+@dataclass
+class TaskSpec:
+    """注册的任务：处理函数、执行超时（秒）和最多执行次数"""
+    name: str
+    func: TaskHandler
+    timeout: float
+    max_attempts: int
+
+
+class TaskQueue:
+    """
+    数据库任务队列
+
+    Args:
+        enabled: 为False时不启动执行协程，提交的任务在提交处直接执行
+        workers: 每个进程的执行协程数
+        poll_interval: 没有到期任务时的轮询间隔（秒）
+        visibility_timeout: 领取任务的租约时间（秒）
+        max_attempts: 默认最多执行次数
+        retry_base: 第一次重试的等待时间（秒），之后每次翻倍
+        retry_max: 重试等待时间的上限（秒）
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        workers: int,
+        poll_interval: float,
+        visibility_timeout: float,
+        max_attempts: int,
+        retry_base: float,
+        retry_max: float,
+    ) -> None:
+        self.enabled = enabled
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.specs: Dict[str, TaskSpec] = {}
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._workers: List[asyncio.Task] = []
+        self._executing: Dict[int, str] = {}
+        self._skip_locked: Optional[bool] = None
+
+    def task(
+        self, name: str, timeout: Optional[float] = None, max_attempts: Optional[int] = None
+    ) -> Callable[[TaskHandler], TaskHandler]:
+        """
+        注册任务处理函数的装饰器，处理函数以 payload 中的键值作为关键字参数调用
+
+        Args:
+            timeout: 执行超时（秒），默认为可见性超时的80%，必须小于可见性超时
+            max_attempts: 最多执行次数，默认为 TASK_QUEUE_MAX_ATTEMPTS
+        """
+        timeout = timeout if timeout is not None else self.visibility_timeout * 0.8
+        if timeout >= self.visibility_timeout:
+            raise ValueError(f"任务 {name} 的执行超时必须小于可见性超时（{self.visibility_timeout}秒）")
+
+        def decorator(func: TaskHandler) -> TaskHandler:
+            self.specs[name] = TaskSpec(name, func, timeout, max_attempts or self.max_attempts)
+            return func
+
+        return decorator
+
+    async def enqueue(
+        self,
+        name: str,
+        payload: Optional[Dict[str, Any]] = None,
+        delay: float = 0,
+        connection: Optional[BaseDBAsyncClient] = None,
+    ) -> Optional[int]:
+        """
+        提交任务
+
+        Args:
+            name: 已注册的任务名
+            payload: 任务参数，需要可以序列化为JSON
+            delay: 延迟执行的时间（秒）
+            connection: 在事务中提交时传入事务连接，任务随事务一起提交
+
+        Returns:
+            任务ID；队列未启用、任务在提交处直接执行时返回None
+        """
+        spec = self.specs.get(name)
+        if spec is None:
+            raise ValueError(f"未注册的任务: {name}")
+        payload = payload or {}
+        if not self.enabled:
+            try:
+                await asyncio.wait_for(spec.func(**payload), spec.timeout)
+            except Exception as e:
+                logger.error(f"任务 {name} 执行失败: {e}")
+            return None
+        task = await QueuedTask.create(
+            name=name,
+            payload=payload,
+            max_attempts=spec.max_attempts,
+            run_at=datetime.now() + timedelta(seconds=delay),
+            using_db=connection,
+        )
+        if not delay:
+            self._wakeup.set()
+        return task.id
+
+    def _due(self, now: datetime):
+        # 到期的待执行任务，以及租约已过期（执行的worker崩溃或卡住）的执行中任务
+        return QueuedTask.filter(
+            Q(status="pending", run_at__lte=now) | Q(status="running", locked_until__lt=now)
+        ).order_by("run_at", "id")
+
+    async def _mark_claimed(
+        self, candidate: QueuedTask, now: datetime, connection: Optional[BaseDBAsyncClient] = None
+    ) -> Optional[QueuedTask]:
+        token = f"{self.owner}:{uuid.uuid4().hex[:12]}"
+        locked_until = now + timedelta(seconds=self.visibility_timeout)
+        # 带原状态和执行次数的条件更新：其他worker已领取时更新0行
+        claimed = await QueuedTask.filter(
+            id=candidate.id, status=candidate.status, attempts=candidate.attempts
+        ).using_db(connection).update(
+            status="running",
+            attempts=candidate.attempts + 1,
+            locked_by=token,
+            locked_until=locked_until,
+            updated_at=now,
+        )
+        if not claimed:
+            return None
+        candidate.status = "running"
+        candidate.attempts += 1
+        candidate.locked_by = token
+        candidate.locked_until = locked_until
+        return candidate
+
+    async def _supports_skip_locked(self) -> bool:
+        """数据库是否支持 SKIP LOCKED（MySQL 8.0.1+、MariaDB 10.6+），结果在进程内缓存"""
+        if self._skip_locked is None:
+            connection = connections.get("default")
+            supported = False
+            if connection.capabilities.dialect == "mysql":
+                _, rows = await connection.execute_query("SELECT VERSION()")
+                version = str(rows[0][0])
+                # 部分MariaDB版本号带有兼容前缀，如 "5.5.5-10.6.12-MariaDB"
+                numbers = tuple(int(part) for part in re.findall(r"\d+", version.removeprefix("5.5.5-"))[:3])
+                minimum = (10, 6) if "mariadb" in version.lower() else (8, 0, 1)
+                supported = numbers >= minimum
+                if not supported:
+                    logger.info(f"数据库版本 {version} 不支持 SKIP LOCKED，使用条件更新领取后台任务")
+            self._skip_locked = supported
+        return self._skip_locked
+
+    async def _claim(self) -> Optional[QueuedTask]:
+        """领取一个到期的任务，没有时返回None"""
+        if await self._supports_skip_locked():
+            now = datetime.now()
+            async with transaction() as connection:
+                candidate = await (
+                    self._due(now).select_for_update(skip_locked=True).using_db(connection).first()
+                )
+                return await self._mark_claimed(candidate, now, connection) if candidate else None
+        # 比较并交换：被其他worker抢先时换下一个候选任务重试几次
+        for _ in range(3):
+            now = datetime.now()
+            candidate = await self._due(now).first()
+            if candidate is None:
+                return None
+            task = await self._mark_claimed(candidate, now)
+            if task is not None:
+                return task
+        return None
+
+    async def _finish(self, task: QueuedTask, **fields: Any) -> bool:
+        """按本次领取的标识更新任务，任务已被重新领取时返回False"""
+        updated = await QueuedTask.filter(id=task.id, locked_by=task.locked_by).update(
+            locked_by=None, locked_until=None, updated_at=datetime.now(), **fields
+        )
+        if not updated:
+            logger.warning(f"任务 {task.name}#{task.id} 的租约已过期并被重新领取，忽略本次执行结果")
+        return bool(updated)
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _execute(self, task: QueuedTask) -> None:
+        spec = self.specs.get(task.name)
+        self._executing[task.id] = task.name
+        try:
+            if task.attempts > task.max_attempts:
+                # 最后一次执行时worker崩溃或卡住，租约过期后被重新领取
+                raise RuntimeError(f"超过最多执行次数（{task.max_attempts}次），最后一次执行未完成")
+            if spec is None:
+                raise LookupError(f"未注册的任务: {task.name}")
+            await asyncio.wait_for(spec.func(**task.payload), spec.timeout)
+        except asyncio.CancelledError:
+            # 关闭时被取消：放回队列，本次执行不计入执行次数
+            await asyncio.shield(self._finish(task, status="pending", attempts=task.attempts - 1))
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            if task.attempts >= task.max_attempts:
+                if await self._finish(task, status="failed", last_error=error):
+                    self.failed += 1
+                logger.error(f"任务 {task.name}#{task.id} 执行失败，已达到最多执行次数: {error}")
+            else:
+                delay = self._retry_delay(task.attempts)
+                run_at = datetime.now() + timedelta(seconds=delay)
+                if await self._finish(task, status="pending", run_at=run_at, last_error=error):
+                    self.retried += 1
+                logger.warning(
+                    f"任务 {task.name}#{task.id} 第{task.attempts}次执行失败，{delay:.0f}秒后重试: {error}"
+                )
+        else:
+            if await self._finish(task, status="done"):
+                self.completed += 1
+        finally:
+            self._executing.pop(task.id, None)
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            try:
+                task = await self._claim()
+            except Exception as e:
+                logger.error(f"领取后台任务失败: {e}")
+                task = None
+            if task is not None:
+                await self._execute(task)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """启动当前进程的执行协程"""
+        if not self.enabled or self._workers:
+            return
+        self._stopping = False
+        # 使用空的上下文，执行协程不继承启动时所在任务的上下文变量
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"task-queue:{index}", context=contextvars.Context())
+            for index in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float = 10) -> None:
+        """
+        停止领取新任务并等待执行中的任务结束，超过 timeout 秒仍未结束的任务被取消并放回队列
+        """
+        workers, self._workers = self._workers, []
+        if not workers:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        for worker in pending:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def prune(self, retention_hours: float) -> int:
+        """删除完成超过 retention_hours 小时的任务，失败的任务保留以便排查"""
+        cutoff = datetime.now() - timedelta(hours=retention_hours)
+        deleted = await QueuedTask.filter(status="done", updated_at__lt=cutoff).delete()
+        if deleted:
+            logger.info(f"已清理 {deleted} 个已完成的后台任务")
+        return deleted
+
+    async def get_stats(self, failures: int = 10) -> Dict[str, Any]:
+        """获取队列中各状态的任务数、当前worker的执行情况和最近失败的任务"""
+        counts = dict(
+            await QueuedTask.annotate(count=Count("id")).group_by("status").values_list("status", "count")
+        )
+        due = await QueuedTask.filter(status="pending", run_at__lte=datetime.now()).count()
+        recent_failures = await QueuedTask.filter(status="failed").order_by("-updated_at").limit(failures).values(
+            "id", "name", "payload", "attempts", "last_error", "updated_at"
+        )
+        return {
+            "enabled": self.enabled,
+            "counts": {status: counts.get(status, 0) for status in ("pending", "running", "done", "failed")},
+            "due": due,
+            "worker": {
+                "owner": self.owner,
+                "workers": len(self._workers),
+                "executing": [f"{name}#{task_id}" for task_id, name in self._executing.items()],
+                "completed": self.completed,
+                "retried": self.retried,
+                "failed": self.failed,
+            },
+            "tasks": {
+                name: {"timeout": spec.timeout, "max_attempts": spec.max_attempts}
+                for name, spec in self.specs.items()
+            },
+            "recent_failures": recent_failures,
+        }
+
+
+task_queue = TaskQueue(
+    enabled=settings.TASK_QUEUE_ENABLED,
+    workers=settings.TASK_QUEUE_WORKERS,
+    poll_interval=settings.TASK_QUEUE_POLL_INTERVAL,
+    visibility_timeout=settings.TASK_QUEUE_VISIBILITY_TIMEOUT,
+    max_attempts=settings.TASK_QUEUE_MAX_ATTEMPTS,
+    retry_base=settings.TASK_QUEUE_RETRY_BASE,
+    retry_max=settings.TASK_QUEUE_RETRY_MAX,
+)
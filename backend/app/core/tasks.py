@@ -0,0 +1,56 @@
+"""
+内置后台任务（见 app.core.task_queue）
+
+- stats.refresh：全量重算网站统计数据
+- email.send：发送邮件
+- avatar.process：把上传的头像按EXIF方向摆正、居中裁剪为正方形并缩放到 AVATAR_SIZE
+"""
+import asyncio
+import logging
+import os
+
+from app.core.config import settings
+from app.core.jobs import refresh_stats
+from app.core.task_queue import task_queue
+from app.utils.email import send_email
+
+logger = logging.getLogger(__name__)
+
+
+task_queue.task("stats.refresh", timeout=120, max_attempts=3)(refresh_stats)
+
+
+@task_queue.task("email.send", timeout=60)
+async def send_email_task(to: str, subject: str, body: str) -> None:
+    await send_email(to, subject, body)
+
+
+def _process_avatar(path: str, size: int) -> bool:
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as image:
+        # 动图保持原样，只处理静态图片
+        if getattr(image, "is_animated", False):
+            return False
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        if image.size == (size, size):
+            return False
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        # 先写临时文件再替换，处理中途失败时保留原文件
+        temp_path = f"{path}.tmp"
+        image.save(temp_path, format=image_format)
+    os.replace(temp_path, path)
+    return True
+
+
+@task_queue.task("avatar.process", timeout=60, max_attempts=3)
+async def process_avatar(file_name: str) -> None:
+    path = os.path.join(settings.UPLOAD_DIR, "avatars", os.path.basename(file_name))
+    if not os.path.exists(path):
+        logger.info(f"头像文件 {file_name} 已不存在，跳过处理")
+        return
+    if await asyncio.to_thread(_process_avatar, path, settings.AVATAR_SIZE):
+        logger.info(f"头像 {file_name} 已裁剪为 {settings.AVATAR_SIZE}x{settings.AVATAR_SIZE}")
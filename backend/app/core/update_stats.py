@@ -2,161 +2,180 @@
 自动更新统计数据的模块
 
 此模块定义了更新各种统计数据的函数，包括文章数、项目数、用户数等。
-这些函数会被定时任务或后台任务调用。
+
+- 创建/删除文章、项目、用户、消息时通过事件总线原子地增减对应计数
+- 定时任务定期全量重算（见 app.core.jobs），修正事件遗漏（如直接改库、级联删除）造成的偏差；
+  全量重算时所有计数并发查询，统计表用一条 upsert 语句写入
+- 统计接口读取的快照缓存在内存中，统计值变化时失效并在后台刷新
 """
 
+import asyncio
 import logging
-from datetime import datetime
+from datetime import date, datetime, time
+from typing import Any, Dict
+
+from tortoise.expressions import F
+from tortoise.functions import Count
 
+from app.core.cache import SWRCache
+from app.core.config import settings
+from app.core.events import event_bus
+from app.core.task_queue import task_queue
 from app.models.stat import Stat
 from app.models.article import Article
 from app.models.project import Project
 from app.models.user import User
 from app.models.message import Message
-from app.models.api_stat import ApiStat
-from app.db import transaction
+from app.models.api_stat import ApiStat, ApiStatDaily
 
 logger = logging.getLogger(__name__)
 
+# 统计项键名及显示文本（键名与前端仪表盘一致）
+STAT_DISPLAY_TEXT = {
+    "articles": "文章数量",
+    "projects": "项目数量",
+    "users": "用户数量",
+    "messages": "消息数量",
+    "visitors": "访问人数",
+}
 
-async def update_all_stats():
-    """
-    更新所有统计数据
-    """
-    try:
-        # 使用事务确保一致性
-        async with transaction():
-            await update_article_count()
-            await update_project_count()
-            await update_user_count()
-            await update_message_count()
-            await update_visitor_count()
-        
-        logger.info("所有统计数据更新完成")
-    except Exception as e:
-        logger.error(f"更新统计数据失败: {e}")
+# 旧版统计接口写入的键名，已不再更新，全量重算时删除
+LEGACY_STAT_KEYS = ("article_count", "project_count", "user_count", "message_count")
 
 
-async def update_article_count():
+async def load_stats_snapshot() -> Dict[str, Any]:
     """
-    更新文章数量统计
+    读取统计表，返回统计项列表和仪表盘使用的 键名->数值 字典
     """
-    try:
-        # 获取文章总数
-        article_count = await Article.all().count()
-        
-        # 更新或创建统计数据
-        stat, created = await Stat.get_or_create(
-            key="articles",
-            defaults={"value": article_count, "display_text": "文章数量"}
-        )
-        
-        if not created:
-            stat.value = article_count
-            await stat.save()
-        
-        logger.info(f"文章数量统计更新完成: {article_count}")
-    except Exception as e:
-        logger.error(f"更新文章数量统计失败: {e}")
+    rows = await Stat.all().order_by("id").values("id", "key", "value", "display_text", "updated_at")
+    return {
+        "rows": rows,
+        "dashboard": {row["key"]: row["value"] for row in rows},
+    }
 
 
-async def update_project_count():
-    """
-    更新项目数量统计
-    """
-    try:
-        # 获取项目总数
-        project_count = await Project.all().count()
-        
-        # 更新或创建统计数据
-        stat, created = await Stat.get_or_create(
-            key="projects",
-            defaults={"value": project_count, "display_text": "项目数量"}
-        )
-        
-        if not created:
-            stat.value = project_count
-            await stat.save()
-        
-        logger.info(f"项目数量统计更新完成: {project_count}")
-    except Exception as e:
-        logger.error(f"更新项目数量统计失败: {e}")
+stats_cache = SWRCache(
+    load_stats_snapshot,
+    ttl=settings.STATS_CACHE_TTL,
+    max_stale=settings.STATS_CACHE_MAX_STALE,
+)
 
 
-async def update_user_count():
+async def collect_counts() -> Dict[str, int]:
     """
-    更新用户数量统计
-    """
-    try:
-        # 获取用户总数
-        user_count = await User.all().count()
-        
-        # 更新或创建统计数据
-        stat, created = await Stat.get_or_create(
-            key="users",
-            defaults={"value": user_count, "display_text": "用户数量"}
-        )
-        
-        if not created:
-            stat.value = user_count
-            await stat.save()
-        
-        logger.info(f"用户数量统计更新完成: {user_count}")
-    except Exception as e:
-        logger.error(f"更新用户数量统计失败: {e}")
+    并发查询所有统计数值
 
-
-async def update_message_count():
+    访问人数 = 有记录的独立用户数 + 估算的匿名用户（总请求数的10%）。
+    同时返回今天的独立用户数（today_unique_users），用于更新每日API统计。
     """
-    更新消息数量统计
+    today = date.today()
+    (
+        article_count,
+        project_count,
+        user_count,
+        message_count,
+        api_totals,
+        api_today,
+    ) = await asyncio.gather(
+        Article.all().count(),
+        Project.all().count(),
+        User.all().count(),
+        Message.all().count(),
+        ApiStat.annotate(
+            users=Count("user_id", distinct=True),
+            calls=Count("id"),
+        ).values("users", "calls"),
+        ApiStat.filter(
+            timestamp__gte=datetime.combine(today, time.min),
+            timestamp__lte=datetime.combine(today, time.max),
+        ).annotate(users=Count("user_id", distinct=True)).values("users"),
+    )
+
+    unique_users = api_totals[0]["users"] if api_totals else 0
+    total_calls = api_totals[0]["calls"] if api_totals else 0
+    return {
+        "articles": article_count,
+        "projects": project_count,
+        "users": user_count,
+        "messages": message_count,
+        "visitors": unique_users + int(total_calls * 0.1),
+        "today_unique_users": api_today[0]["users"] if api_today else 0,
+    }
+
+
+async def upsert_stats(values: Dict[str, int]) -> None:
     """
-    try:
-        # 获取消息总数
-        message_count = await Message.all().count()
-        
-        # 更新或创建统计数据
-        stat, created = await Stat.get_or_create(
-            key="messages",
-            defaults={"value": message_count, "display_text": "消息数量"}
-        )
-        
-        if not created:
-            stat.value = message_count
-            await stat.save()
-        
-        logger.info(f"消息数量统计更新完成: {message_count}")
-    except Exception as e:
-        logger.error(f"更新消息数量统计失败: {e}")
-
-
-async def update_visitor_count():
+    用一条语句写入多个统计项（不存在时创建，存在时更新数值），并删除旧键名的统计行
     """
-    更新访问人数统计 (基于API调用的独立用户)
+    now = datetime.now()
+    await Stat.filter(key__in=LEGACY_STAT_KEYS).delete()
+    await Stat.bulk_create(
+        [
+            Stat(
+                key=key,
+                value=value,
+                display_text=STAT_DISPLAY_TEXT.get(key, key),
+                updated_at=now,
+            )
+            for key, value in values.items()
+        ],
+        on_conflict=["key"],
+        update_fields=["value", "updated_at"],
+    )
+
+
+async def update_all_stats() -> Dict[str, Any]:
+    """
+    更新所有统计数据
+
+    Returns:
+        Dict[str, Any]: 更新结果
     """
     try:
-        # 获取独立用户数 (非空的user_id)
-        unique_users = len(set(
-            stat.user_id for stat in await ApiStat.all() 
-            if stat.user_id is not None
-        ))
-        
-        # 考虑匿名用户 (估算为总请求的10%)
-        total_calls = await ApiStat.all().count()
-        estimated_anonymous = int(total_calls * 0.1)
-        
-        # 总访问人数 = 独立用户 + 估算的匿名用户
-        visitor_count = unique_users + estimated_anonymous
-        
-        # 更新或创建统计数据
-        stat, created = await Stat.get_or_create(
-            key="visitors",
-            defaults={"value": visitor_count, "display_text": "访问人数"}
+        counts = await collect_counts()
+        today_unique_users = counts.pop("today_unique_users")
+
+        await asyncio.gather(
+            upsert_stats(counts),
+            ApiStatDaily.filter(date=date.today()).update(unique_users=today_unique_users),
         )
-        
-        if not created:
-            stat.value = visitor_count
-            await stat.save()
-        
-        logger.info(f"访问人数统计更新完成: {visitor_count} (独立用户: {unique_users}, 估算匿名: {estimated_anonymous})")
+        stats_cache.invalidate()
+
+        logger.info(f"所有统计数据更新完成: {counts}")
+        return {
+            "success": True,
+            "message": "统计数据已更新",
+            "stats": counts,
+        }
     except Exception as e:
-        logger.error(f"更新访问人数统计失败: {e}") 
\ No newline at end of file
+        logger.error(f"更新统计数据失败: {e}")
+        return {
+            "success": False,
+            "message": f"更新统计数据出错: {e}",
+        }
+
+
+# 事件与对应统计项的增量
+STAT_EVENTS = {
+    "article.created": ("articles", 1),
+    "article.deleted": ("articles", -1),
+    "project.created": ("projects", 1),
+    "project.deleted": ("projects", -1),
+    "user.created": ("users", 1),
+    "user.deleted": ("users", -1),
+    "message.created": ("messages", 1),
+    "message.deleted": ("messages", -1),
+}
+
+
+@event_bus.on(*STAT_EVENTS)
+async def _apply_stat_event(event: str, **payload) -> None:
+    key, delta = STAT_EVENTS[event]
+    # UPDATE stats SET value = value + ? WHERE key = ?，多个worker并发更新也不会丢失
+    updated = await Stat.filter(key=key).update(value=F("value") + delta)
+    if updated:
+        stats_cache.invalidate()
+    else:
+        # 统计行还不存在（如首次启动的全量统计尚未完成），提交全量重算的后台任务
+        await task_queue.enqueue("stats.refresh")
+
@@ -0,0 +1,70 @@
+"""
+文章阅读量缓冲模块
+
+每次阅读不再单独执行一条 UPDATE：阅读量先在当前worker的内存中累加，
+由定时任务（见 app.core.jobs）定期合并写入，增量相同的文章用一条语句更新。
+写入通过后台写入队列提交（见 app.db.write_queue）。
+
+worker异常退出时最多丢失一个刷新间隔内的阅读量；正常关闭时会先写入剩余的阅读量。
+"""
+import logging
+from functools import partial
+from typing import Dict, List
+
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.expressions import F
+
+from app.core.config import settings
+from app.db.write_queue import write_queue
+from app.models.article import Article
+
+logger = logging.getLogger(__name__)
+
+
+async def _apply_view_counts(connection: BaseDBAsyncClient, by_delta: Dict[int, List[int]]) -> None:
+    for delta, article_ids in by_delta.items():
+        await Article.filter(id__in=article_ids).using_db(connection).update(
+            view_count=F("view_count") + delta
+        )
+
+
+class ViewCountBuffer:
+    """
+    阅读量缓冲
+
+    Args:
+        enabled: 为False时每次阅读立即写入数据库
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self._pending: Dict[int, int] = {}
+        self.flushed = 0
+
+    async def increment(self, article_id: int) -> int:
+        """
+        文章阅读量加1
+
+        Returns:
+            当前worker中尚未写入数据库的阅读量（包括本次），用于在响应中返回最新的阅读量
+        """
+        if not self.enabled:
+            await Article.filter(id=article_id).update(view_count=F("view_count") + 1)
+            return 1
+        self._pending[article_id] = self._pending.get(article_id, 0) + 1
+        return self._pending[article_id]
+
+    async def flush(self) -> None:
+        """把缓冲的阅读量提交到后台写入队列"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        by_delta: Dict[int, List[int]] = {}
+        for article_id, delta in pending.items():
+            by_delta.setdefault(delta, []).append(article_id)
+        await write_queue.submit(partial(_apply_view_counts, by_delta=by_delta))
+        self.flushed += sum(pending.values())
+        logger.debug(f"已提交 {len(pending)} 篇文章的阅读量，共 {sum(pending.values())} 次")
+
+
+view_counts = ViewCountBuffer(enabled=settings.VIEW_COUNT_FLUSH_INTERVAL > 0)
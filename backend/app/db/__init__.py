@@ -7,10 +7,12 @@
 - 数据库事务管理
 - 通用数据库查询操作
 - 数据库模型导入
-- 数据库维护和修复
-- 样本数据生成
+- 数据库维护和修复（按需导入）
+- 样本数据生成（按需导入）
 """
 
+import importlib
+
 from app.db.database import (
     transaction,
     init_db,
@@ -18,23 +20,34 @@ from app.db.database import (
     execute_query,
     fix_sequence,
     get_by_id,
+    get_tortoise_config,
+    get_pool_stats,
 )
 
 from app.db.init_db import create_first_superuser
 
-from app.db.maintenance import (
-    reset_table_ids,
-    fix_autoincrement,
-    reset_article_ids,
-    reset_tag_ids,
-    reset_project_ids,
-    fix_database,
-)
+# 维护和样本数据函数只在脚本和命令行中使用，首次访问时才导入对应模块，
+# 不进入应用运行时的导入图
+_LAZY_EXPORTS = {
+    "reset_table_ids": "app.db.maintenance",
+    "fix_autoincrement": "app.db.maintenance",
+    "reset_article_ids": "app.db.maintenance",
+    "reset_tag_ids": "app.db.maintenance",
+    "reset_project_ids": "app.db.maintenance",
+    "fix_database": "app.db.maintenance",
+    "generate_api_stats": "app.db.sample_data",
+    "generate_sample_data": "app.db.sample_data",
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
 
-from app.db.sample_data import (
-    generate_api_stats,
-    generate_sample_data,
-)
 
 # 导出所有公共函数
 __all__ = [
@@ -45,6 +58,8 @@ __all__ = [
     "execute_query",
     "fix_sequence",
     "get_by_id",
+    "get_tortoise_config",
+    "get_pool_stats",
     "create_first_superuser",
     
     # 数据库维护
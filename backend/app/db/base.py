@@ -22,6 +22,9 @@ from app.models.subscriber import Subscriber
 from app.models.stat import Stat
 from app.models.api_stat import ApiStat, ApiStatDaily
 
+# 认证相关
+from app.models.revoked_token import RevokedToken
+
 # 导出所有模型以便可以在其他地方使用
 __all__ = [
     # 用户
@@ -40,4 +43,7 @@ __all__ = [
     # 统计
     "Stat",
     "ApiStat", "ApiStatDaily",
+    
+    # 认证
+    "RevokedToken",
 ] 
\ No newline at end of file
@@ -4,8 +4,10 @@
 提供数据库连接、事务处理和通用查询操作
 """
 import logging
+import os
 from typing import Any, Dict, List, Optional, Type, TypeVar
 from tortoise import Tortoise, connections
+from tortoise.backends.base.config_generator import expand_db_url
 from tortoise.models import Model
 from tortoise.transactions import in_transaction
 from tortoise.exceptions import DoesNotExist, OperationalError
@@ -18,8 +20,98 @@ logger = logging.getLogger(__name__)
 T = TypeVar('T', bound=Model)
 
 
-# 重新导出Tortoise ORM的事务函数
-transaction = in_transaction
+def transaction(connection_name: str = "default"):
+    """
+    开启事务，默认使用主库连接
+
+    配置了只读副本时存在多个连接，Tortoise 的 in_transaction 必须指定连接名。
+    """
+    return in_transaction(connection_name)
+
+
+def _connection_config(db_url: str) -> Dict[str, Any]:
+    connection = expand_db_url(db_url)
+    if connection["engine"] == "tortoise.backends.mysql":
+        connection["engine"] = "app.db.mysql_pool"
+        credentials = connection["credentials"]
+        credentials.setdefault("minsize", settings.DB_POOL_MIN_SIZE)
+        credentials.setdefault("maxsize", settings.DB_POOL_MAX_SIZE)
+        credentials.setdefault("pool_recycle", settings.DB_POOL_RECYCLE)
+        credentials.setdefault("connect_timeout", settings.DB_CONNECT_TIMEOUT)
+        credentials.setdefault("acquire_timeout", settings.DB_POOL_ACQUIRE_TIMEOUT)
+    elif connection["engine"] == "tortoise.backends.sqlite":
+        connection["engine"] = "app.db.sqlite_client"
+        # 连接建立时按顺序执行 PRAGMA，busy_timeout 放在最前面，后续切换WAL时也能等待锁
+        connection["credentials"] = {
+            "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+            "journal_mode": "WAL",
+            "synchronous": settings.SQLITE_SYNCHRONOUS,
+            "mmap_size": settings.SQLITE_MMAP_SIZE,
+            "cache_size": -settings.SQLITE_CACHE_SIZE_KB,
+            "temp_store": "MEMORY",
+            **connection["credentials"],
+        }
+    return connection
+
+
+def get_tortoise_config(db_url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    生成Tortoise ORM配置
+
+    MySQL使用 app.db.mysql_pool 中带连接池统计的客户端，连接池参数取自 Settings；
+    SQLite使用 app.db.sqlite_client 中的客户端，启用WAL并设置同步模式、内存映射、页缓存和等待写锁的超时。
+    两者都统计每个请求的SQL执行（见 app.db.query_stats）。
+    数据库URL的查询参数中显式指定的值（如 ?maxsize=20）优先。
+    未指定 db_url 且配置了 DATABASE_REPLICA_URL 时，增加 "replica" 连接和读副本路由；
+    SQLite启用后台写入队列时，增加写入队列专用的 "writer" 连接。
+
+    Args:
+        db_url: 数据库URL，默认为 settings.DATABASE_URL
+    """
+    config: Dict[str, Any] = {
+        "connections": {"default": _connection_config(db_url or settings.DATABASE_URL)},
+        "apps": {
+            "models": {
+                "models": ["app.models"],
+                "default_connection": "default",
+            },
+        },
+    }
+    if db_url is None and settings.DATABASE_REPLICA_URL:
+        replica = _connection_config(settings.DATABASE_REPLICA_URL)
+        # 副本连接使用 ReplicaFailoverMixin 客户端，副本不可用时单条读查询回退主库
+        replica["replica"] = True
+        config["connections"]["replica"] = replica
+        config["routers"] = ["app.db.routing.ReplicaRouter"]
+    if (
+        db_url is None
+        and settings.DB_WRITE_QUEUE_ENABLED
+        and config["connections"]["default"]["engine"] == "app.db.sqlite_client"
+    ):
+        # SQLite每个连接同一时刻只能执行一条语句：后台写入队列使用单独的连接，
+        # 批量提交期间其他读查询仍可在 default 连接上并发执行（WAL模式下读写互不阻塞）
+        config["connections"]["writer"] = _connection_config(settings.DATABASE_URL)
+    return config
+
+
+def get_pool_stats(connection_name: str = "default") -> Dict[str, Any]:
+    """
+    获取当前worker的数据库连接池统计
+
+    SQLite没有连接池，只返回引擎类型。
+    """
+    connection = connections.get(connection_name)
+    stats: Dict[str, Any] = {
+        "engine": connection.capabilities.dialect,
+        "pid": os.getpid(),
+        "pooled": False,
+    }
+    get_stats = getattr(connection, "get_pool_stats", None)
+    pool = get_stats() if get_stats else None
+    if pool is not None:
+        stats["pooled"] = True
+        stats.update(pool)
+    return stats
 
 
 async def init_db() -> None:
@@ -28,25 +120,24 @@ async def init_db() -> None:
     
     如果使用SQLite：
     - 直接连接到SQLite数据库文件
-    - 生成数据库架构
+    - 执行数据库迁移
     
     如果使用MySQL：
     - 先连接到MySQL服务器，不指定数据库
     - 检查并创建数据库（如果不存在）
     - 重新连接到指定的数据库
-    - 生成数据库架构
+    - 执行数据库迁移
     """
+    from app.db.migrate import run_migrations
+
     try:
         # 判断使用的是哪种数据库
         if settings.DATABASE_URL.startswith('sqlite'):
             # SQLite数据库
-            await Tortoise.init(
-                db_url=settings.DATABASE_URL,
-                modules={"models": ["app.models"]},
-            )
+            await Tortoise.init(config=get_tortoise_config())
             
-            # 生成数据库架构（使用safe=True，不会删除已有的表和数据）
-            await Tortoise.generate_schemas(safe=True)
+            # 执行未执行的数据库迁移（不会删除已有的表和数据）
+            await run_migrations(apply=True)
             logger.info("SQLite数据库架构已检查/更新")
             
         else:
@@ -56,10 +147,7 @@ async def init_db() -> None:
             db_name = settings.DATABASE_URL.rsplit('/', 1)[1]
             
             # 初始化Tortoise连接到MySQL服务器
-            await Tortoise.init(
-                db_url=mysql_url,
-                modules={"models": ["app.models"]},
-            )
+            await Tortoise.init(config=get_tortoise_config(mysql_url))
             
             # 获取数据库连接
             connection = connections.get("default")
@@ -83,13 +171,10 @@ async def init_db() -> None:
             await Tortoise.close_connections()
             
             # 重新连接到指定的数据库
-            await Tortoise.init(
-                db_url=settings.DATABASE_URL,
-                modules={"models": ["app.models"]},
-            )
+            await Tortoise.init(config=get_tortoise_config())
             
-            # 生成数据库架构（使用safe=True，不会删除已有的表和数据）
-            await Tortoise.generate_schemas(safe=True)
+            # 执行未执行的数据库迁移（不会删除已有的表和数据）
+            await run_migrations(apply=True)
             logger.info("MySQL数据库架构已检查/更新")
         
         # 创建超级用户（如果不存在）
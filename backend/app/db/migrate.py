@@ -0,0 +1,317 @@
+"""
+数据库迁移模块
+
+按版本号顺序执行 app/db/migrations 中的迁移文件，已执行的版本记录在 schema_migrations 表中：
+- 迁移文件名为 "<版本号>_<名称>.py"，文件中定义 async def upgrade(connection)
+- 每个迁移在独立的事务中执行，执行成功后写入版本记录
+- 多个worker同时启动时，通过 schema_migration_lock 表中的锁记录保证只有一个worker执行迁移，
+  其余worker等待锁释放后发现已无待执行的迁移，直接继续启动；持有锁期间定期续期
+- 没有待执行的迁移时，启动只需查询一次版本表
+
+MySQL的DDL会隐式提交事务（SQLite执行多条语句的脚本时也会先提交），
+迁移需要可以重复执行（见 ensure_index、ensure_column）。
+"""
+import asyncio
+import importlib
+import logging
+import os
+import pkgutil
+import socket
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.exceptions import IntegrityError
+
+from app.core.config import settings
+from app.db.database import transaction
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PACKAGE = "app.db.migrations"
+VERSION_TABLE = "schema_migrations"
+LOCK_TABLE = "schema_migration_lock"
+
+
+def _quote(connection: BaseDBAsyncClient, name: str) -> str:
+    return f"`{name}`" if connection.capabilities.dialect == "mysql" else f'"{name}"'
+
+
+def _placeholder(connection: BaseDBAsyncClient) -> str:
+    return "%s" if connection.capabilities.dialect == "mysql" else "?"
+
+
+def discover_migrations() -> List[Tuple[int, str]]:
+    """
+    按版本号顺序列出迁移文件，返回 (版本号, 模块名)
+    """
+    package = importlib.import_module(MIGRATIONS_PACKAGE)
+    migrations = []
+    for module in pkgutil.iter_modules(package.__path__):
+        version, _, name = module.name.partition("_")
+        if version.isdigit() and name:
+            migrations.append((int(version), module.name))
+    migrations.sort()
+    versions = [version for version, _ in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"迁移版本号重复: {[name for _, name in migrations]}")
+    return migrations
+
+
+async def _ensure_tables(connection: BaseDBAsyncClient) -> None:
+    await connection.execute_query(
+        f"CREATE TABLE IF NOT EXISTS {_quote(connection, VERSION_TABLE)} ("
+        "version INT NOT NULL PRIMARY KEY, "
+        "name VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+    await connection.execute_query(
+        f"CREATE TABLE IF NOT EXISTS {_quote(connection, LOCK_TABLE)} ("
+        "id INT NOT NULL PRIMARY KEY, "
+        "owner VARCHAR(255) NOT NULL, "
+        "locked_at BIGINT NOT NULL)"
+    )
+
+
+async def get_applied_versions(connection: Optional[BaseDBAsyncClient] = None) -> Dict[int, Any]:
+    """获取已执行的迁移版本及执行时间"""
+    connection = connection or connections.get("default")
+    rows = await connection.execute_query_dict(
+        f"SELECT version, applied_at FROM {_quote(connection, VERSION_TABLE)}"
+    )
+    return {row["version"]: row["applied_at"] for row in rows}
+
+
+class MigrationLock:
+    """
+    基于数据库表的迁移锁，所有数据库后端通用
+
+    获取锁即插入 id=1 的锁记录，插入因主键冲突失败说明其他worker正在迁移。
+    持有锁期间每隔 timeout/3 秒续期锁记录的时间，迁移耗时再长锁也不会失效。
+    锁记录在以下情况下视为失效并被清除（持有锁的进程异常退出）：
+    - 持有者与当前进程在同一主机上，且持有者进程已不存在
+    - 持有者在其他主机上，且超过 timeout 秒没有续期
+
+    Args:
+        connection: 数据库连接
+        timeout: 锁记录没有续期时的失效时间（秒）
+    """
+
+    def __init__(self, connection: BaseDBAsyncClient, timeout: float) -> None:
+        self.connection = connection
+        self.timeout = timeout
+        self.hostname = socket.gethostname()
+        self.owner = f"{self.hostname}:{os.getpid()}"
+        self._table = _quote(connection, LOCK_TABLE)
+        self._param = _placeholder(connection)
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def _is_stale(self, owner: str, locked_at: int) -> bool:
+        hostname, _, pid = owner.rpartition(":")
+        if hostname == self.hostname and pid.isdigit():
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return True
+            except PermissionError:
+                pass
+            return False
+        return locked_at < time.time() - self.timeout
+
+    async def _try_acquire(self) -> bool:
+        try:
+            await self.connection.execute_query(
+                f"INSERT INTO {self._table} (id, owner, locked_at) VALUES (1, {self._param}, {self._param})",
+                [self.owner, int(time.time())],
+            )
+            return True
+        except IntegrityError:
+            pass
+        rows = await self.connection.execute_query_dict(
+            f"SELECT owner, locked_at FROM {self._table} WHERE id = 1"
+        )
+        if rows and self._is_stale(rows[0]["owner"], rows[0]["locked_at"]):
+            # 只删除读到的那条记录，期间被续期或被其他worker重新获取的锁不受影响；
+            # 清除后下一轮重新尝试获取
+            logger.warning(f"清除失效的数据库迁移锁（持有者 {rows[0]['owner']}）")
+            await self.connection.execute_query(
+                f"DELETE FROM {self._table} WHERE id = 1 AND owner = {self._param} AND locked_at = {self._param}",
+                [rows[0]["owner"], rows[0]["locked_at"]],
+            )
+        return False
+
+    async def acquire(self) -> None:
+        waited = False
+        while not await self._try_acquire():
+            if not waited:
+                logger.info("其他进程正在执行数据库迁移，等待其完成")
+                waited = True
+            await asyncio.sleep(0.5)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.timeout / 3)
+            try:
+                await self.connection.execute_query(
+                    f"UPDATE {self._table} SET locked_at = {self._param} WHERE id = 1 AND owner = {self._param}",
+                    [int(time.time()), self.owner],
+                )
+            except Exception as e:
+                logger.error(f"续期数据库迁移锁失败: {e}")
+
+    async def release(self) -> None:
+        await self.connection.execute_query(
+            f"DELETE FROM {self._table} WHERE id = 1 AND owner = {self._param}",
+            [self.owner],
+        )
+
+    async def __aenter__(self) -> "MigrationLock":
+        await self.acquire()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        await self.release()
+
+
+async def _apply(version: int, module_name: str) -> None:
+    module = importlib.import_module(f"{MIGRATIONS_PACKAGE}.{module_name}")
+    start = time.perf_counter()
+    async with transaction() as connection:
+        await module.upgrade(connection)
+        await connection.execute_query(
+            f"INSERT INTO {_quote(connection, VERSION_TABLE)} (version, name) "
+            f"VALUES ({_placeholder(connection)}, {_placeholder(connection)})",
+            [version, module_name],
+        )
+    logger.info(f"已执行数据库迁移 {module_name}（{(time.perf_counter() - start) * 1000:.0f}ms）")
+
+
+async def run_migrations(apply: Optional[bool] = None) -> List[str]:
+    """
+    执行尚未执行的数据库迁移
+
+    Args:
+        apply: 是否执行迁移，默认为 settings.DB_AUTO_MIGRATE；为False时只检查并记录待执行的迁移
+
+    Returns:
+        本次执行的迁移名称列表
+    """
+    if apply is None:
+        apply = settings.DB_AUTO_MIGRATE
+    connection = connections.get("default")
+    await _ensure_tables(connection)
+    migrations = discover_migrations()
+    applied = await get_applied_versions(connection)
+    if all(version in applied for version, _ in migrations):
+        return []
+    if not apply:
+        pending = [name for version, name in migrations if version not in applied]
+        logger.warning(f"有未执行的数据库迁移: {pending}，请运行 python scripts/migrate.py")
+        return []
+
+    executed = []
+    async with MigrationLock(connection, settings.DB_MIGRATION_LOCK_TIMEOUT):
+        # 等锁期间其他worker可能已经执行完迁移
+        applied = await get_applied_versions(connection)
+        for version, module_name in migrations:
+            if version not in applied:
+                await _apply(version, module_name)
+                executed.append(module_name)
+    return executed
+
+
+async def get_migration_status() -> List[Dict[str, Any]]:
+    """列出所有迁移及其执行状态"""
+    connection = connections.get("default")
+    await _ensure_tables(connection)
+    applied = await get_applied_versions(connection)
+    return [
+        {"version": version, "name": name, "applied_at": applied.get(version)}
+        for version, name in discover_migrations()
+    ]
+
+
+async def _index_columns(connection: BaseDBAsyncClient, table: str) -> List[Tuple[str, ...]]:
+    if connection.capabilities.dialect == "mysql":
+        rows = await connection.execute_query_dict(
+            "SELECT INDEX_NAME AS name, COLUMN_NAME AS col FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+            [table],
+        )
+        indexes: Dict[str, List[str]] = {}
+        for row in rows:
+            indexes.setdefault(row["name"], []).append(row["col"])
+        return [tuple(columns) for columns in indexes.values()]
+    result = []
+    for index in await connection.execute_query_dict(f'PRAGMA index_list("{table}")'):
+        info = await connection.execute_query_dict(f'PRAGMA index_info("{index["name"]}")')
+        result.append(tuple(row["name"] for row in sorted(info, key=lambda row: row["seqno"])))
+    return result
+
+
+async def get_columns(connection: BaseDBAsyncClient, table: str) -> List[str]:
+    """获取表的列名"""
+    if connection.capabilities.dialect == "mysql":
+        rows = await connection.execute_query_dict(
+            "SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [table],
+        )
+    else:
+        rows = await connection.execute_query_dict(f'PRAGMA table_info("{table}")')
+    return [row["name"] for row in rows]
+
+
+async def ensure_index(connection: BaseDBAsyncClient, table: str, columns: Sequence[str]) -> bool:
+    """
+    表上没有以这些列（按顺序）开头的索引时创建索引，表不存在时跳过
+
+    Returns:
+        是否创建了索引
+    """
+    columns = tuple(columns)
+    if not await get_columns(connection, table):
+        logger.info(f"表 {table} 不存在，跳过创建索引")
+        return False
+    for existing in await _index_columns(connection, table):
+        if existing[: len(columns)] == columns:
+            return False
+    name = f"idx_{table}_{'_'.join(columns)}"[:64]
+    quoted = ", ".join(_quote(connection, column) for column in columns)
+    await connection.execute_query(
+        f"CREATE INDEX {_quote(connection, name)} ON {_quote(connection, table)} ({quoted})"
+    )
+    logger.info(f"已创建索引 {name}")
+    return True
+
+
+async def ensure_column(connection: BaseDBAsyncClient, table: str, column: str, definition: str) -> bool:
+    """
+    表上没有该列时添加列，表不存在时跳过
+
+    Args:
+        definition: 列定义，如 "INT NOT NULL DEFAULT 0"
+
+    Returns:
+        是否添加了列
+    """
+    existing = await get_columns(connection, table)
+    if not existing:
+        logger.info(f"表 {table} 不存在，跳过添加列")
+        return False
+    if column in existing:
+        return False
+    await connection.execute_query(
+        f"ALTER TABLE {_quote(connection, table)} ADD COLUMN {_quote(connection, column)} {definition}"
+    )
+    logger.info(f"已添加列 {table}.{column}")
+    return True
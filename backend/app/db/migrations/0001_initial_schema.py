@@ -0,0 +1,269 @@
+"""
+初始表结构：创建引入迁移机制时模型对应的表（已存在的表不做修改）
+
+表结构是固定的快照，不随之后的模型修改而变化；模型的后续修改需要新增迁移。
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS "api_stat" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 统计ID，主键 */,
+    "endpoint" VARCHAR(255) NOT NULL /* API路径 */,
+    "method" VARCHAR(10) NOT NULL /* HTTP方法，如GET、POST等 */,
+    "status_code" INT NOT NULL /* HTTP状态码 */,
+    "response_time" REAL NOT NULL /* 响应时间(秒) */,
+    "timestamp" TIMESTAMP NOT NULL /* 调用时间 */,
+    "user_id" INT /* 用户ID，可为空表示匿名访问 */,
+    "query_count" INT NOT NULL DEFAULT 0 /* 本次调用执行的SQL语句数 */,
+    "db_time" REAL NOT NULL DEFAULT 0 /* 本次调用的数据库耗时(秒) */
+) /* API调用统计数据模型 */;
+CREATE INDEX IF NOT EXISTS "idx_api_stat_timesta_4aa5d0" ON "api_stat" ("timestamp");
+CREATE INDEX IF NOT EXISTS "idx_api_stat_endpoin_c63f56" ON "api_stat" ("endpoint", "timestamp");
+CREATE INDEX IF NOT EXISTS "idx_api_stat_endpoin_079aa0" ON "api_stat" ("endpoint", "method");
+CREATE TABLE IF NOT EXISTS "api_stats_daily" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 每日统计ID，主键 */,
+    "date" DATE NOT NULL /* 统计日期 */,
+    "total_calls" INT NOT NULL DEFAULT 0 /* 当日API总调用次数 */,
+    "unique_users" INT NOT NULL DEFAULT 0 /* 当日独立用户数 */,
+    "avg_response_time" REAL NOT NULL DEFAULT 0 /* 当日平均响应时间(毫秒) */,
+    "error_count" INT NOT NULL DEFAULT 0 /* 当日错误请求次数 */,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 创建时间 */,
+    "updated_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 最后更新时间 */,
+    CONSTRAINT "uid_api_stats_d_date_39d3f3" UNIQUE ("date")
+) /* API调用每日统计数据模型 */;
+CREATE TABLE IF NOT EXISTS "api_status_codes" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 状态码统计ID，主键 */,
+    "status_code" INT NOT NULL /* HTTP状态码 */,
+    "count" INT NOT NULL DEFAULT 0 /* 该状态码出现次数 */,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 创建时间 */,
+    "updated_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 最后更新时间 */,
+    "api_stat_id" INT NOT NULL REFERENCES "api_stat" ("id") ON DELETE CASCADE /* 关联的API统计记录 */,
+    CONSTRAINT "uid_api_status__api_sta_68b1c4" UNIQUE ("api_stat_id", "status_code")
+) /* API状态码统计数据模型 */;
+CREATE TABLE IF NOT EXISTS "messages" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 消息ID，主键，自动生成 */,
+    "name" VARCHAR(100) NOT NULL /* 发送者姓名 */,
+    "email" VARCHAR(100) NOT NULL /* 发送者邮箱 */,
+    "subject" VARCHAR(255) NOT NULL /* 消息主题 */,
+    "message" TEXT NOT NULL /* 消息内容 */,
+    "is_read" INT NOT NULL DEFAULT 0 /* 是否已读 */,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 创建时间 */
+) /* 联系消息模型 */;
+CREATE INDEX IF NOT EXISTS "idx_messages_is_read_a60f7f" ON "messages" ("is_read", "created_at");
+CREATE TABLE IF NOT EXISTS "projects" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 项目ID，主键，自动生成 */,
+    "title" VARCHAR(255) NOT NULL /* 项目标题 */,
+    "slug" VARCHAR(255) NOT NULL UNIQUE /* URL友好的标识符，唯一 */,
+    "description" TEXT NOT NULL /* 项目描述 */,
+    "image_url" VARCHAR(255) /* 项目图片URL */,
+    "github_url" VARCHAR(255) /* GitHub仓库地址 */,
+    "live_url" VARCHAR(255) /* 项目线上地址 */,
+    "featured" INT NOT NULL DEFAULT 0 /* 是否为推荐项目 */,
+    "stars_count" INT NOT NULL DEFAULT 0 /* GitHub星标数量 */,
+    "forks_count" INT NOT NULL DEFAULT 0 /* GitHub分支数量 */,
+    "emoji" VARCHAR(10) /* 项目emoji图标 */,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 创建时间 */,
+    "updated_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 最后更新时间 */
+) /* 项目模型 */;
+CREATE TABLE IF NOT EXISTS "revoked_tokens" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 记录ID，主键 */,
+    "jti" VARCHAR(64) NOT NULL UNIQUE /* 令牌唯一标识(JWT jti) */,
+    "user_id" INT /* 令牌所属用户ID */,
+    "expires_at" TIMESTAMP NOT NULL /* 令牌原过期时间，过期后记录可清理 */,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 吊销时间 */
+) /* 已吊销令牌模型 */;
+CREATE INDEX IF NOT EXISTS "idx_revoked_tok_expires_b3eec6" ON "revoked_tokens" ("expires_at");
+CREATE TABLE IF NOT EXISTS "stats" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 统计ID，主键 */,
+    "key" VARCHAR(50) NOT NULL UNIQUE /* 统计项键名，唯一 */,
+    "value" INT NOT NULL /* 统计项数值 */,
+    "display_text" VARCHAR(100) NOT NULL /* 显示文本 */,
+    "updated_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 最后更新时间 */
+) /* 统计数据模型 */;
+CREATE TABLE IF NOT EXISTS "tags" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 标签ID，主键，自动生成 */,
+    "name" VARCHAR(50) NOT NULL UNIQUE /* 标签名称，唯一 */,
+    "slug" VARCHAR(50) NOT NULL UNIQUE /* URL友好的标识符，唯一 */,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 创建时间 */
+) /* 标签模型 */;
+CREATE TABLE IF NOT EXISTS "users" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 用户ID，主键 */,
+    "username" VARCHAR(50) NOT NULL UNIQUE /* 用户名，唯一 */,
+    "email" VARCHAR(100) NOT NULL UNIQUE /* 电子邮箱，唯一 */,
+    "password_hash" VARCHAR(255) NOT NULL /* 密码哈希值 */,
+    "full_name" VARCHAR(100) /* 用户全名 */,
+    "bio" TEXT /* 个人简介 */,
+    "avatar_url" VARCHAR(255) /* 头像URL地址 */,
+    "role" VARCHAR(20) NOT NULL DEFAULT 'user' /* 用户角色，可以是admin或user */,
+    "github_url" VARCHAR(255) /* GitHub主页地址 */,
+    "linkedin_url" VARCHAR(255) /* LinkedIn主页地址 */,
+    "twitter_url" VARCHAR(255) /* Twitter主页地址 */,
+    "website_url" VARCHAR(255) /* 个人网站地址 */,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 创建时间 */,
+    "updated_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 最后更新时间 */
+) /* 用户模型 */;
+CREATE TABLE IF NOT EXISTS "articles" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 文章ID，主键，自动生成 */,
+    "title" VARCHAR(255) NOT NULL /* 文章标题 */,
+    "slug" VARCHAR(255) NOT NULL UNIQUE /* URL友好的标识符，唯一 */,
+    "excerpt" TEXT NOT NULL /* 文章摘要 */,
+    "content" TEXT NOT NULL /* 文章正文内容 */,
+    "cover_image" VARCHAR(255) /* 封面图片URL */,
+    "status" VARCHAR(20) NOT NULL DEFAULT 'draft' /* 文章状态，可以是draft或published */,
+    "featured" INT NOT NULL DEFAULT 0 /* 是否为推荐文章 */,
+    "view_count" INT NOT NULL DEFAULT 0 /* 浏览次数 */,
+    "read_time" INT NOT NULL DEFAULT 0 /* 阅读时间（分钟） */,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 创建时间 */,
+    "updated_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 最后更新时间 */,
+    "published_at" TIMESTAMP /* 发布时间 */,
+    "author_id" INT NOT NULL REFERENCES "users" ("id") ON DELETE CASCADE /* 作者，外键关联到用户 */
+) /* 文章模型 */;
+CREATE INDEX IF NOT EXISTS "idx_articles_status_c5be0d" ON "articles" ("status", "featured", "id");
+CREATE TABLE IF NOT EXISTS "project_tags" (
+    "projects_id" INT NOT NULL REFERENCES "projects" ("id") ON DELETE CASCADE,
+    "tag_id" INT NOT NULL REFERENCES "tags" ("id") ON DELETE CASCADE
+) /* 项目标签，多对多关系 */;
+CREATE UNIQUE INDEX IF NOT EXISTS "uidx_project_tag_project_58bbdc" ON "project_tags" ("projects_id", "tag_id");
+CREATE TABLE IF NOT EXISTS "article_tags" (
+    "article_id" INT NOT NULL REFERENCES "articles" ("id") ON DELETE CASCADE,
+    "tag_id" INT NOT NULL REFERENCES "tags" ("id") ON DELETE CASCADE
+) /* 文章标签，多对多关系 */;
+CREATE UNIQUE INDEX IF NOT EXISTS "uidx_article_tag_article_53c588" ON "article_tags" ("article_id", "tag_id");
+"""
+
+MYSQL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS `api_stat` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '统计ID，主键',
+    `endpoint` VARCHAR(255) NOT NULL COMMENT 'API路径',
+    `method` VARCHAR(10) NOT NULL COMMENT 'HTTP方法，如GET、POST等',
+    `status_code` INT NOT NULL COMMENT 'HTTP状态码',
+    `response_time` DOUBLE NOT NULL COMMENT '响应时间(秒)',
+    `timestamp` DATETIME(6) NOT NULL COMMENT '调用时间',
+    `user_id` INT COMMENT '用户ID，可为空表示匿名访问',
+    `query_count` INT NOT NULL COMMENT '本次调用执行的SQL语句数' DEFAULT 0,
+    `db_time` DOUBLE NOT NULL COMMENT '本次调用的数据库耗时(秒)' DEFAULT 0,
+    KEY `idx_api_stat_timesta_4aa5d0` (`timestamp`),
+    KEY `idx_api_stat_endpoin_c63f56` (`endpoint`, `timestamp`),
+    KEY `idx_api_stat_endpoin_079aa0` (`endpoint`, `method`)
+) CHARACTER SET utf8mb4 COMMENT='API调用统计数据模型';
+CREATE TABLE IF NOT EXISTS `api_stats_daily` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '每日统计ID，主键',
+    `date` DATE NOT NULL COMMENT '统计日期',
+    `total_calls` INT NOT NULL COMMENT '当日API总调用次数' DEFAULT 0,
+    `unique_users` INT NOT NULL COMMENT '当日独立用户数' DEFAULT 0,
+    `avg_response_time` DOUBLE NOT NULL COMMENT '当日平均响应时间(毫秒)' DEFAULT 0,
+    `error_count` INT NOT NULL COMMENT '当日错误请求次数' DEFAULT 0,
+    `created_at` DATETIME(6) NOT NULL COMMENT '创建时间' DEFAULT CURRENT_TIMESTAMP(6),
+    `updated_at` DATETIME(6) NOT NULL COMMENT '最后更新时间' DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    UNIQUE KEY `uid_api_stats_d_date_39d3f3` (`date`)
+) CHARACTER SET utf8mb4 COMMENT='API调用每日统计数据模型';
+CREATE TABLE IF NOT EXISTS `api_status_codes` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '状态码统计ID，主键',
+    `status_code` INT NOT NULL COMMENT 'HTTP状态码',
+    `count` INT NOT NULL COMMENT '该状态码出现次数' DEFAULT 0,
+    `created_at` DATETIME(6) NOT NULL COMMENT '创建时间' DEFAULT CURRENT_TIMESTAMP(6),
+    `updated_at` DATETIME(6) NOT NULL COMMENT '最后更新时间' DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    `api_stat_id` INT NOT NULL COMMENT '关联的API统计记录',
+    UNIQUE KEY `uid_api_status__api_sta_68b1c4` (`api_stat_id`, `status_code`),
+    CONSTRAINT `fk_api_stat_api_stat_79d2fc1d` FOREIGN KEY (`api_stat_id`) REFERENCES `api_stat` (`id`) ON DELETE CASCADE
+) CHARACTER SET utf8mb4 COMMENT='API状态码统计数据模型';
+CREATE TABLE IF NOT EXISTS `messages` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '消息ID，主键，自动生成',
+    `name` VARCHAR(100) NOT NULL COMMENT '发送者姓名',
+    `email` VARCHAR(100) NOT NULL COMMENT '发送者邮箱',
+    `subject` VARCHAR(255) NOT NULL COMMENT '消息主题',
+    `message` LONGTEXT NOT NULL COMMENT '消息内容',
+    `is_read` BOOL NOT NULL COMMENT '是否已读' DEFAULT 0,
+    `created_at` DATETIME(6) NOT NULL COMMENT '创建时间' DEFAULT CURRENT_TIMESTAMP(6),
+    KEY `idx_messages_is_read_a60f7f` (`is_read`, `created_at`)
+) CHARACTER SET utf8mb4 COMMENT='联系消息模型';
+CREATE TABLE IF NOT EXISTS `projects` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '项目ID，主键，自动生成',
+    `title` VARCHAR(255) NOT NULL COMMENT '项目标题',
+    `slug` VARCHAR(255) NOT NULL UNIQUE COMMENT 'URL友好的标识符，唯一',
+    `description` LONGTEXT NOT NULL COMMENT '项目描述',
+    `image_url` VARCHAR(255) COMMENT '项目图片URL',
+    `github_url` VARCHAR(255) COMMENT 'GitHub仓库地址',
+    `live_url` VARCHAR(255) COMMENT '项目线上地址',
+    `featured` BOOL NOT NULL COMMENT '是否为推荐项目' DEFAULT 0,
+    `stars_count` INT NOT NULL COMMENT 'GitHub星标数量' DEFAULT 0,
+    `forks_count` INT NOT NULL COMMENT 'GitHub分支数量' DEFAULT 0,
+    `emoji` VARCHAR(10) COMMENT '项目emoji图标',
+    `created_at` DATETIME(6) NOT NULL COMMENT '创建时间' DEFAULT CURRENT_TIMESTAMP(6),
+    `updated_at` DATETIME(6) NOT NULL COMMENT '最后更新时间' DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
+) CHARACTER SET utf8mb4 COMMENT='项目模型';
+CREATE TABLE IF NOT EXISTS `revoked_tokens` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '记录ID，主键',
+    `jti` VARCHAR(64) NOT NULL UNIQUE COMMENT '令牌唯一标识(JWT jti)',
+    `user_id` INT COMMENT '令牌所属用户ID',
+    `expires_at` DATETIME(6) NOT NULL COMMENT '令牌原过期时间，过期后记录可清理',
+    `created_at` DATETIME(6) NOT NULL COMMENT '吊销时间' DEFAULT CURRENT_TIMESTAMP(6),
+    KEY `idx_revoked_tok_expires_b3eec6` (`expires_at`)
+) CHARACTER SET utf8mb4 COMMENT='已吊销令牌模型';
+CREATE TABLE IF NOT EXISTS `stats` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '统计ID，主键',
+    `key` VARCHAR(50) NOT NULL UNIQUE COMMENT '统计项键名，唯一',
+    `value` INT NOT NULL COMMENT '统计项数值',
+    `display_text` VARCHAR(100) NOT NULL COMMENT '显示文本',
+    `updated_at` DATETIME(6) NOT NULL COMMENT '最后更新时间' DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
+) CHARACTER SET utf8mb4 COMMENT='统计数据模型';
+CREATE TABLE IF NOT EXISTS `tags` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '标签ID，主键，自动生成',
+    `name` VARCHAR(50) NOT NULL UNIQUE COMMENT '标签名称，唯一',
+    `slug` VARCHAR(50) NOT NULL UNIQUE COMMENT 'URL友好的标识符，唯一',
+    `created_at` DATETIME(6) NOT NULL COMMENT '创建时间' DEFAULT CURRENT_TIMESTAMP(6)
+) CHARACTER SET utf8mb4 COMMENT='标签模型';
+CREATE TABLE IF NOT EXISTS `users` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '用户ID，主键',
+    `username` VARCHAR(50) NOT NULL UNIQUE COMMENT '用户名，唯一',
+    `email` VARCHAR(100) NOT NULL UNIQUE COMMENT '电子邮箱，唯一',
+    `password_hash` VARCHAR(255) NOT NULL COMMENT '密码哈希值',
+    `full_name` VARCHAR(100) COMMENT '用户全名',
+    `bio` LONGTEXT COMMENT '个人简介',
+    `avatar_url` VARCHAR(255) COMMENT '头像URL地址',
+    `role` VARCHAR(20) NOT NULL COMMENT '用户角色，可以是admin或user' DEFAULT 'user',
+    `github_url` VARCHAR(255) COMMENT 'GitHub主页地址',
+    `linkedin_url` VARCHAR(255) COMMENT 'LinkedIn主页地址',
+    `twitter_url` VARCHAR(255) COMMENT 'Twitter主页地址',
+    `website_url` VARCHAR(255) COMMENT '个人网站地址',
+    `created_at` DATETIME(6) NOT NULL COMMENT '创建时间' DEFAULT CURRENT_TIMESTAMP(6),
+    `updated_at` DATETIME(6) NOT NULL COMMENT '最后更新时间' DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
+) CHARACTER SET utf8mb4 COMMENT='用户模型';
+CREATE TABLE IF NOT EXISTS `articles` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '文章ID，主键，自动生成',
+    `title` VARCHAR(255) NOT NULL COMMENT '文章标题',
+    `slug` VARCHAR(255) NOT NULL UNIQUE COMMENT 'URL友好的标识符，唯一',
+    `excerpt` LONGTEXT NOT NULL COMMENT '文章摘要',
+    `content` LONGTEXT NOT NULL COMMENT '文章正文内容',
+    `cover_image` VARCHAR(255) COMMENT '封面图片URL',
+    `status` VARCHAR(20) NOT NULL COMMENT '文章状态，可以是draft或published' DEFAULT 'draft',
+    `featured` BOOL NOT NULL COMMENT '是否为推荐文章' DEFAULT 0,
+    `view_count` INT NOT NULL COMMENT '浏览次数' DEFAULT 0,
+    `read_time` INT NOT NULL COMMENT '阅读时间（分钟）' DEFAULT 0,
+    `created_at` DATETIME(6) NOT NULL COMMENT '创建时间' DEFAULT CURRENT_TIMESTAMP(6),
+    `updated_at` DATETIME(6) NOT NULL COMMENT '最后更新时间' DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    `published_at` DATETIME(6) COMMENT '发布时间',
+    `author_id` INT NOT NULL COMMENT '作者，外键关联到用户',
+    CONSTRAINT `fk_articles_users_3b493172` FOREIGN KEY (`author_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
+    KEY `idx_articles_status_c5be0d` (`status`, `featured`, `id`)
+) CHARACTER SET utf8mb4 COMMENT='文章模型';
+CREATE TABLE IF NOT EXISTS `project_tags` (
+    `projects_id` INT NOT NULL,
+    `tag_id` INT NOT NULL,
+    FOREIGN KEY (`projects_id`) REFERENCES `projects` (`id`) ON DELETE CASCADE,
+    FOREIGN KEY (`tag_id`) REFERENCES `tags` (`id`) ON DELETE CASCADE,
+    UNIQUE KEY `uidx_project_tag_project_58bbdc` (`projects_id`, `tag_id`)
+) CHARACTER SET utf8mb4 COMMENT='项目标签，多对多关系';
+CREATE TABLE IF NOT EXISTS `article_tags` (
+    `article_id` INT NOT NULL,
+    `tag_id` INT NOT NULL,
+    FOREIGN KEY (`article_id`) REFERENCES `articles` (`id`) ON DELETE CASCADE,
+    FOREIGN KEY (`tag_id`) REFERENCES `tags` (`id`) ON DELETE CASCADE,
+    UNIQUE KEY `uidx_article_tag_article_53c588` (`article_id`, `tag_id`)
+) CHARACTER SET utf8mb4 COMMENT='文章标签，多对多关系';
+"""
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    schema = MYSQL_SCHEMA if connection.capabilities.dialect == "mysql" else SQLITE_SCHEMA
+    await connection.execute_script(schema)
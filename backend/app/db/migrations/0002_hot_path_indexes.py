@@ -0,0 +1,25 @@
+"""
+热点查询的索引
+
+- api_stat(timestamp)：趋势统计按时间范围扫描
+- api_stat(endpoint, method)：按接口和方法分组统计
+- articles(status, featured, id)：已发布/推荐文章列表
+- messages(is_read, created_at)：未读消息列表
+- subscribers(status, created_at)：有效订阅者列表
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from app.db.migrate import ensure_index
+
+INDEXES = (
+    ("api_stat", ("timestamp",)),
+    ("api_stat", ("endpoint", "method")),
+    ("articles", ("status", "featured", "id")),
+    ("messages", ("is_read", "created_at")),
+    ("subscribers", ("status", "created_at")),
+)
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    for table, columns in INDEXES:
+        await ensure_index(connection, table, columns)
@@ -0,0 +1,15 @@
+"""
+API调用统计增加每次调用的SQL语句数和数据库耗时
+
+这两列在引入迁移机制之前就已加入模型，部分数据库可能已按 README 中的升级说明手动添加，
+因此用 ensure_column 跳过已存在的列。
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from app.db.migrate import ensure_column
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    float_type = "DOUBLE" if connection.capabilities.dialect == "mysql" else "REAL"
+    await ensure_column(connection, "api_stat", "query_count", "INT NOT NULL DEFAULT 0")
+    await ensure_column(connection, "api_stat", "db_time", f"{float_type} NOT NULL DEFAULT 0")
@@ -0,0 +1,13 @@
+"""
+worker选主使用的租约表，见 app.core.leader
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    await connection.execute_query(
+        "CREATE TABLE IF NOT EXISTS leader_lease ("
+        "name VARCHAR(64) NOT NULL PRIMARY KEY, "
+        "owner VARCHAR(255) NOT NULL, "
+        "expires_at BIGINT NOT NULL)"
+    )
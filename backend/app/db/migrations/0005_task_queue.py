@@ -0,0 +1,61 @@
+"""
+后台任务队列表（见 app.core.task_queue），同时补建注册为模型的订阅者表
+
+两张表的DDL是固定的快照，已存在的表不做修改。
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS "task_queue" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 任务ID，主键 */,
+    "name" VARCHAR(100) NOT NULL /* 任务名，对应注册的任务处理函数 */,
+    "payload" JSON NOT NULL /* 任务参数 */,
+    "status" VARCHAR(16) NOT NULL DEFAULT 'pending' /* 任务状态：pending、running、done、failed */,
+    "attempts" INT NOT NULL DEFAULT 0 /* 已执行次数 */,
+    "max_attempts" INT NOT NULL DEFAULT 5 /* 最多执行次数 */,
+    "run_at" TIMESTAMP NOT NULL /* 最早执行时间 */,
+    "locked_by" VARCHAR(255) /* 执行中的worker及本次领取的标识 */,
+    "locked_until" TIMESTAMP /* 领取的过期时间，过期后任务可被其他worker重新领取 */,
+    "last_error" TEXT /* 最近一次执行失败的错误信息 */,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 创建时间 */,
+    "updated_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 最后更新时间 */
+) /* 后台任务队列中的任务模型 */;
+CREATE INDEX IF NOT EXISTS "idx_task_queue_status_53c323" ON "task_queue" ("status", "run_at");
+CREATE TABLE IF NOT EXISTS "subscribers" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL /* 订阅者ID，主键 */,
+    "email" VARCHAR(100) NOT NULL UNIQUE /* 订阅者邮箱，唯一 */,
+    "status" VARCHAR(20) NOT NULL DEFAULT 'active' /* 订阅状态，可以是active或unsubscribed */,
+    "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP /* 创建时间 */
+) /* 订阅者模型 */;
+CREATE INDEX IF NOT EXISTS "idx_subscribers_status_c88355" ON "subscribers" ("status", "created_at");
+"""
+
+MYSQL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS `task_queue` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '任务ID，主键',
+    `name` VARCHAR(100) NOT NULL COMMENT '任务名，对应注册的任务处理函数',
+    `payload` JSON NOT NULL COMMENT '任务参数',
+    `status` VARCHAR(16) NOT NULL COMMENT '任务状态：pending、running、done、failed' DEFAULT 'pending',
+    `attempts` INT NOT NULL COMMENT '已执行次数' DEFAULT 0,
+    `max_attempts` INT NOT NULL COMMENT '最多执行次数' DEFAULT 5,
+    `run_at` DATETIME(6) NOT NULL COMMENT '最早执行时间',
+    `locked_by` VARCHAR(255) COMMENT '执行中的worker及本次领取的标识',
+    `locked_until` DATETIME(6) COMMENT '领取的过期时间，过期后任务可被其他worker重新领取',
+    `last_error` LONGTEXT COMMENT '最近一次执行失败的错误信息',
+    `created_at` DATETIME(6) NOT NULL COMMENT '创建时间' DEFAULT CURRENT_TIMESTAMP(6),
+    `updated_at` DATETIME(6) NOT NULL COMMENT '最后更新时间' DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    KEY `idx_task_queue_status_53c323` (`status`, `run_at`)
+) CHARACTER SET utf8mb4 COMMENT='后台任务队列中的任务模型';
+CREATE TABLE IF NOT EXISTS `subscribers` (
+    `id` INT NOT NULL PRIMARY KEY AUTO_INCREMENT COMMENT '订阅者ID，主键',
+    `email` VARCHAR(100) NOT NULL UNIQUE COMMENT '订阅者邮箱，唯一',
+    `status` VARCHAR(20) NOT NULL COMMENT '订阅状态，可以是active或unsubscribed' DEFAULT 'active',
+    `created_at` DATETIME(6) NOT NULL COMMENT '创建时间' DEFAULT CURRENT_TIMESTAMP(6),
+    KEY `idx_subscribers_status_c88355` (`status`, `created_at`)
+) CHARACTER SET utf8mb4 COMMENT='订阅者模型';
+"""
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    schema = MYSQL_SCHEMA if connection.capabilities.dialect == "mysql" else SQLITE_SCHEMA
+    await connection.execute_script(schema)
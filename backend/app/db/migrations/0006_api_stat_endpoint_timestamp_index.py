@@ -0,0 +1,13 @@
+"""
+api_stat(endpoint, timestamp) 索引：单个接口的调用详情按接口和时间范围扫描
+
+MySQL 中 0001 把该索引写在 CREATE TABLE IF NOT EXISTS 中，api_stat 表已存在时不会创建，
+0002 中的 (endpoint, method) 索引也不能覆盖这类查询，因此单独补建。
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from app.db.migrate import ensure_index
+
+
+async def upgrade(connection: BaseDBAsyncClient) -> None:
+    await ensure_index(connection, "api_stat", ("endpoint", "timestamp"))
@@ -0,0 +1,10 @@
+"""
+数据库迁移文件
+
+文件名为 "<版本号>_<名称>.py"，按版本号顺序执行，每个文件定义：
+
+    async def upgrade(connection: BaseDBAsyncClient) -> None
+
+执行器见 app.db.migrate。新数据库由 0001 按当前模型建表，之后的迁移会在新旧数据库上都执行，
+需要可以重复执行：使用 app.db.migrate 中的 ensure_index、ensure_column 等检查后再修改。
+"""
@@ -0,0 +1,124 @@
+"""
+MySQL连接池客户端
+
+在 Tortoise ORM 的 MySQL 客户端基础上：
+- 获取连接时设置超时，连接池耗尽时快速失败而不是无限等待
+- 统计连接池的使用情况（使用中、空闲、等待中的请求数和等待时间）
+- 统计每个请求的SQL执行（见 app.db.query_stats），事务中的语句同样计入
+
+在 Tortoise 配置中把 engine 设为 "app.db.mysql_pool" 即可启用，
+参见 app.db.database.get_tortoise_config。连接配置中 "replica" 为真时使用只读副本客户端。
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional, Type
+
+from tortoise.backends.base.client import (
+    NestedTransactionContext,
+    TransactionContext,
+    TransactionContextPooled,
+)
+from tortoise.backends.mysql.client import MySQLClient, TransactionWrapper
+from tortoise.exceptions import DBConnectionError
+
+from app.db.query_stats import QueryStatsMixin
+from app.db.routing import ReplicaFailoverMixin
+
+
+class InstrumentedPool:
+    """
+    连接池代理：为 acquire 增加超时和统计，其余属性转发给原连接池
+    """
+
+    def __init__(self, pool: Any, acquire_timeout: Optional[float]) -> None:
+        self._pool = pool
+        self.acquire_timeout = acquire_timeout
+        self.waiters = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def acquire(self) -> Any:
+        self.waiters += 1
+        start = time.perf_counter()
+        try:
+            connection = await asyncio.wait_for(self._pool.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise DBConnectionError(f"获取数据库连接超时（{self.acquire_timeout}秒）")
+        finally:
+            self.waiters -= 1
+        waited = time.perf_counter() - start
+        self.acquired += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return connection
+
+    def release(self, connection: Any) -> Any:
+        return self._pool.release(connection)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pool, name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计"""
+        size = self._pool.size
+        idle = self._pool.freesize
+        return {
+            "min_size": self._pool.minsize,
+            "max_size": self._pool.maxsize,
+            "size": size,
+            "in_use": size - idle,
+            "idle": idle,
+            "waiters": self.waiters,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_total / self.acquired * 1000, 2) if self.acquired else 0,
+            "max_wait_ms": round(self.wait_max * 1000, 2),
+        }
+
+
+class InstrumentedTransactionWrapper(QueryStatsMixin, TransactionWrapper):
+    """带SQL统计的MySQL事务连接"""
+
+    def _in_transaction(self) -> TransactionContext:
+        return NestedTransactionContext(InstrumentedTransactionWrapper(self))
+
+
+class InstrumentedMySQLClient(QueryStatsMixin, MySQLClient):
+    """
+    带连接获取超时、连接池统计和SQL统计的 MySQL 客户端
+
+    额外的连接参数：
+        acquire_timeout: 从连接池获取连接的超时时间（秒），不设置表示一直等待
+    """
+
+    def __init__(self, *, acquire_timeout: Optional[float] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.acquire_timeout = float(acquire_timeout) if acquire_timeout else None
+
+    async def create_connection(self, with_db: bool) -> None:
+        await super().create_connection(with_db)
+        self._pool = InstrumentedPool(self._pool, self.acquire_timeout)
+
+    def _in_transaction(self) -> TransactionContext:
+        return TransactionContextPooled(InstrumentedTransactionWrapper(self), self._pool_init_lock)
+
+    def get_pool_stats(self) -> Optional[Dict[str, Any]]:
+        """获取连接池统计，连接池尚未创建时返回None"""
+        if isinstance(self._pool, InstrumentedPool):
+            return self._pool.get_stats()
+        return None
+
+
+class ReplicaMySQLClient(ReplicaFailoverMixin, InstrumentedMySQLClient):
+    """只读副本的MySQL客户端：副本不可用时读查询回退主库"""
+
+
+client_class = InstrumentedMySQLClient
+
+
+def get_client_class(db_info: Dict[str, Any]) -> Type[MySQLClient]:
+    """Tortoise 按连接配置选择客户端类"""
+    return ReplicaMySQLClient if db_info.get("replica") else InstrumentedMySQLClient
@@ -0,0 +1,305 @@
+"""
+SQL执行统计模块
+
+在 Tortoise 的数据库客户端上统计每个请求执行的语句数和数据库耗时：
+- QueryStatsMixin 包装客户端的 execute_* 方法，计入当前请求的 RequestQueryStats
+- 请求级的统计对象保存在上下文变量中，由 ApiStatsMiddleware 在请求开始时创建
+- 同一请求中同一形状（去掉字面量后相同）的语句重复执行多次时，记为疑似N+1查询
+- 所有语句（包括请求之外的后台任务）按形状汇总调用次数和耗时，慢语句写入滚动日志文件
+
+客户端类见 app.db.sqlite_client 和 app.db.mysql_pool。
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?|\$\d+")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(query: str) -> str:
+    """
+    语句指纹：去掉字符串和数字字面量、统一占位符、折叠 IN 列表和空白
+
+    例如 SELECT * FROM tags WHERE id IN (1,2,3) LIMIT 10
+    -> SELECT * FROM tags WHERE id IN (?+) LIMIT ?
+    """
+    shape = _STRING_LITERAL.sub("?", query)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _VALUE_LIST.sub("(?+)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestQueryStats:
+    """
+    单个请求的SQL执行统计
+    """
+
+    __slots__ = ("count", "db_time", "shapes")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.db_time = 0.0
+        self.shapes: Counter = Counter()
+
+    def add(self, query: str, elapsed: float) -> None:
+        self.count += 1
+        self.db_time += elapsed
+        self.shapes[fingerprint(query)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """执行次数达到阈值的语句形状及次数"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头中的数据库项"""
+        return f'db;dur={self.db_time * 1000:.1f};desc="{self.count} queries"'
+
+
+_request_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def start_request_stats() -> Tuple[RequestQueryStats, Any]:
+    """
+    为当前上下文创建请求级SQL统计，返回统计对象和用于 reset_request_stats 的令牌
+    """
+    stats = RequestQueryStats()
+    return stats, _request_stats.set(stats)
+
+
+def reset_request_stats(token: Any) -> None:
+    """结束当前上下文的请求级SQL统计"""
+    _request_stats.reset(token)
+
+
+class _StatementStats:
+    """单个语句形状的耗时汇总，最近的若干次耗时用于估算p95"""
+
+    __slots__ = ("calls", "total", "max", "slow", "recent", "last_seen")
+
+    def __init__(self, samples: int) -> None:
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.recent: deque = deque(maxlen=samples)
+        self.last_seen = 0.0
+
+    def p95(self) -> float:
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0.0
+
+
+class SlowQueryLog:
+    """
+    慢查询记录器：按语句形状汇总调用次数、总耗时、最大耗时和p95，
+    单次耗时超过阈值的语句写入滚动日志文件
+
+    日志文件只记录语句本身（参数占位符不替换），不记录参数值，避免把密码哈希等数据写入文件。
+
+    Args:
+        threshold: 慢查询阈值（秒）
+        path: 日志文件路径，为空时只在内存中汇总
+        max_bytes: 单个日志文件的字节上限
+        backups: 保留的备份文件数
+        max_statements: 最多汇总的语句形状数，超出时淘汰总耗时最少的
+        samples: 每个语句形状保留的最近耗时个数
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        path: str,
+        max_bytes: int,
+        backups: int,
+        max_statements: int,
+        samples: int = 256,
+    ) -> None:
+        self.threshold = threshold
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_statements = max_statements
+        self.samples = samples
+        self._statements: Dict[str, _StatementStats] = {}
+        self._file_logger: Optional[logging.Logger] = None
+        self.evicted = 0
+
+    @property
+    def file_path(self) -> str:
+        """
+        当前进程实际写入的日志文件
+
+        多个worker滚动同一个文件会互相覆盖，所以每个进程在文件名中加上pid各写各的
+        """
+        if not self.path:
+            return ""
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{os.getpid()}{ext}"
+
+    def _get_file_logger(self) -> Optional[logging.Logger]:
+        if self._file_logger is None and self.path:
+            file_logger = logging.getLogger(f"{__name__}.slow")
+            file_logger.propagate = False
+            if not file_logger.handlers:
+                file_path = self.file_path
+                try:
+                    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+                    handler = RotatingFileHandler(
+                        file_path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8"
+                    )
+                except OSError as e:
+                    logger.error(f"无法打开慢查询日志文件 {file_path}: {e}")
+                    self.path = ""
+                    return None
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%Y-%m-%d %H:%M:%S"))
+                file_logger.addHandler(handler)
+            self._file_logger = file_logger
+        return self._file_logger
+
+    def record(self, query: str, elapsed: float) -> None:
+        """记录一次语句执行"""
+        shape = fingerprint(query)
+        entry = self._statements.get(shape)
+        if entry is None:
+            if len(self._statements) >= self.max_statements:
+                coldest = min(self._statements, key=lambda key: self._statements[key].total)
+                del self._statements[coldest]
+                self.evicted += 1
+            entry = self._statements[shape] = _StatementStats(self.samples)
+        entry.calls += 1
+        entry.total += elapsed
+        entry.max = max(entry.max, elapsed)
+        entry.recent.append(elapsed)
+        entry.last_seen = time.time()
+        if elapsed >= self.threshold:
+            entry.slow += 1
+            file_logger = self._get_file_logger()
+            if file_logger is not None:
+                file_logger.warning(f"pid={os.getpid()} {elapsed * 1000:.1f}ms {query[:2000]}")
+
+    def get_top(self, order_by: str = "total", limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        按总耗时（total）或单次最大耗时（max）从高到低返回语句形状的汇总，耗时单位为毫秒
+        """
+        top = sorted(self._statements.items(), key=lambda item: getattr(item[1], order_by), reverse=True)
+        return [
+            {
+                "statement": shape[:2000],
+                "calls": entry.calls,
+                "slow_calls": entry.slow,
+                "total_ms": round(entry.total * 1000, 1),
+                "avg_ms": round(entry.total / entry.calls * 1000, 2),
+                "p95_ms": round(entry.p95() * 1000, 2),
+                "max_ms": round(entry.max * 1000, 2),
+                "last_seen": datetime.fromtimestamp(entry.last_seen).isoformat(timespec="seconds"),
+            }
+            for shape, entry in top[:limit]
+        ]
+
+    def reset(self) -> None:
+        """清空内存中的汇总"""
+        self._statements.clear()
+        self.evicted = 0
+
+
+slow_query_log = SlowQueryLog(
+    threshold=settings.SLOW_QUERY_THRESHOLD_MS / 1000,
+    path=settings.SLOW_QUERY_LOG_PATH,
+    max_bytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+    backups=settings.SLOW_QUERY_LOG_BACKUPS,
+    max_statements=settings.SLOW_QUERY_MAX_STATEMENTS,
+)
+
+
+async def _timed(method: Any, query: str, *args: Any) -> Any:
+    start = time.perf_counter()
+    try:
+        return await method(query, *args)
+    finally:
+        elapsed = time.perf_counter() - start
+        slow_query_log.record(query, elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.add(query, elapsed)
+
+
+class QueryStatsMixin:
+    """
+    数据库客户端混入类：把每条语句的执行耗时计入慢查询汇总和当前请求的统计
+    """
+
+    async def execute_insert(self, query: str, values: list) -> Any:
+        return await _timed(super().execute_insert, query, values)
+
+    async def execute_many(self, query: str, values: list) -> None:
+        return await _timed(super().execute_many, query, values)
+
+    async def execute_query(self, query: str, values: Optional[list] = None) -> Any:
+        return await _timed(super().execute_query, query, values)
+
+    async def execute_query_dict(self, query: str, values: Optional[list] = None) -> List[dict]:
+        return await _timed(super().execute_query_dict, query, values)
+
+    async def execute_script(self, query: str) -> None:
+        return await _timed(super().execute_script, query)
+
+
+class NPlusOneReport:
+    """
+    疑似N+1查询报告：按 (接口, 语句形状) 汇总，条目数超出上限时淘汰最久未出现的
+
+    Args:
+        threshold: 同一请求中同一形状的语句执行次数达到该值时记录
+        max_entries: 最多保留的条目数
+    """
+
+    def __init__(self, threshold: int, max_entries: int = 200) -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+    def check(self, endpoint: str, stats: RequestQueryStats) -> None:
+        """检查一个请求的SQL统计，记录重复执行的语句"""
+        if stats.count < self.threshold:
+            return
+        for shape, repeats in stats.repeated(self.threshold):
+            key = (endpoint, shape)
+            entry = self._entries.get(key)
+            if entry is None:
+                logger.warning(f"疑似N+1查询: {endpoint} 中同一语句执行了 {repeats} 次: {shape}")
+                entry = {"endpoint": endpoint, "statement": shape, "requests": 0, "max_repeats": 0}
+                self._entries[key] = entry
+            entry["requests"] += 1
+            entry["max_repeats"] = max(entry["max_repeats"], repeats)
+            entry["last_seen"] = datetime.now().isoformat(timespec="seconds")
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_report(self) -> List[Dict[str, Any]]:
+        """按出现的请求数从多到少返回报告"""
+        return sorted(
+            (dict(entry) for entry in self._entries.values()),
+            key=lambda entry: (entry["requests"], entry["max_repeats"]),
+            reverse=True,
+        )
+
+
+n_plus_one_report = NPlusOneReport(settings.QUERY_N_PLUS_ONE_THRESHOLD)
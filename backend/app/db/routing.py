@@ -0,0 +1,171 @@
+"""
+只读副本路由模块
+
+配置 DATABASE_REPLICA_URL 后，Tortoise 中会多出名为 "replica" 的连接：
+- GET/HEAD 请求中的读查询由 ReplicaRouter 路由到副本，写查询和事务内的查询始终走主库
+- 客户端写入后的若干秒内，其读请求仍走主库（读己之写）
+- 副本上的读查询出错且探测不通时，标记副本不可用并在主库上重新执行这一条查询
+  （只重试失败的查询，不重放整个请求，请求中已经执行的写入不会重复）；
+  之后所有读请求回退主库，定期重新探测
+
+请求级的路由开关由 app.middleware.read_replica_middleware 设置，
+单条查询的回退由副本连接的客户端类实现（ReplicaFailoverMixin，见 get_tortoise_config）。
+"""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
+
+from tortoise import connections
+from tortoise.backends.base.client import TransactionalDBClient
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+REPLICA_CONNECTION = "replica"
+
+
+# 当前请求是否允许读副本
+_read_route: ContextVar[bool] = ContextVar("read_route", default=False)
+
+
+class ReplicaState:
+    """
+    副本健康状态：出错时标记不可用，间隔 retry_interval 秒后在后台重新探测
+    """
+
+    def __init__(self, retry_interval: float, ping_timeout: float) -> None:
+        self.retry_interval = retry_interval
+        self.ping_timeout = ping_timeout
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        self.down_since: Optional[float] = None
+        self._last_check = 0.0
+        self._tasks: Set[asyncio.Task] = set()
+        self.reads = 0
+        self.failovers = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.DATABASE_REPLICA_URL)
+
+    def available(self) -> bool:
+        """副本已配置且可用"""
+        return self.enabled and self.healthy
+
+    async def ping(self) -> bool:
+        """探测副本是否可用"""
+        self._last_check = time.monotonic()
+        try:
+            await connections.get(REPLICA_CONNECTION).ping(self.ping_timeout)
+        except Exception as e:
+            self.mark_down(e)
+            return False
+        if not self.healthy:
+            logger.info("只读副本已恢复")
+        self.healthy = True
+        self.down_since = None
+        return True
+
+    def mark_down(self, error: BaseException) -> None:
+        """标记副本不可用"""
+        self.last_error = f"{type(error).__name__}: {error}"
+        if self.healthy:
+            self.healthy = False
+            self.down_since = time.time()
+            logger.warning(f"只读副本不可用，读请求回退主库: {self.last_error}")
+
+    def maybe_recover(self) -> None:
+        """副本不可用且距上次探测超过 retry_interval 时，在后台重新探测"""
+        if not self.enabled or self.healthy or self._tasks:
+            return
+        if time.monotonic() - self._last_check < self.retry_interval:
+            return
+        task = asyncio.create_task(self.ping())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取副本路由统计"""
+        return {
+            "enabled": self.enabled,
+            "healthy": self.healthy,
+            "down_since": self.down_since,
+            "last_error": self.last_error,
+            "reads": self.reads,
+            "failovers": self.failovers,
+        }
+
+
+replica_state = ReplicaState(
+    retry_interval=settings.DB_REPLICA_RETRY_INTERVAL,
+    ping_timeout=settings.DB_REPLICA_PING_TIMEOUT,
+)
+
+
+def allow_replica_reads() -> Any:
+    """
+    允许当前上下文中的读查询使用副本，返回用于 reset_replica_reads 的令牌
+    """
+    return _read_route.set(True)
+
+
+def reset_replica_reads(token: Any) -> None:
+    """恢复 allow_replica_reads 之前的路由状态"""
+    _read_route.reset(token)
+
+
+async def _failover(error: Exception) -> Any:
+    """
+    副本上的查询出错后调用：副本探测不通时返回主库连接，否则重新抛出原错误
+    """
+    # 副本正常说明是查询本身的错误（如语法错误），不应在主库上重试
+    if replica_state.healthy and await replica_state.ping():
+        raise error
+    replica_state.failovers += 1
+    logger.warning(f"只读副本查询失败，在主库上重试: {error}")
+    return connections.get("default")
+
+
+class ReplicaFailoverMixin:
+    """
+    只读副本客户端混入类：读查询因副本不可用失败时，在主库上重新执行这一条查询
+    """
+
+    async def ping(self, timeout: float) -> None:
+        """执行 SELECT 1 探测连接，不回退主库"""
+        await asyncio.wait_for(super().execute_query("SELECT 1"), timeout)
+
+    async def execute_query(self, query: str, values: Optional[list] = None) -> Any:
+        try:
+            return await super().execute_query(query, values)
+        except Exception as e:
+            primary = await _failover(e)
+        return await primary.execute_query(query, values)
+
+    async def execute_query_dict(self, query: str, values: Optional[list] = None) -> List[dict]:
+        try:
+            return await super().execute_query_dict(query, values)
+        except Exception as e:
+            primary = await _failover(e)
+        return await primary.execute_query_dict(query, values)
+
+
+class ReplicaRouter:
+    """
+    Tortoise 数据库路由：允许读副本的上下文中，事务外的读查询发往副本
+    """
+
+    def db_for_read(self, model: Any) -> Optional[str]:
+        if not _read_route.get() or not replica_state.available():
+            return None
+        # 事务中的读取必须和写入使用同一个连接
+        if isinstance(connections.get("default"), TransactionalDBClient):
+            return None
+        replica_state.reads += 1
+        return REPLICA_CONNECTION
+
+    def db_for_write(self, model: Any) -> Optional[str]:
+        return None
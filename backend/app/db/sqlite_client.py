@@ -0,0 +1,44 @@
+"""
+SQLite客户端
+
+在 Tortoise ORM 的 SQLite 客户端基础上统计每个请求的SQL执行（见 app.db.query_stats），
+事务中的语句同样计入。在 Tortoise 配置中把 engine 设为 "app.db.sqlite_client" 即可启用，
+参见 app.db.database.get_tortoise_config。连接配置中 "replica" 为真时使用只读副本客户端。
+"""
+from typing import Any, Dict, Type
+
+from tortoise.backends.base.client import NestedTransactionContext, TransactionContext
+from tortoise.backends.sqlite.client import (
+    SqliteClient,
+    SqliteTransactionContext,
+    SqliteTransactionWrapper,
+)
+
+from app.db.query_stats import QueryStatsMixin
+from app.db.routing import ReplicaFailoverMixin
+
+
+class InstrumentedSqliteTransactionWrapper(QueryStatsMixin, SqliteTransactionWrapper):
+    """带SQL统计的SQLite事务连接"""
+
+    def _in_transaction(self) -> TransactionContext:
+        return NestedTransactionContext(InstrumentedSqliteTransactionWrapper(self))
+
+
+class InstrumentedSqliteClient(QueryStatsMixin, SqliteClient):
+    """带SQL统计的SQLite客户端"""
+
+    def _in_transaction(self) -> TransactionContext:
+        return SqliteTransactionContext(InstrumentedSqliteTransactionWrapper(self), self._lock)
+
+
+class ReplicaSqliteClient(ReplicaFailoverMixin, InstrumentedSqliteClient):
+    """只读副本的SQLite客户端：副本不可用时读查询回退主库"""
+
+
+client_class = InstrumentedSqliteClient
+
+
+def get_client_class(db_info: Dict[str, Any]) -> Type[SqliteClient]:
+    """Tortoise 按连接配置选择客户端类"""
+    return ReplicaSqliteClient if db_info.get("replica") else InstrumentedSqliteClient
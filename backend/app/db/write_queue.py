@@ -0,0 +1,169 @@
+"""
+单写入者队列
+
+不需要立即拿到结果的后台写入（API调用统计、统计计数增减等）提交到队列，
+由一个专用的后台任务按批执行：一批写入在同一个事务中提交，每个写入使用独立的保存点，
+单个写入失败只回滚它自己。
+
+SQLite 同一时刻只允许一个写事务，逐条提交时每个请求都要争抢写锁并各自刷盘；
+合并后每批只有一次提交，写锁的持有次数和刷盘次数都大大减少，读请求等待的时间也随之变短。
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 写入任务：接收事务连接，在其上执行写操作
+WriteJob = Callable[[BaseDBAsyncClient], Awaitable[Any]]
+
+
+class WriteQueue:
+    """
+    批量提交的单写入者队列
+
+    Args:
+        enabled: 为False时 submit 直接在独立事务中执行写入（不排队）
+        max_batch: 每批最多合并的写入数
+        max_delay: 凑批的最长等待时间（秒）
+        max_size: 队列长度上限，队列满时丢弃新的写入并记录日志
+    """
+
+    def __init__(self, enabled: bool, max_batch: int, max_delay: float, max_size: int) -> None:
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+
+    @staticmethod
+    def _connection_name() -> str:
+        # SQLite下有写入队列专用的连接，见 app.db.database.get_tortoise_config
+        return "writer" if "writer" in connections.db_config else "default"
+
+    async def _execute(self, job: WriteJob, connection_name: str) -> bool:
+        try:
+            # 在批次事务中嵌套事务即保存点
+            async with in_transaction(connection_name) as connection:
+                await job(connection)
+            return True
+        except Exception as e:
+            name = getattr(getattr(job, "func", job), "__qualname__", job)
+            logger.error(f"后台写入失败 ({name}): {e}")
+            return False
+
+    async def _write_batch(self, batch: List[WriteJob]) -> None:
+        succeeded = 0
+        connection_name = self._connection_name()
+        try:
+            async with in_transaction(connection_name):
+                for job in batch:
+                    succeeded += await self._execute(job, connection_name)
+        except Exception as e:
+            succeeded = 0
+            logger.error(f"批量写入提交失败（{len(batch)} 条）: {e}")
+        self.written += succeeded
+        self.failed += len(batch) - succeeded
+        self.batches += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                if queue.empty():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(queue.get_nowait())
+            try:
+                await self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def start(self) -> None:
+        """启动写入任务（首次提交时自动启动）"""
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            # 使用空的上下文，不继承首次提交时所在请求的上下文变量（如读副本路由）
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def submit(self, job: WriteJob) -> None:
+        """
+        提交写入任务
+
+        队列启用时立即返回，写入在后台批量提交；未启用时在独立事务中执行完再返回。
+        """
+        self.submitted += 1
+        if not self.enabled:
+            await self._write_batch([job])
+            return
+        self.start()
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("后台写入队列已满，丢弃写入")
+
+    async def flush(self) -> None:
+        """等待已提交的写入全部完成"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        """写完队列中剩余的写入后停止写入任务（关闭应用前调用）"""
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._queue = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列统计"""
+        return {
+            "enabled": self.enabled,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "submitted": self.submitted,
+            "written": self.written,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "avg_batch": round(self.written / self.batches, 1) if self.batches else 0,
+            "max_batch": self.max_batch_seen,
+        }
+
+
+write_queue = WriteQueue(
+    enabled=settings.DB_WRITE_QUEUE_ENABLED,
+    max_batch=settings.DB_WRITE_BATCH_SIZE,
+    max_delay=settings.DB_WRITE_BATCH_DELAY_MS / 1000,
+    max_size=settings.DB_WRITE_QUEUE_MAX_SIZE,
+)
@@ -23,6 +23,7 @@ from fastapi.staticfiles import StaticFiles
 from app.api.api import api_router
 from app.core.config import settings
 from app.middleware.api_stats_middleware import ApiStatsMiddleware
+from app.middleware.read_replica_middleware import ReadReplicaMiddleware
 
 # 配置日志
 logging.basicConfig(
@@ -49,14 +50,41 @@ async def lifespan(app: FastAPI):
     # 启动时执行
     logger.info("应用启动中...")
     
+    # 执行数据库迁移：多个worker同时启动时只有一个执行，其余等待其完成；迁移失败时中止启动
+    from app.db.migrate import run_migrations
+    await run_migrations()
+    
     try:
-        # 创建初始超级用户
-        from app.db.init_db import create_first_superuser
-        await create_first_superuser()
+        # 加载已吊销的令牌并启动同步任务
+        from app.core.revocation import revocation_store
+        await revocation_store.start()
+        
+        # 在后台加载文章检索索引（不存在时构建），不阻塞启动
+        from app.core.chat_retrieval import article_index
+        article_index.load_in_background()
+        
+        # 在线程池中预先导入聊天客户端依赖的 openai，不阻塞启动
+        from app.core.llm import preload_in_background
+        preload_in_background()
+        
+        # 启动定时任务：每个worker都运行的任务立即启动，leader_only 的任务由leader运行
+        from app.core.jobs import register_jobs
+        from app.core.scheduler import scheduler
+        register_jobs(scheduler)
+        scheduler.start()
         
-        # 更新统计数据
-        from app.api.stats import update_all_stats
-        await update_all_stats()
+        # 启动后台任务队列的执行协程（每个worker都运行）
+        import app.core.tasks  # noqa: F401  注册内置后台任务
+        from app.core.task_queue import task_queue
+        task_queue.start()
+        
+        # 选主：只有leader创建初始超级用户，并运行 leader_only 的定时任务（统计重算、清理等），
+        # 其余worker直接开始处理请求；leader退出后由其他worker接管
+        from app.core.leader import leader_election
+        from app.db.init_db import create_first_superuser
+        leader_election.add_init("create_first_superuser", create_first_superuser)
+        leader_election.add_task("scheduler", scheduler.run_leader_jobs)
+        await leader_election.start()
     except Exception as e:
         logger.error(f"初始化过程中出错: {e}")
     
@@ -67,6 +95,31 @@ async def lifespan(app: FastAPI):
     # 关闭时执行
     logger.info("应用关闭中...")
     
+    # 停止定时任务和leader任务并释放租约，等待进行中的事件处理完成（事件处理可能提交后台任务）
+    from app.core.scheduler import scheduler
+    from app.core.leader import leader_election
+    from app.core.events import event_bus
+    from app.core.task_queue import task_queue
+    await scheduler.stop()
+    await leader_election.stop()
+    await event_bus.drain()
+    # 等待执行中的后台任务结束，超时未结束的放回队列由其他worker执行
+    await task_queue.stop()
+    
+    # 提交缓冲的阅读量，写完后台写入队列中剩余的写入
+    from app.core.view_counts import view_counts
+    from app.db.write_queue import write_queue
+    await view_counts.flush()
+    await write_queue.stop()
+    
+    # 停止吊销令牌同步任务
+    from app.core.revocation import revocation_store
+    await revocation_store.stop()
+    
+    # 关闭聊天客户端连接池
+    from app.core.llm import close_chat_client
+    await close_chat_client()
+    
     # 关闭数据库连接
     from tortoise import Tortoise
     await Tortoise.close_connections()
@@ -98,6 +151,9 @@ def create_app() -> FastAPI:
         max_age=600,
     )
     
+    # 只读副本路由中间件（位于API统计中间件之内，统计写入不受读副本路由影响）
+    app.add_middleware(ReadReplicaMiddleware)
+    
     # 添加API统计中间件
     app.add_middleware(ApiStatsMiddleware)
     
@@ -139,11 +195,11 @@ def create_app() -> FastAPI:
     
     # 注册Tortoise ORM
     from tortoise.contrib.fastapi import register_tortoise
+    from app.db.database import get_tortoise_config
     register_tortoise(
         app,
-        db_url=settings.DATABASE_URL,
-        modules={"models": ["app.models"]},
-        generate_schemas=True,
+        config=get_tortoise_config(),
+        generate_schemas=False,
         add_exception_handlers=True,
     )
     
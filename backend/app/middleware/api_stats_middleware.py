@@ -1,13 +1,18 @@
 import time
 from datetime import datetime, date
-from typing import Callable
+from functools import partial
+from typing import Callable, Optional
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 import logging
-from tortoise.exceptions import DoesNotExist, OperationalError
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import Expression, F, RawSQL, ResolveContext, ResolveResult
 
-from app.models.api_stat import ApiStat, ApiStatDaily, ApiStatusCode
-from app.db import transaction
+from app.core.config import settings
+from app.models.api_stat import ApiStat, ApiStatDaily
+from app.db.query_stats import n_plus_one_report, reset_request_stats, start_request_stats
+from app.db.write_queue import write_queue
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +33,12 @@ class ApiStatsMiddleware(BaseHTTPMiddleware):
         # 只记录API请求
         is_api_request = path.startswith("/api/")
         
-        # 调用下一个中间件或路由处理函数
-        response = await call_next(request)
+        # 调用下一个中间件或路由处理函数，期间执行的SQL计入本请求的统计
+        query_stats, token = start_request_stats()
+        try:
+            response = await call_next(request)
+        finally:
+            reset_request_stats(token)
         
         # 如果不是API请求，直接返回
         if not is_api_request:
@@ -38,6 +47,13 @@ class ApiStatsMiddleware(BaseHTTPMiddleware):
         # 计算处理时间
         process_time = time.time() - start_time
         
+        # 在响应头中返回查询数和数据库耗时
+        if settings.QUERY_STATS_SERVER_TIMING:
+            response.headers.append(
+                "Server-Timing",
+                f"{query_stats.server_timing()}, app;dur={process_time * 1000:.1f}",
+            )
+        
         # 记录API调用统计
         try:
             user_id = None
@@ -63,31 +79,21 @@ class ApiStatsMiddleware(BaseHTTPMiddleware):
             # 规范化路径，将ID部分替换为{id}，以便统计相同API
             normalized_path = self._normalize_path(path)
             
-            # 使用事务确保数据一致性
-            async with transaction() as conn:
-                # 记录单次API调用
-                try:
-                    api_stat = await ApiStat.create(
-                        endpoint=normalized_path,  # 使用规范化的路径
-                        method=method,
-                        status_code=response.status_code,
-                        response_time=process_time,
-                        timestamp=datetime.now(),
-                        user_id=user_id
-                    )
-                    
-                    # 更新每日统计
-                    await self._update_daily_stats(process_time, response.status_code)
-                    
-                    # 记录详细日志
-                    logger.debug(
-                        f"API调用: {method} {normalized_path} - 状态码: {response.status_code} - "
-                        f"响应时间: {process_time:.4f}秒 - 用户ID: {user_id or '匿名'}"
-                    )
-                except OperationalError as e:
-                    logger.error(f"数据库操作错误: {e}")
-                    # 可能是表不存在，忽略错误
-                    pass
+            # 同一形状的语句重复执行多次，记为疑似N+1查询
+            n_plus_one_report.check(f"{method} {normalized_path}", query_stats)
+            
+            # 交给单写入者队列在后台批量提交，不阻塞响应
+            await write_queue.submit(partial(
+                record_api_call,
+                endpoint=normalized_path,  # 使用规范化的路径
+                method=method,
+                status_code=response.status_code,
+                response_time=process_time,
+                timestamp=datetime.now(),
+                user_id=user_id,
+                query_count=query_stats.count,
+                db_time=query_stats.db_time,
+            ))
             
         except Exception as e:
             logger.error(f"记录API统计信息失败: {e}")
@@ -106,43 +112,88 @@ class ApiStatsMiddleware(BaseHTTPMiddleware):
         if normalized.endswith('/') and len(normalized) > 1:
             normalized = normalized[:-1]
         return normalized
+
+
+async def record_api_call(
+    connection: BaseDBAsyncClient,
+    endpoint: str,
+    method: str,
+    status_code: int,
+    response_time: float,
+    timestamp: datetime,
+    user_id: Optional[int],
+    query_count: int = 0,
+    db_time: float = 0,
+) -> None:
+    """
+    记录单次API调用并更新每日统计（在写入队列的事务连接上执行）
+    """
+    await ApiStat.create(
+        endpoint=endpoint,
+        method=method,
+        status_code=status_code,
+        response_time=response_time,
+        timestamp=timestamp,
+        user_id=user_id,
+        query_count=query_count,
+        db_time=db_time,
+        using_db=connection,
+    )
+    await _update_daily_stats(connection, timestamp.date(), response_time, status_code)
     
-    async def _update_daily_stats(self, process_time: float, status_code: int) -> None:
-        """
-        更新每日统计
-        """
-        try:
-            # 获取今天的日期
-            today = date.today()
-            
-            # 尝试获取今天的统计
-            daily_stat = await ApiStatDaily.filter(date=today).first()
-            
-            # 如果不存在，创建新的
-            if not daily_stat:
-                daily_stat = await ApiStatDaily.create(
-                    date=today,
-                    total_calls=0,
-                    unique_users=0,
-                    avg_response_time=0,
-                    error_count=0
-                )
-            
-            # 更新调用次数
-            daily_stat.total_calls += 1
-            
-            # 更新平均响应时间
-            daily_stat.avg_response_time = ((daily_stat.avg_response_time * (daily_stat.total_calls - 1)) + (process_time * 1000)) / daily_stat.total_calls
-            
-            # 如果是错误状态码，增加错误计数
-            if status_code >= 400:
-                daily_stat.error_count += 1
-            
-            # 保存每日统计
-            await daily_stat.save()
-            
-            # 每天收集的独立用户数更新
-            # 我们使用定时任务来更新这个值，而不是每次API调用都更新
-            # 可以通过 app.core.update_stats 中的 update_visitor_count 函数来实现
-        except Exception as e:
-            logger.error(f"更新每日统计失败: {e}") 
\ No newline at end of file
+    # 记录详细日志
+    logger.debug(
+        f"API调用: {method} {endpoint} - 状态码: {status_code} - "
+        f"响应时间: {response_time:.4f}秒 - SQL: {query_count}条/{db_time:.4f}秒 - 用户ID: {user_id or '匿名'}"
+    )
+
+
+class _RawUpdate(Expression):
+    """
+    以SQL片段作为 UPDATE 的新值（F 表达式不支持嵌套运算和整数/浮点字段混合运算）
+    """
+
+    def __init__(self, sql: str) -> None:
+        self.sql = sql
+
+    def resolve(self, resolve_context: ResolveContext) -> ResolveResult:
+        return ResolveResult(term=RawSQL(self.sql))
+
+
+async def _update_daily_stats(
+    connection: BaseDBAsyncClient,
+    day: date,
+    process_time: float,
+    status_code: int,
+) -> None:
+    """
+    更新每日统计
+
+    用一条 UPDATE 语句累加调用次数、错误数并更新平均响应时间（毫秒）；当天的统计行不存在时先创建。
+    MySQL 按从左到右的顺序执行 SET 中的赋值，后面的表达式会看到前面已更新的列，
+    因此平均响应时间必须排在调用次数之前计算（SQLite 中 SET 引用的都是更新前的值，顺序无影响）。
+    独立用户数由 app.core.update_stats 中的 update_all_stats 定期更新。
+    """
+    response_ms = float(process_time * 1000)
+    changes = {
+        "avg_response_time": _RawUpdate(
+            f"(avg_response_time * total_calls + {response_ms!r}) / (total_calls + 1)"
+        ),
+        "total_calls": F("total_calls") + 1,
+        "error_count": F("error_count") + (1 if status_code >= 400 else 0),
+    }
+    updated = await ApiStatDaily.filter(date=day).using_db(connection).update(**changes)
+    if updated:
+        return
+    try:
+        await ApiStatDaily.create(
+            date=day,
+            total_calls=1,
+            unique_users=0,
+            avg_response_time=response_ms,
+            error_count=1 if status_code >= 400 else 0,
+            using_db=connection,
+        )
+    except IntegrityError:
+        # 其他worker同时创建了当天的统计行，改为累加到该行
+        await ApiStatDaily.filter(date=day).using_db(connection).update(**changes)
@@ -0,0 +1,97 @@
+"""
+只读副本路由中间件
+
+- GET/HEAD 请求允许读副本，除非该客户端刚刚写入过（读己之写）
+- 其他方法的请求成功后，记录该客户端在 DB_REPLICA_STICKY_SECONDS 秒内读主库：
+  同一worker内按客户端记录，跨worker通过短期Cookie传递
+- 副本不可用时由副本连接在主库上重试失败的那一条查询（见 app.db.routing），不重放整个请求
+"""
+import hashlib
+import logging
+from http.cookies import SimpleCookie
+from typing import Any, Dict
+
+from starlette.requests import HTTPConnection
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.routing import allow_replica_reads, replica_state, reset_replica_reads
+from app.utils.client_ip import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = "db_primary"
+
+READ_METHODS = ("GET", "HEAD")
+
+
+class ReadReplicaMiddleware:
+    """
+    纯ASGI中间件（路由开关保存在 ContextVar 中，必须与路由处理在同一个上下文中设置）
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        self.sticky_seconds = settings.DB_REPLICA_STICKY_SECONDS
+        self._recent_writers = TTLCache(maxsize=10000, ttl=self.sticky_seconds)
+
+    @staticmethod
+    def _client_key(scope: Dict[str, Any]) -> str:
+        """
+        读己之写使用的客户端标识：带令牌的请求按令牌的哈希（不在内存中保存令牌原文），否则按IP
+        """
+        headers = dict(scope.get("headers") or ())
+        authorization = headers.get(b"authorization")
+        if authorization:
+            return f"auth:{hashlib.sha256(authorization).hexdigest()}"
+        return f"ip:{get_client_ip(HTTPConnection(scope))}"
+
+    @staticmethod
+    def _has_sticky_cookie(scope: Dict[str, Any]) -> bool:
+        for name, value in scope.get("headers") or ():
+            if name == b"cookie" and STICKY_COOKIE in SimpleCookie(value.decode("latin-1")):
+                return True
+        return False
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not replica_state.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        replica_state.maybe_recover()
+        if scope["method"] in READ_METHODS:
+            await self._read(scope, receive, send)
+        else:
+            await self._write(scope, receive, send)
+
+    async def _write(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        key = self._client_key(scope)
+
+        async def send_with_cookie(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                self._recent_writers.set(key, True)
+                cookie = (
+                    f"{STICKY_COOKIE}=1; Max-Age={int(self.sticky_seconds)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"set-cookie", cookie.encode("latin-1"))
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+    async def _read(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if (
+            not replica_state.available()
+            or self._recent_writers.get(self._client_key(scope))
+            or self._has_sticky_cookie(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        token = allow_replica_reads()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_replica_reads(token)
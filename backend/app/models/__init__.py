@@ -11,6 +11,9 @@ from app.models.project import Project
 from app.models.message import Message
 from app.models.stat import Stat
 from app.models.api_stat import ApiStat, ApiStatDaily, ApiStatusCode
+from app.models.revoked_token import RevokedToken
+from app.models.subscriber import Subscriber
+from app.models.task import QueuedTask
 
 __all__ = [
     "User",
@@ -22,4 +25,7 @@ __all__ = [
     "ApiStat",
     "ApiStatDaily",
     "ApiStatusCode",
+    "RevokedToken",
+    "Subscriber",
+    "QueuedTask",
 ] 
\ No newline at end of file
@@ -14,9 +14,13 @@ class ApiStat(Model):
     response_time = fields.FloatField(description="响应时间(秒)")
     timestamp = fields.DatetimeField(description="调用时间")
     user_id = fields.IntField(null=True, description="用户ID，可为空表示匿名访问")
+    query_count = fields.IntField(default=0, description="本次调用执行的SQL语句数")
+    db_time = fields.FloatField(default=0, description="本次调用的数据库耗时(秒)")
 
     class Meta:
         table = "api_stat"
+        # 趋势查询按时间范围扫描，端点详情按 (端点, 时间) 范围扫描，接口列表按 (端点, 方法) 分组
+        indexes = (("timestamp",), ("endpoint", "timestamp"), ("endpoint", "method"))
 
     def __str__(self):
         return f"{self.method} {self.endpoint}: {self.status_code}"
@@ -31,6 +31,8 @@ class Article(Model):
 
     class Meta:
         table = "articles"
+        # 已发布/推荐文章列表
+        indexes = (("status", "featured", "id"),)
 
     def __str__(self):
         return self.title
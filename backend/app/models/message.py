@@ -16,6 +16,8 @@ class Message(Model):
 
     class Meta:
         table = "messages"
+        # 未读消息列表
+        indexes = (("is_read", "created_at"),)
 
     def __str__(self):
         return self.subject 
\ No newline at end of file
@@ -0,0 +1,19 @@
+from tortoise import fields
+from tortoise.models import Model
+
+
+class RevokedToken(Model):
+    """
+    已吊销令牌模型
+    """
+    id = fields.IntField(pk=True, description="记录ID，主键")
+    jti = fields.CharField(max_length=64, unique=True, description="令牌唯一标识(JWT jti)")
+    user_id = fields.IntField(null=True, description="令牌所属用户ID")
+    expires_at = fields.DatetimeField(index=True, description="令牌原过期时间，过期后记录可清理")
+    created_at = fields.DatetimeField(auto_now_add=True, description="吊销时间")
+
+    class Meta:
+        table = "revoked_tokens"
+
+    def __str__(self):
+        return self.jti
@@ -13,6 +13,8 @@ class Subscriber(Model):
 
     class Meta:
         table = "subscribers"
+        # 有效订阅者列表
+        indexes = (("status", "created_at"),)
 
     def __str__(self):
         return self.email 
\ No newline at end of file
@@ -0,0 +1,28 @@
+from tortoise import fields
+from tortoise.models import Model
+
+
+class QueuedTask(Model):
+    """
+    后台任务队列中的任务模型
+    """
+    id = fields.IntField(pk=True, description="任务ID，主键")
+    name = fields.CharField(max_length=100, description="任务名，对应注册的任务处理函数")
+    payload = fields.JSONField(default=dict, description="任务参数")
+    status = fields.CharField(max_length=16, default="pending", description="任务状态：pending、running、done、failed")
+    attempts = fields.IntField(default=0, description="已执行次数")
+    max_attempts = fields.IntField(default=5, description="最多执行次数")
+    run_at = fields.DatetimeField(description="最早执行时间")
+    locked_by = fields.CharField(max_length=255, null=True, description="执行中的worker及本次领取的标识")
+    locked_until = fields.DatetimeField(null=True, description="领取的过期时间，过期后任务可被其他worker重新领取")
+    last_error = fields.TextField(null=True, description="最近一次执行失败的错误信息")
+    created_at = fields.DatetimeField(auto_now_add=True, description="创建时间")
+    updated_at = fields.DatetimeField(auto_now=True, description="最后更新时间")
+
+    class Meta:
+        table = "task_queue"
+        # 领取任务按 (状态, 执行时间) 扫描
+        indexes = (("status", "run_at"),)
+
+    def __str__(self):
+        return f"{self.name}#{self.id}: {self.status}"
@@ -1,7 +1,7 @@
 from tortoise import fields
 from tortoise.models import Model
 
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 
 
 class User(Model):
@@ -31,8 +31,8 @@ class User(Model):
 
     async def set_password(self, password: str) -> None:
         """设置密码"""
-        self.password_hash = get_password_hash(password)
+        self.password_hash = await get_password_hash_async(password)
 
-    def verify_password(self, password: str) -> bool:
+    async def verify_password(self, password: str) -> bool:
         """验证密码"""
-        return verify_password(password, self.password_hash) 
\ No newline at end of file
+        return await verify_password_async(password, self.password_hash) 
\ No newline at end of file
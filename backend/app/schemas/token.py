@@ -9,4 +9,6 @@ class Token(BaseModel):
 
 
 class TokenPayload(BaseModel):
-    sub: Optional[str] = None 
\ No newline at end of file
+    sub: Optional[str] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None 
\ No newline at end of file
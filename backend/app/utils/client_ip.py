@@ -0,0 +1,45 @@
+"""
+客户端IP解析
+
+应用部署在反向代理（如前端容器中的nginx）之后时，request.client.host 是代理的地址，
+所有访客会共用同一个限流/排队的键。只有直接连接来自 TRUSTED_PROXIES 中的地址时，
+才从 X-Forwarded-For（从右向左跳过可信代理）或 X-Real-IP 中取真实的客户端地址，
+其他来源携带的这些请求头会被忽略，防止伪造。
+"""
+import ipaddress
+from functools import lru_cache
+from typing import List, Union
+
+from starlette.requests import HTTPConnection
+
+from app.core.config import settings
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+@lru_cache(maxsize=None)
+def _trusted_networks(value: str) -> List[Network]:
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_networks(settings.TRUSTED_PROXIES))
+
+
+def get_client_ip(request: HTTPConnection) -> str:
+    """获取请求的真实客户端IP"""
+    peer = request.client.host if request.client else "unknown"
+    if not _is_trusted(peer):
+        return peer
+    forwarded = [item.strip() for item in request.headers.get("x-forwarded-for", "").split(",") if item.strip()]
+    for address in reversed(forwarded):
+        if not _is_trusted(address):
+            return address
+    if forwarded:
+        # 整条链都是可信代理时取最左侧的地址
+        return forwarded[0]
+    return request.headers.get("x-real-ip", "").strip() or peer
@@ -183,7 +183,7 @@ async def bulk_create(model_class: Type[T], data: List[Dict[str, Any]]) -> List[
         创建的模型实例列表
     """
     instances = []
-    async with in_transaction():
+    async with in_transaction("default"):
         for item in data:
             instance = model_class(**item)
             await instance.save()
@@ -208,7 +208,7 @@ async def bulk_update(
         更新的模型实例列表
     """
     instances = []
-    async with in_transaction():
+    async with in_transaction("default"):
         for item in data:
             if id_field not in item:
                 logger.warning(f"跳过没有 {id_field} 字段的项: {item}")
@@ -0,0 +1,35 @@
+"""
+邮件发送模块
+
+使用 SMTP_* 配置发送纯文本邮件。smtplib 是阻塞调用，在线程池中执行；
+请求中不直接发送，而是提交后台任务 email.send（见 app.core.tasks）。
+"""
+import asyncio
+import smtplib
+from email.message import EmailMessage
+from email.utils import formataddr
+
+from app.core.config import settings
+
+
+def _send(to: str, subject: str, body: str) -> None:
+    message = EmailMessage()
+    message["From"] = formataddr((settings.EMAILS_FROM_NAME, str(settings.EMAILS_FROM_EMAIL)))
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30) as smtp:
+        if settings.SMTP_TLS:
+            smtp.starttls()
+        if settings.SMTP_USER:
+            smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        smtp.send_message(message)
+
+
+async def send_email(to: str, subject: str, body: str) -> None:
+    """
+    发送邮件，未配置邮件服务时抛出 RuntimeError
+    """
+    if not settings.EMAILS_ENABLED:
+        raise RuntimeError("未配置邮件服务（SMTP_HOST、SMTP_PORT、EMAILS_FROM_EMAIL）")
+    await asyncio.to_thread(_send, to, subject, body)
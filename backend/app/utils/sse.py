@@ -0,0 +1,93 @@
+"""
+SSE（Server-Sent Events）工具模块
+
+提供SSE帧格式化以及把上游增量文本合并为较少帧数的辅助函数。
+"""
+import asyncio
+from typing import AsyncIterator, Optional
+
+_END = object()
+
+
+def sse_event(data: str, event: Optional[str] = None) -> str:
+    """
+    构造一个SSE帧
+
+    多行文本按规范拆成多个 data 行，客户端会用换行重新拼接。
+    """
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_comment(text: str = "") -> str:
+    """构造一个SSE注释帧（客户端会忽略，可用于保活）"""
+    return f": {text}\n\n"
+
+
+async def coalesce_deltas(
+    deltas: AsyncIterator[str],
+    interval: float,
+    max_chars: int,
+) -> AsyncIterator[str]:
+    """
+    合并增量文本
+
+    收到第一个增量后最多等待 interval 秒，或累计达到 max_chars 个字符时输出一次。
+    interval <= 0 时不合并，每个增量到达后立即输出。
+    上游抛出的异常会在消费端重新抛出。
+
+    Args:
+        deltas: 上游增量文本的异步迭代器
+        interval: 合并窗口（秒）
+        max_chars: 单帧最大字符数
+    """
+    if interval <= 0:
+        async for delta in deltas:
+            if delta:
+                yield delta
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for delta in deltas:
+                if delta:
+                    await queue.put(delta)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            await queue.put(_END)
+
+    task = asyncio.create_task(pump())
+    buffer = []
+    size = 0
+    deadline = 0.0
+    try:
+        while True:
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield "".join(buffer)
+                buffer, size = [], 0
+                continue
+
+            if item is _END or isinstance(item, Exception):
+                if buffer:
+                    yield "".join(buffer)
+                if isinstance(item, Exception):
+                    raise item
+                return
+
+            if not buffer:
+                deadline = loop.time() + interval
+            buffer.append(item)
+            size += len(item)
+            if size >= max_chars:
+                yield "".join(buffer)
+                buffer, size = [], 0
+    finally:
+        task.cancel()
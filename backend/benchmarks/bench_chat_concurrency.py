@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+聊天接口并发基准测试
+
+启动本地模拟上游服务（每次调用固定耗时），并发调用 POST /api/chat/message，
+同时测量 GET /api/articles 的延迟。如果上游调用阻塞了事件循环，
+总耗时会接近 并发数 × 上游耗时，文章列表的延迟也会随之飙升。
+总耗时超过 串行耗时 × --max-ratio，或文章列表 p99 延迟不低于上游耗时时返回非0。
+
+用法:
+    python benchmarks/bench_chat_concurrency.py [--calls 20] [--delay 0.5] [--max-ratio 0.25]
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from common import app_client, format_ms, percentile, stub_llm_server
+
+
+async def measure_reads(client, stop: asyncio.Event) -> list:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/articles")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def main(args) -> None:
+    async with stub_llm_server(delay=args.delay) as stub, app_client() as client:
+        counter = iter(range(1_000_000))
+
+        async def chat():
+            # 每次提问不同，避免命中回答缓存
+            messages = [{"role": "user", "content": f"你是谁？#{next(counter)}"}]
+            response = await client.post("/api/chat/message", json=messages)
+            assert response.status_code == 200, response.text
+
+        # 预热连接
+        await chat()
+
+        stop = asyncio.Event()
+        reader = asyncio.create_task(measure_reads(client, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(chat() for _ in range(args.calls)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        reads = await reader
+
+    serialized = args.calls * args.delay
+    print(f"并发聊天调用: {args.calls} 次, 上游耗时 {args.delay}s/次")
+    print(f"总耗时: {elapsed:.2f}s (完全串行时约 {serialized:.2f}s, 上游收到 {stub.state.requests} 次请求)")
+    print(
+        f"期间 GET /api/articles: n={len(reads)} "
+        f"p50={format_ms(percentile(reads, 50))} p99={format_ms(percentile(reads, 99))}"
+    )
+
+    failed = False
+    if elapsed > serialized * args.max_ratio:
+        print(f"总耗时超过串行耗时的 {args.max_ratio:.0%}，上游调用没有并发执行")
+        failed = True
+    if reads and percentile(reads, 99) >= args.delay:
+        print("文章列表 p99 延迟不低于上游耗时，事件循环被阻塞")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="聊天接口并发基准测试")
+    parser.add_argument("--calls", type=int, default=20, help="并发聊天调用次数")
+    parser.add_argument("--delay", type=float, default=0.5, help="模拟上游每次调用耗时（秒）")
+    parser.add_argument("--max-ratio", type=float, default=0.25, help="总耗时相对串行耗时的上限，超出时返回非0")
+    asyncio.run(main(parser.parse_args()))
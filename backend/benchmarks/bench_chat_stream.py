@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+流式聊天输出基准测试
+
+启动本地模拟上游服务，返回固定长度的回答（按小分片流式输出），
+分别以不同的合并窗口调用 POST /api/chat/stream，统计首字节时间、
+末字节时间以及每个回答产生的SSE帧数。
+
+用法:
+    python benchmarks/bench_chat_stream.py [--chars 2000] [--upstream-time 1.0]
+"""
+import argparse
+import asyncio
+import time
+
+from common import app_server, stub_llm_server
+
+
+async def stream_once(client, coalesce_ms: float) -> dict:
+    payload = {"messages": [{"role": "user", "content": "写一篇长文"}], "coalesce_ms": coalesce_ms}
+    start = time.perf_counter()
+    first_byte = None
+    body = ""
+    async with client.stream("POST", "/api/chat/stream", json=payload) as response:
+        async for text in response.aiter_text():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            body += text
+    last_byte = time.perf_counter() - start
+
+    events = [event for event in body.split("\n\n") if event]
+    data_frames = [
+        event for event in events
+        if not event.startswith("event:") and event != "data: [DONE]"
+    ]
+    text = "".join(
+        "\n".join(line[6:] for line in event.split("\n")) for event in data_frames
+    )
+    return {
+        "ttfb": first_byte or 0.0,
+        "ttlb": last_byte,
+        "frames": len(data_frames),
+        "chars": len(text),
+    }
+
+
+async def main(args) -> None:
+    answer = ("博客助手流式输出基准测试。" * (args.chars // 13 + 1))[:args.chars]
+    async with stub_llm_server(delay=args.upstream_time, answer=answer, chunk_size=args.chunk):
+        async with app_server() as client:
+            await stream_once(client, 0)  # 预热
+            print(
+                f"回答长度: {args.chars} 字符, 上游分片: {args.chunk} 字符/片, "
+                f"上游总耗时: {args.upstream_time}s"
+            )
+            print(f"{'合并窗口':<10}{'首字节':>10}{'末字节':>10}{'帧数':>8}{'字符数':>8}")
+            for coalesce_ms in args.windows:
+                result = await stream_once(client, coalesce_ms)
+                print(
+                    f"{coalesce_ms:>6.0f}ms  {result['ttfb'] * 1000:>9.1f}ms"
+                    f"{result['ttlb'] * 1000:>9.1f}ms{result['frames']:>8}{result['chars']:>8}"
+                )
+    legacy = args.upstream_time + args.chars * 0.01
+    print(f"旧实现（逐字符输出，每字符 sleep 10ms）末字节时间下限约 {legacy:.1f}s，帧数 {args.chars}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式聊天输出基准测试")
+    parser.add_argument("--chars", type=int, default=2000, help="回答长度（字符）")
+    parser.add_argument("--chunk", type=int, default=4, help="上游每个分片的字符数")
+    parser.add_argument("--upstream-time", type=float, default=1.0, help="上游输出完整回答的耗时（秒）")
+    parser.add_argument(
+        "--windows", type=float, nargs="+", default=[0, 30, 100], help="要测试的合并窗口（毫秒）"
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+应用导入耗时基准测试
+
+每轮在新的子进程中用 python -X importtime 导入 app.main（每个worker启动时都要执行的部分），
+输出导入耗时的中位数、按顶层包汇总的自身耗时，并检查按需导入的模块没有进入启动时的导入图。
+
+用法:
+    python benchmarks/bench_import_time.py [--runs 7] [--top 15] [--budget-ms 1500]
+    python benchmarks/bench_import_time.py --baseline   # 对照组：同时导入按需导入的模块
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+project_root = Path(__file__).parents[1]
+
+# 只在首次使用时导入的模块，不应出现在 import app.main 的导入图中
+DEFERRED_MODULES = ("openai", "httpx", "numpy", "PIL", "app.db.maintenance", "app.db.sample_data")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(targets: List[str]) -> Tuple[int, Dict[str, int]]:
+    """
+    在子进程中依次导入 targets
+
+    Returns:
+        (targets 的累计导入耗时之和, 各模块的自身耗时)，单位为微秒
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "; ".join(f"import {target}" for target in targets)],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    self_times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        self_times[module] = int(self_us)
+        # 只统计 -c 语句直接导入的模块，已被前面的导入加载过的模块不会再出现
+        if len(indent) == 1 and module in targets:
+            total += int(cumulative_us)
+    return total, self_times
+
+
+def main(args) -> None:
+    targets = ["app.main"]
+    if args.baseline:
+        targets += DEFERRED_MODULES
+    # 预热一次，编译 .pyc 并填充文件系统缓存
+    measure(targets)
+
+    totals: List[int] = []
+    by_package: Dict[str, List[int]] = defaultdict(list)
+    modules: Dict[str, int] = {}
+    for _ in range(args.runs):
+        total, self_times = measure(targets)
+        totals.append(total)
+        package_times: Dict[str, int] = defaultdict(int)
+        for module, self_us in self_times.items():
+            package_times[module.split(".")[0]] += self_us
+        for package, self_us in package_times.items():
+            by_package[package].append(self_us)
+        modules = self_times
+
+    median_ms = statistics.median(totals) / 1000
+    print(f"import {', '.join(targets)}:\n  中位数 {median_ms:.1f}ms (最小 {min(totals) / 1000:.1f}ms, "
+          f"最大 {max(totals) / 1000:.1f}ms, {args.runs} 轮)")
+    print(f"\n按顶层包汇总的自身耗时（中位数，前{args.top}个）:")
+    ranked = sorted(
+        ((statistics.median(times), package) for package, times in by_package.items()), reverse=True
+    )
+    for self_us, package in ranked[: args.top]:
+        print(f"  {package:<24} {self_us / 1000:8.1f}ms")
+
+    loaded = [
+        module for module in DEFERRED_MODULES
+        if any(name == module or name.startswith(module + ".") for name in modules)
+    ]
+    print(f"\n按需导入的模块: {'、'.join(loaded) + ' 已在启动时导入' if loaded else '均未在启动时导入'}")
+
+    failed = bool(loaded) and not args.baseline
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"导入耗时超出预算 {args.budget_ms:.0f}ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="应用导入耗时基准测试")
+    parser.add_argument("--runs", type=int, default=7, help="测量轮数")
+    parser.add_argument("--top", type=int, default=15, help="列出的顶层包数")
+    parser.add_argument("--budget-ms", type=float, default=None, help="导入耗时预算（毫秒），超出时返回非0")
+    parser.add_argument("--baseline", action="store_true", help="同时导入按需导入的模块（对照组）")
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+登录突发场景下的文章列表延迟基准测试
+
+在进程内启动应用，先测量空闲时 GET /api/articles 的延迟，
+再在并发登录（bcrypt验证）的同时测量同一接口的 p50/p99 延迟。
+
+用法:
+    python benchmarks/bench_login_burst.py [--logins 40] [--reads 200] [--inline]
+
+--inline 会把密码验证改回在事件循环中同步执行，用于对比线程池卸载前后的差异。
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from common import app_client, format_ms, percentile
+
+
+async def measure_reads(client, count: int, interval: float) -> list:
+    """按固定间隔发起文章列表请求并记录每次的延迟"""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get("/api/articles")
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def login_burst(client, count: int, concurrency: int) -> None:
+    """以给定并发度发起登录请求"""
+    from app.core.config import settings
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            response = await client.post(
+                "/api/auth/login",
+                data={
+                    "username": settings.FIRST_SUPERUSER,
+                    "password": settings.FIRST_SUPERUSER_PASSWORD,
+                },
+            )
+            # 被限流的请求不做bcrypt计算，计入结果会测成拒绝路径
+            assert response.status_code == 200, response.text
+
+    await asyncio.gather(*(login() for _ in range(count)))
+
+
+def report(name: str, latencies: list) -> None:
+    print(
+        f"{name:<12} n={len(latencies):<5} "
+        f"p50={format_ms(percentile(latencies, 50)):>9} "
+        f"p99={format_ms(percentile(latencies, 99)):>9} "
+        f"max={format_ms(max(latencies)):>9}"
+    )
+
+
+async def main(args) -> None:
+    # 放宽登录限流，使所有登录请求都走到密码验证（必须在导入app之前设置）
+    os.environ["LOGIN_RATE_LIMIT_IP_BURST"] = str(args.logins)
+    os.environ["LOGIN_RATE_LIMIT_USER_BURST"] = str(args.logins)
+
+    if args.inline:
+        # 恢复为在事件循环中同步验证密码，作为对照组
+        from app.core import security
+        from app.models import user as user_module
+
+        async def inline_verify(plain_password: str, hashed_password: str) -> bool:
+            return security.verify_password(plain_password, hashed_password)
+
+        user_module.verify_password_async = inline_verify
+
+    async with app_client() as client:
+        # 预热
+        await measure_reads(client, 20, 0)
+
+        idle = await measure_reads(client, args.reads, 0.005)
+
+        burst_task = asyncio.create_task(login_burst(client, args.logins, args.concurrency))
+        during_burst = await measure_reads(client, args.reads, 0.005)
+        await burst_task
+
+    print(f"模式: {'inline' if args.inline else 'thread-pool'}")
+    report("空闲", idle)
+    report("登录突发", during_burst)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="登录突发期间文章列表延迟基准测试")
+    parser.add_argument("--logins", type=int, default=40, help="登录请求总数")
+    parser.add_argument("--concurrency", type=int, default=8, help="登录并发数")
+    parser.add_argument("--reads", type=int, default=200, help="每阶段文章列表请求数")
+    parser.add_argument("--inline", action="store_true", help="在事件循环中同步验证密码（对照组）")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+只读副本路由与故障回退检查
+
+用另一个SQLite文件作为只读副本（启动后从主库复制一份，再只修改副本中的文章标题，
+以便从响应中区分数据来自哪个库），依次检查：
+1. GET 请求的读查询发往副本
+2. 副本不可用时，失败的读查询在主库上重试，请求正常返回，且不重放整个请求（阅读量只增加一次）
+3. 副本被标记为不可用后，读请求直接走主库；恢复后重新读副本
+4. 写入后的读己之写走主库
+任何一项不符合预期时返回非0。
+
+用法:
+    python benchmarks/bench_read_replica.py
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+
+from common import BENCH_DIR, app_client
+
+REPLICA_PATH = os.path.join(BENCH_DIR, "replica.db")
+os.environ["DATABASE_REPLICA_URL"] = f"sqlite://{REPLICA_PATH}"
+os.environ["DB_REPLICA_RETRY_INTERVAL"] = "0.2"
+
+PRIMARY_TITLE = "主库中的标题"
+REPLICA_TITLE = "副本中的标题"
+
+failures = []
+
+
+def check(name: str, ok: bool, detail: str = "") -> None:
+    print(f"[{'通过' if ok else '失败'}] {name}{f'（{detail}）' if detail else ''}")
+    if not ok:
+        failures.append(name)
+
+
+async def main() -> None:
+    async with app_client() as client:
+        from tortoise import connections
+
+        from app.core.config import settings
+        from app.core.view_counts import view_counts
+        from app.db.routing import REPLICA_CONNECTION, replica_state
+        from app.models.article import Article
+        from app.models.user import User
+
+        admin = await User.get(username="admin")
+        article = await Article.create(
+            title=PRIMARY_TITLE, slug="replica-check", excerpt="", content="", author=admin, status="published",
+        )
+
+        # 用主库的当前内容初始化副本文件，然后只修改副本
+        primary_path = settings.DATABASE_URL[len("sqlite://"):]
+        with sqlite3.connect(primary_path) as source, sqlite3.connect(REPLICA_PATH) as target:
+            source.backup(target)
+            target.execute("UPDATE articles SET title = ? WHERE id = ?", (REPLICA_TITLE, article.id))
+
+        url = f"/api/articles/{article.id}"
+        response = await client.get(url)
+        check("GET 读副本", response.json().get("title") == REPLICA_TITLE, response.json().get("title"))
+
+        # 模拟副本连接断开：关闭底层连接但保留客户端中的引用，之后在副本上的查询都会失败
+        replica = connections.get(REPLICA_CONNECTION)
+        await replica._connection.close()
+
+        views_before = view_counts._pending.get(article.id, 0)
+        failovers_before = replica_state.failovers
+        response = await client.get(url)
+        check(
+            "副本不可用时回退主库",
+            response.status_code == 200 and response.json().get("title") == PRIMARY_TITLE,
+            f"{response.status_code} {response.text[:80]}",
+        )
+        # 文章和预取的作者、标签各是一条查询，已经绑定到副本的查询逐条在主库上重试
+        failovers = replica_state.failovers - failovers_before
+        check("失败的查询在主库上重试", failovers > 0, f"重试 {failovers} 条查询")
+        check("请求没有被重放（阅读量只增加一次）", view_counts._pending.get(article.id, 0) == views_before + 1)
+        check("副本标记为不可用", not replica_state.healthy, replica_state.last_error or "")
+
+        failovers_before = replica_state.failovers
+        response = await client.get(url)
+        check(
+            "不可用期间直接读主库",
+            response.json().get("title") == PRIMARY_TITLE and replica_state.failovers == failovers_before,
+        )
+
+        # 清除断开的连接（下次查询时重新连接），超过重试间隔后后台探测成功，重新读副本
+        replica._connection = None
+        await asyncio.sleep(settings.DB_REPLICA_RETRY_INTERVAL)
+        await client.get(url)
+        for _ in range(50):
+            if replica_state.healthy:
+                break
+            await asyncio.sleep(0.05)
+        response = await client.get(url)
+        check("恢复后重新读副本", response.json().get("title") == REPLICA_TITLE, response.json().get("title"))
+
+        # 读己之写：客户端写入成功后读主库
+        response = await client.post("/api/auth/login", data={"username": "admin", "password": "admin"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await client.put("/api/users/me", headers=headers, json={})
+        check("写入成功", response.status_code == 200, f"{response.status_code} {response.text[:80]}")
+        response = await client.get(url, headers=headers)
+        check("写入后读主库", response.json().get("title") == PRIMARY_TITLE, response.json().get("title"))
+
+    if failures:
+        print(f"\n{len(failures)} 项检查失败")
+        sys.exit(1)
+    print("\n全部检查通过")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+SQLite并发读写吞吐量基准测试
+
+模拟多个worker进程共用一个SQLite数据库文件：每个进程中一部分协程持续读取文章列表，
+另一部分协程以固定速率模拟请求结束时记录API调用统计（与 ApiStatsMiddleware 相同的写入）。
+输出读吞吐量和延迟分位数、实际完成的写入数以及 "database is locked" 等写入错误数。
+
+用法:
+    python benchmarks/bench_sqlite_writes.py [--workers 4] [--readers 8] [--write-rate 200] [--duration 5]
+    python benchmarks/bench_sqlite_writes.py --baseline   # 对照组：默认PRAGMA、逐条提交
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+# 所有进程共用同一个数据库文件：子进程继承父进程的环境变量，common 不会再新建临时数据库
+if "BENCH_DATABASE_URL" not in os.environ:
+    # 子进程不会进入这里；父进程退出时删除临时目录
+    _bench_dir = tempfile.TemporaryDirectory(prefix="blog-bench-", ignore_cleanup_errors=True)
+    os.environ["BENCH_DATABASE_URL"] = f"sqlite://{_bench_dir.name}/bench.db"
+
+from common import format_ms, percentile
+
+# 对照组的配置，必须在子进程导入app之前设置
+BASELINE_ENV = {
+    "SQLITE_SYNCHRONOUS": "FULL",
+    "SQLITE_MMAP_SIZE": "0",
+    "SQLITE_CACHE_SIZE_KB": "2000",
+    "SQLITE_BUSY_TIMEOUT_MS": "0",
+    "DB_WRITE_QUEUE_ENABLED": "false",
+}
+
+
+async def prepare() -> None:
+    """建表、创建超级用户和示例文章"""
+    from tortoise import Tortoise
+    from app.db.database import init_db
+    from app.models.article import Article
+    from app.models.user import User
+
+    await init_db()
+    author = await User.first()
+    await Article.bulk_create([
+        Article(
+            title=f"文章{i}",
+            slug=f"article-{i}",
+            excerpt="摘要" * 20,
+            content="正文" * 500,
+            author=author,
+            status="published",
+        )
+        for i in range(50)
+    ])
+    await Tortoise.close_connections()
+
+
+async def run_worker(args) -> dict:
+    from functools import partial
+    from datetime import datetime
+    from tortoise import Tortoise
+    from app.db.database import get_tortoise_config
+    from app.db.write_queue import write_queue
+    from app.middleware.api_stats_middleware import record_api_call
+    from app.models.article import Article
+
+    await Tortoise.init(config=get_tortoise_config())
+    deadline = time.perf_counter() + args.duration
+    read_latencies = []
+    writes = 0
+
+    async def reader() -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await Article.filter(status="published").order_by("-created_at").limit(10).values("id", "title")
+            read_latencies.append(time.perf_counter() - start)
+
+    interval = args.writers / args.write_rate
+
+    async def writer() -> None:
+        nonlocal writes
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await write_queue.submit(partial(
+                record_api_call,
+                endpoint="/api/articles",
+                method="GET",
+                status_code=200,
+                response_time=0.005,
+                timestamp=datetime.now(),
+                user_id=None,
+            ))
+            writes += 1
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+    await asyncio.gather(*[reader() for _ in range(args.readers)], *[writer() for _ in range(args.writers)])
+    await write_queue.stop()
+    stats = write_queue.get_stats()
+    await Tortoise.close_connections()
+    return {
+        "reads": read_latencies,
+        "writes": stats["written"],
+        "failed": stats["failed"] + stats["dropped"],
+        "batches": stats["batches"],
+    }
+
+
+def prepare_main() -> None:
+    asyncio.run(prepare())
+
+
+def worker_main(args, results) -> None:
+    results.put(asyncio.run(run_worker(args)))
+
+
+def main(args) -> None:
+    if args.baseline:
+        os.environ.update(BASELINE_ENV)
+
+    # 每个步骤都在独立的进程中运行，避免父进程持有数据库连接
+    context = multiprocessing.get_context("spawn")
+    setup = context.Process(target=prepare_main)
+    setup.start()
+    setup.join()
+
+    results = context.Queue()
+    workers = [context.Process(target=worker_main, args=(args, results)) for _ in range(args.workers)]
+    start = time.perf_counter()
+    for process in workers:
+        process.start()
+    collected = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    reads = [latency for result in collected for latency in result["reads"]]
+    writes = sum(result["writes"] for result in collected)
+    failed = sum(result["failed"] for result in collected)
+    batches = sum(result["batches"] for result in collected)
+    print(f"模式: {'baseline（默认PRAGMA，逐条提交）' if args.baseline else '调优PRAGMA + 批量写入队列'}")
+    print(
+        f"进程={args.workers} 每进程读协程={args.readers} 写协程={args.writers} "
+        f"目标写入={args.write_rate}/s/进程 时长={args.duration}s"
+    )
+    print(
+        f"读: {len(reads) / args.duration:>8.1f}/s "
+        f"p50={format_ms(percentile(reads, 50))} p99={format_ms(percentile(reads, 99))}"
+    )
+    print(f"写: {writes / args.duration:>8.1f}/s 失败={failed} 批次={batches}（总耗时 {elapsed:.1f}s）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite并发读写吞吐量基准测试")
+    parser.add_argument("--workers", type=int, default=4, help="worker进程数")
+    parser.add_argument("--readers", type=int, default=8, help="每个进程的读协程数")
+    parser.add_argument("--writers", type=int, default=8, help="每个进程的写协程数")
+    parser.add_argument("--write-rate", type=float, default=200, help="每个进程每秒提交的写入数")
+    parser.add_argument("--duration", type=float, default=5, help="持续时间（秒）")
+    parser.add_argument("--baseline", action="store_true", help="默认PRAGMA、逐条提交（对照组）")
+    main(parser.parse_args())
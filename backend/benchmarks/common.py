@@ -0,0 +1,176 @@
+"""
+基准测试公共工具
+
+提供进程内启动应用（临时SQLite数据库）和统计延迟分位数的辅助函数。
+各基准脚本在导入app之前先导入本模块，以便使用独立的临时数据库。
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parents[1]
+sys.path.insert(0, str(project_root))
+
+# 进程退出时删除临时目录
+_bench_dir = tempfile.TemporaryDirectory(prefix="blog-bench-", ignore_cleanup_errors=True)
+# 基准脚本可在此目录中放置其他临时文件（如只读副本的数据库文件）
+BENCH_DIR = _bench_dir.name
+
+# 默认使用临时SQLite数据库，避免污染开发数据库
+if "BENCH_DATABASE_URL" in os.environ:
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    os.environ["DATABASE_URL"] = f"sqlite://{_bench_dir.name}/bench.db"
+
+# 聊天回答缓存和文章检索索引也放在临时目录，每次运行都从空缓存开始
+os.environ.setdefault("CHAT_CACHE_PATH", os.path.join(_bench_dir.name, "chat-cache.db"))
+os.environ.setdefault("CHAT_RETRIEVAL_INDEX_DIR", os.path.join(_bench_dir.name, "chat-index"))
+os.environ.setdefault("PRINCIPAL_CACHE_GENERATION_PATH", os.path.join(_bench_dir.name, "principal-cache.db"))
+
+# 登录限流使用进程内后端：每次运行从空的桶开始，不受之前运行留下的状态影响
+os.environ.setdefault("LOGIN_RATE_LIMIT_BACKEND", "memory")
+
+# 聊天接口指向本地的模拟上游服务
+STUB_LLM_PORT = int(os.environ.get("BENCH_STUB_LLM_PORT", "18765"))
+os.environ["DEEPSEEK_BASE_URL"] = f"http://127.0.0.1:{STUB_LLM_PORT}"
+os.environ.setdefault("DEEPSEEK_API_KEY", "sk-bench")
+# 压测请求都来自同一个IP，放开单客户端排队上限
+os.environ.setdefault("CHAT_QUEUE_MAX_PER_CLIENT", "100000")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    计算分位数（最近秩法）
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def format_ms(seconds: float) -> str:
+    """将秒格式化为毫秒字符串"""
+    return f"{seconds * 1000:.1f}ms"
+
+
+@asynccontextmanager
+async def app_client():
+    """
+    在当前事件循环中启动应用并返回httpx异步客户端
+
+    应用的lifespan（数据库初始化、超级用户创建等）会被完整执行。
+    """
+    import httpx
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+
+
+@asynccontextmanager
+async def app_server(port: int = 18766):
+    """
+    在当前事件循环中用uvicorn启动应用并返回httpx异步客户端
+
+    与 app_client 不同，响应经过真实的HTTP连接，流式响应可以逐块读取。
+    """
+    import httpx
+    import uvicorn
+    from app.main import app
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error", lifespan="on")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+            yield client
+    finally:
+        server.should_exit = True
+        await task
+
+
+def create_stub_llm_app(delay: float = 0.5, answer: str = "你好，我是博客助手。", chunk_size: int = 4):
+    """
+    创建模拟的OpenAI兼容上游服务
+
+    Args:
+        delay: 非流式请求的响应耗时（秒）；流式请求会把该耗时平均分摊到各个分片
+        answer: 返回的回答文本
+        chunk_size: 流式响应每个分片包含的字符数
+    """
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    stub = FastAPI()
+    stub.state.requests = 0
+
+    def envelope(obj: str, **extra):
+        return {"id": "chatcmpl-bench", "object": obj, "created": int(time.time()), "model": "bench", **extra}
+
+    @stub.post("/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        stub.state.requests += 1
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return envelope(
+                "chat.completion",
+                choices=[{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }],
+            )
+
+        pieces = [answer[i:i + chunk_size] for i in range(0, len(answer), chunk_size)] or [""]
+
+        async def stream():
+            for piece in pieces:
+                await asyncio.sleep(delay / len(pieces))
+                chunk = envelope(
+                    "chat.completion.chunk",
+                    choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                )
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            final = envelope(
+                "chat.completion.chunk",
+                choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            )
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return stub
+
+
+@asynccontextmanager
+async def stub_llm_server(**kwargs):
+    """
+    在当前事件循环中启动模拟上游服务，参数同 create_stub_llm_app
+    """
+    import uvicorn
+
+    stub = create_stub_llm_app(**kwargs)
+    config = uvicorn.Config(stub, host="127.0.0.1", port=STUB_LLM_PORT, log_level="error")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        yield stub
+    finally:
+        server.should_exit = True
+        await task
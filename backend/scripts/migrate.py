@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Add the backend directory to the Python path
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, current_dir)
+
+from tortoise import Tortoise
+from app.db.database import get_tortoise_config
+from app.db.migrate import get_migration_status, run_migrations
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger("migrate")
+
+
+async def main(show_status: bool) -> None:
+    """执行未执行的数据库迁移，或列出迁移状态"""
+    await Tortoise.init(config=get_tortoise_config())
+    try:
+        if show_status:
+            for migration in await get_migration_status():
+                applied_at = migration["applied_at"] or "未执行"
+                print(f"{migration['name']:<40} {applied_at}")
+            return
+        executed = await run_migrations(apply=True)
+        logger.info(f"已执行 {len(executed)} 个迁移" if executed else "数据库已是最新版本")
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="执行数据库迁移")
+    parser.add_argument("--status", action="store_true", help="只列出迁移及其执行状态")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.status))
+    except Exception as e:
+        logger.error(f"数据库迁移失败: {e}")
+        sys.exit(1)